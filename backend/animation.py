@@ -0,0 +1,176 @@
+"""
+Animated exports that show a drawing being made, as APNG or GIF.
+
+The drawing is laid out as usual, then its display list is split into steps:
+one per polyline segment (one turtle move) and one per shape. Every
+``every`` steps make a frame. The steps are replayed onto a single palette
+canvas, and each frame is encoded as just the box its steps painted, placed
+at an offset over the previous frames, so neither format ever holds more
+than that one canvas and the encoded output, however long the drawing is.
+
+Long drawings get more steps per frame, so there are never more than
+``max_frames`` frames; the last frame is held for ``FINAL_HOLD_MS``.
+"""
+
+import math
+import struct
+import zlib
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from PIL import GifImagePlugin, Image, ImageColor, ImageDraw
+
+import config
+import encoders
+from canvas_pool import canvas_pool
+from display_list import bounds, colors, replay
+from simple_drawer import SimpleDrawer, draw_shape, frame_drawing
+from tiled_renderer import PNG_SIGNATURE, bit_depth, png_chunk, register_palette
+
+FORMATS = ("apng", "gif")
+
+# Browsers slow GIF frames shorter than 20ms down to 100ms
+MAX_FPS = 50
+
+# How long the finished drawing is shown before the animation loops
+FINAL_HOLD_MS = 1500
+
+
+def frame_steps(ops: Sequence[tuple]) -> int:
+    """Return the number of steps the ops are animated in"""
+    return sum(len(op[3]) // 2 - 1 if op[0] == "polyline" else 1 for op in ops)
+
+
+def split_frames(ops: Sequence[tuple], every: int) -> Iterator[List[tuple]]:
+    """Yield the ops each frame adds, ``every`` steps at a time
+
+    A polyline split across frames keeps the segment before the split in
+    the next part too, so its joint there is drawn as in the whole line.
+    """
+    pending: List[tuple] = []
+    count = 0
+    for op in ops:
+        if op[0] != "polyline":
+            pending.append(op)
+            count += 1
+        else:
+            _, color, width, coords = op
+            start = 0
+            segments = len(coords) // 2 - 1
+            while start < segments:
+                end = min(segments, start + every - count)
+                pending.append(("polyline", color, width, coords[2 * max(0, start - 1):2 * end + 2]))
+                count += end - start
+                start = end
+                if count == every and start < segments:
+                    yield pending
+                    pending, count = [], 0
+        if count == every:
+            yield pending
+            pending, count = [], 0
+    if pending:
+        yield pending
+
+
+def _apng_frame(sequence: int, box: Tuple[int, int, int, int], delay_ms: int) -> bytes:
+    x0, y0, x1, y1 = box
+    # Keep the earlier frames (dispose none) and replace the box (blend source)
+    return png_chunk(b"fcTL", struct.pack(">IIIIIHHBB", sequence, x1 - x0, y1 - y0, x0, y0,
+                                          delay_ms, 1000, 0, 0))
+
+
+def _gif_header(width: int, height: int, palette: Sequence[Tuple[int, int, int]]) -> bytes:
+    # Global color table of white plus the palette, padded to a power of two
+    entries = [(255, 255, 255)] + list(palette)
+    bits = max(1, math.ceil(math.log2(len(entries))))
+    table = b"".join(bytes(rgb) for rgb in entries).ljust(3 << bits, b"\x00")
+    return (b"GIF89a" + struct.pack("<HHBBB", width, height, 0x80 | (bits - 1), 0, 0) + table
+            # Loop forever
+            + b"!\xff\x0bNETSCAPE2.0\x03\x01\x00\x00\x00")
+
+
+def render_animation(shape_info: Dict[str, Any], format: str = "apng", encoder: str = "default",
+                     width: Optional[int] = None, height: Optional[int] = None,
+                     framing: str = "canvas", fps: int = config.ANIMATION_FPS, every: int = 1,
+                     max_frames: int = config.ANIMATION_MAX_FRAMES) -> bytes:
+    """Draw a parsed spec and return an animation of it being drawn
+
+    ``width``, ``height`` and ``framing`` are as for ``render_drawing``;
+    ``encoder`` sets the compression of APNG frames.
+    """
+    if format not in FORMATS:
+        raise ValueError(f"Unsupported animation format: {format}")
+    if not 1 <= fps <= MAX_FPS:
+        raise ValueError(f"fps must be between 1 and {MAX_FPS}")
+    settings = encoders.preset("png", encoder)
+
+    drawer = SimpleDrawer()
+    draw_shape(drawer, shape_info)
+    width, height, region = frame_drawing(drawer, width, height, framing)
+    scale, offset = drawer.transform(width, height, region)
+    ops = drawer.display_list.ops
+
+    palette = sorted({ImageColor.getrgb(c)[:3] for c in colors(ops)} - {(255, 255, 255)})
+    if len(palette) > 255:
+        raise ValueError("Too many colors to animate")
+    every = max(1, every, math.ceil(frame_steps(ops) / max(1, max_frames)))
+    delay = round(1000 / fps)
+    bits = bit_depth("P", palette)
+    level = settings.get("compress_level", 6)
+    viewport = (0, 0, width, height)
+
+    canvas = canvas_pool.acquire("P", (width, height))
+    register_palette(canvas, palette)
+    draw = ImageDraw.Draw(canvas)
+    frames: list = []
+    try:
+        parts = split_frames(ops, every)
+        for index, part in enumerate(parts if ops else [[]]):
+            replay(part, draw, scale=scale, offset=offset)
+            if index == 0:
+                box = viewport
+            else:
+                box = bounds(part, scale, offset) or (0, 0, 1, 1)
+                box = (max(box[0], 0), max(box[1], 0), min(box[2], width), min(box[3], height))
+                if box[0] >= box[2] or box[1] >= box[3]:
+                    # Nothing visible changed; repeat one pixel to keep the timing
+                    box = (0, 0, 1, 1)
+            # Always a copy: encoders leave settings on the image, and the
+            # canvas goes back to the pool
+            patch = canvas.crop(box)
+
+            if format == "gif":
+                frames.append(b"".join(GifImagePlugin.getdata(
+                    patch, offset=box[:2], duration=delay, disposal=1)))
+            else:
+                pixels = patch.tobytes("raw", f"P;{bits}" if bits < 8 else "P")
+                stride = len(pixels) // patch.height
+                rows = b"".join(b"\x00" + pixels[i:i + stride] for i in range(0, len(pixels), stride))
+                frames.append((box, zlib.compress(rows, level)))
+    finally:
+        canvas_pool.release(canvas, bounds(ops, scale, offset))
+
+    if format == "gif":
+        # Hold the finished drawing: patch the last frame's delay (centiseconds)
+        last = frames[-1]
+        frames[-1] = last[:4] + struct.pack("<H", FINAL_HOLD_MS // 10) + last[6:]
+        return _gif_header(width, height, palette) + b"".join(frames) + b";"
+
+    probe = Image.new("P", (1, 1), "white")
+    register_palette(probe, palette)
+    output = [
+        PNG_SIGNATURE,
+        png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, bits, 3, 0, 0, 0)),
+        png_chunk(b"acTL", struct.pack(">II", len(frames), 0)),
+        png_chunk(b"PLTE", bytes(probe.getpalette()[:3 * len(palette) + 3])),
+    ]
+    sequence = 0
+    for index, (box, data) in enumerate(frames):
+        output.append(_apng_frame(sequence, box, FINAL_HOLD_MS if index == len(frames) - 1 else delay))
+        sequence += 1
+        if index == 0:
+            output.append(png_chunk(b"IDAT", data))
+        else:
+            output.append(png_chunk(b"fdAT", struct.pack(">I", sequence) + data))
+            sequence += 1
+    output.append(png_chunk(b"IEND", b""))
+    return b"".join(output)
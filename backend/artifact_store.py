@@ -0,0 +1,257 @@
+"""
+Bounded lifecycle manager for generated files in the static directory.
+
+Every generated drawing is a ``drawing_*`` file under the static directory,
+which ``StaticFiles`` serves directly. ``ArtifactStore`` keeps an in-memory
+index of those files (size, creation time and last reference), so it never
+has to rescan the directory after startup, and a background collector
+deletes files to keep the directory under a maximum total size, file count
+and age. Files referenced within the last ``min_idle`` seconds are never
+deleted.
+
+With ``shared`` set (several server processes on one static directory),
+each process has its own index and collector, so the files are the source
+of truth: a hit is checked against the disk, and references are recorded
+in the file's mtime, which every collector reads before deleting anything.
+"""
+
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+import config
+
+# Only files with this prefix are managed; index.html and friends are left alone
+ARTIFACT_PREFIX = "drawing_"
+
+
+def atomic_write(path: str, data: bytes):
+    """Write a file via a temp file and rename so readers never see partial data"""
+    directory = os.path.dirname(path) or "."
+    Path(directory).mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class Artifact:
+    __slots__ = ("size", "created", "last_access")
+
+    def __init__(self, size: int, created: float, last_access: float):
+        self.size = size
+        self.created = created
+        self.last_access = last_access
+
+
+class ArtifactStore:
+    def __init__(self, directory=config.STATIC_DIR, max_bytes=config.ARTIFACT_MAX_BYTES,
+                 max_files=config.ARTIFACT_MAX_FILES, max_age=config.ARTIFACT_MAX_AGE,
+                 min_idle=config.ARTIFACT_MIN_IDLE, shared=config.CACHE_SHARED):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.max_age = max_age
+        self.min_idle = min_idle
+        self.shared = shared
+        self._lock = threading.Lock()
+
+        # name -> Artifact, least recently referenced first
+        self._index: "OrderedDict[str, Artifact]" = OrderedDict()
+        self._bytes = 0
+        self._scanned = False
+
+        self.collections = 0
+        self.files_reclaimed = 0
+        self.bytes_reclaimed = 0
+
+    def path_for(self, name: str) -> str:
+        """Return the static path of an artifact"""
+        return f"{self.directory}/{name}"
+
+    def scan(self):
+        """Index the files already on disk; only done once"""
+        with self._lock:
+            self._scan()
+
+    def write(self, name: str, data: bytes) -> str:
+        """Write an artifact atomically, index it and return its path"""
+        path = self.path_for(name)
+        atomic_write(path, data)
+        now = time.time()
+        with self._lock:
+            self._scan()
+            self._add(name, Artifact(len(data), now, now))
+        return path
+
+    def touch(self, name: str) -> bool:
+        """Record a reference to an artifact, returning whether it exists"""
+        with self._lock:
+            self._scan()
+            artifact = self._index.get(name)
+            if artifact is not None and not self.shared:
+                artifact.last_access = time.time()
+                self._index.move_to_end(name)
+                return True
+
+        # Not indexed, or another worker process may have written or deleted it
+        if not name.startswith(ARTIFACT_PREFIX):
+            return False
+        path = self.path_for(name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self.forget(name)
+            return False
+        now = time.time()
+        if self.shared and now - stat.st_mtime > self.min_idle / 4:
+            # Let the other workers' collectors see the reference
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+        with self._lock:
+            artifact = self._index.get(name)
+            if artifact is None:
+                self._add(name, Artifact(stat.st_size, stat.st_mtime, now))
+            else:
+                artifact.last_access = now
+                self._index.move_to_end(name)
+        return True
+
+    def forget(self, name: str):
+        """Drop an artifact from the index after it disappeared from disk"""
+        with self._lock:
+            artifact = self._index.pop(name, None)
+            if artifact is not None:
+                self._bytes -= artifact.size
+
+    def collect(self, now: Optional[float] = None) -> Dict[str, int]:
+        """Delete expired and excess artifacts, returning what was reclaimed"""
+        now = time.time() if now is None else now
+        if self.shared:
+            self._refresh()
+        victims = []
+        with self._lock:
+            self._scan()
+            self.collections += 1
+
+            def idle(artifact):
+                return now - artifact.last_access >= self.min_idle
+
+            # Expired files first
+            for name, artifact in list(self._index.items()):
+                if now - artifact.created > self.max_age and idle(artifact):
+                    victims.append(self._remove(name))
+
+            # Then least recently referenced files until within bounds
+            for name, artifact in list(self._index.items()):
+                if self._bytes <= self.max_bytes and len(self._index) <= self.max_files:
+                    break
+                if not idle(artifact):
+                    # Everything after this was referenced even more recently
+                    break
+                victims.append(self._remove(name))
+
+        reclaimed = 0
+        for name, size in victims:
+            try:
+                os.remove(self.path_for(name))
+            except OSError:
+                continue
+            reclaimed += size
+
+        with self._lock:
+            self.files_reclaimed += len(victims)
+            self.bytes_reclaimed += reclaimed
+        return {"files": len(victims), "bytes": reclaimed}
+
+    async def run_collector(self, interval: float = config.ARTIFACT_GC_INTERVAL):
+        """Collect periodically until cancelled"""
+        await asyncio.to_thread(self.scan)
+        while True:
+            await asyncio.sleep(interval)
+            await asyncio.to_thread(self.collect)
+
+    def stats(self) -> Dict[str, int]:
+        """Return the index size and reclaim counters"""
+        with self._lock:
+            return {
+                "files": len(self._index),
+                "bytes": self._bytes,
+                "collections": self.collections,
+                "files_reclaimed": self.files_reclaimed,
+                "bytes_reclaimed": self.bytes_reclaimed,
+            }
+
+    def _scan(self):
+        """Index existing artifacts once, least recently modified first"""
+        if self._scanned:
+            return
+        self._scanned = True
+
+        directory = Path(self.directory)
+        if not directory.is_dir():
+            return
+
+        entries = []
+        for entry in os.scandir(directory):
+            if entry.name.startswith(ARTIFACT_PREFIX) and entry.is_file():
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.name, stat.st_size))
+
+        for mtime, name, size in sorted(entries):
+            self._add(name, Artifact(size, mtime, mtime))
+
+    def _refresh(self):
+        """Pick up references and deletions made by other worker processes"""
+        with self._lock:
+            self._scan()
+            names = list(self._index)
+        mtimes = {}
+        for name in names:
+            try:
+                mtimes[name] = os.stat(self.path_for(name)).st_mtime
+            except OSError:
+                mtimes[name] = None
+
+        with self._lock:
+            for name, mtime in mtimes.items():
+                artifact = self._index.get(name)
+                if artifact is None:
+                    continue
+                if mtime is None:
+                    self._remove(name)
+                elif mtime > artifact.last_access:
+                    artifact.last_access = mtime
+            # Keep the index in order of last reference
+            order = sorted(self._index.items(), key=lambda item: item[1].last_access)
+            self._index = OrderedDict(order)
+
+    def _add(self, name: str, artifact: Artifact):
+        old = self._index.pop(name, None)
+        if old is not None:
+            self._bytes -= old.size
+        self._index[name] = artifact
+        self._bytes += artifact.size
+
+    def _remove(self, name: str):
+        artifact = self._index.pop(name)
+        self._bytes -= artifact.size
+        return name, artifact.size
+
+
+# Shared store for the static directory
+artifact_store = ArtifactStore()
@@ -0,0 +1,116 @@
+"""
+Pool of blank canvases, so renders reuse image memory instead of allocating
+and filling a new image every time.
+
+Canvases are kept per (mode, width, height, background), up to
+``max_per_key`` of each. A released canvas is reset to its blank state by
+filling only the box that was drawn on, when the caller knows it, and
+palette canvases also get their original palette back, so a reused canvas
+encodes exactly like a new one.
+"""
+
+import threading
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from PIL import Image
+
+import config
+
+Key = Tuple[str, int, int, Any]
+
+
+class _Blank:
+    """How to reset a canvas of one key: its background pixel and palette"""
+    __slots__ = ("pixel", "palette")
+
+    def __init__(self, canvas: Image.Image):
+        self.pixel = canvas.getpixel((0, 0))
+        self.palette = canvas.palette.copy() if canvas.mode == "P" else None
+
+
+class CanvasPool:
+    def __init__(self, max_per_key: int = config.CANVAS_POOL_SIZE):
+        self.max_per_key = max_per_key
+        self._lock = threading.Lock()
+        self._free: Dict[Key, List[Image.Image]] = defaultdict(list)
+        self._blanks: Dict[Key, _Blank] = {}
+        # Canvases handed out, by id, with the key they belong to
+        self._leased: Dict[int, Key] = {}
+
+        self.created = 0
+        self.reused = 0
+        self.dropped = 0
+
+    def acquire(self, mode: str, size: Tuple[int, int], background: Any = "white") -> Image.Image:
+        """Return a blank canvas, reusing a released one when possible"""
+        if self.max_per_key <= 0:
+            with self._lock:
+                self.created += 1
+            return Image.new(mode, size, background)
+
+        key = (mode, size[0], size[1], background)
+        with self._lock:
+            free = self._free[key]
+            if free:
+                canvas = free.pop()
+                self.reused += 1
+                self._leased[id(canvas)] = key
+                return canvas
+            self.created += 1
+
+        canvas = Image.new(mode, size, background)
+        with self._lock:
+            if key not in self._blanks:
+                self._blanks[key] = _Blank(canvas)
+            self._leased[id(canvas)] = key
+        return canvas
+
+    def release(self, canvas: Image.Image, box: Optional[Tuple[int, int, int, int]] = None):
+        """Reset a canvas from acquire() and keep it for reuse, up to the cap
+
+        ``box`` bounds everything drawn since acquire(); only that region is
+        reset. Without it the whole canvas is.
+        """
+        with self._lock:
+            key = self._leased.pop(id(canvas), None)
+            if key is None:
+                return
+            blank = self._blanks.get(key)
+            if blank is None or len(self._free[key]) >= self.max_per_key:
+                self.dropped += 1
+                return
+
+        if box is None:
+            box = (0, 0, canvas.width, canvas.height)
+        else:
+            box = (max(box[0], 0), max(box[1], 0),
+                   min(box[2], canvas.width), min(box[3], canvas.height))
+        if box[0] < box[2] and box[1] < box[3]:
+            canvas.paste(blank.pixel, box)
+        if blank.palette is not None:
+            canvas.palette = blank.palette.copy()
+            canvas.palette.dirty = 1
+
+        with self._lock:
+            self._free[key].append(canvas)
+
+    def clear(self):
+        """Drop every pooled canvas"""
+        with self._lock:
+            self._free.clear()
+            self._blanks.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Return allocation and reuse counters"""
+        with self._lock:
+            return {
+                "created": self.created,
+                "reused": self.reused,
+                "dropped": self.dropped,
+                "pooled": sum(len(free) for free in self._free.values()),
+            }
+
+
+# Shared pool used by SimpleDrawer
+canvas_pool = CanvasPool()
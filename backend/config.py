@@ -0,0 +1,85 @@
+"""
+Runtime settings for the TwoDee backend.
+
+Every setting can be overridden with a ``TWODEE_*`` environment variable.
+"""
+
+import os
+
+
+def _env_int(name: str, default: int) -> int:
+    """Read an integer setting from the environment"""
+    value = os.environ.get(name)
+    return int(value) if value not in (None, "") else default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    """Read a boolean setting from the environment"""
+    value = os.environ.get(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# Directory where generated drawings are written and served from
+STATIC_DIR = os.environ.get("TWODEE_STATIC_DIR", "static")
+
+# Render cache
+CACHE_ENABLED = _env_bool("TWODEE_CACHE_ENABLED", True)
+CACHE_MEMORY_BYTES = _env_int("TWODEE_CACHE_MEMORY_BYTES", 64 * 1024 * 1024)
+# Use the disk tier for in-memory responses too, so server worker processes
+# see each other's renders, and check cached files on disk on every hit since
+# any worker's collector may delete them (set by ``start_backend.py --production``)
+CACHE_SHARED = _env_bool("TWODEE_CACHE_SHARED", False)
+
+# Generated files under STATIC_DIR; the collector deletes the least recently
+# referenced ones beyond these bounds, but never one referenced within
+# ARTIFACT_MIN_IDLE seconds. Ages and intervals are in seconds.
+ARTIFACT_MAX_BYTES = _env_int("TWODEE_ARTIFACT_MAX_BYTES", 512 * 1024 * 1024)
+ARTIFACT_MAX_FILES = _env_int("TWODEE_ARTIFACT_MAX_FILES", 20000)
+ARTIFACT_MAX_AGE = _env_int("TWODEE_ARTIFACT_MAX_AGE", 7 * 24 * 3600)
+ARTIFACT_MIN_IDLE = _env_int("TWODEE_ARTIFACT_MIN_IDLE", 300)
+ARTIFACT_GC_INTERVAL = _env_int("TWODEE_ARTIFACT_GC_INTERVAL", 60)
+
+# Rendering backend: "process" (default), "thread" or "inline"
+RENDER_BACKEND = os.environ.get("TWODEE_RENDER_BACKEND", "process")
+
+# Number of render workers; 0 means one per CPU core
+RENDER_WORKERS = _env_int("TWODEE_RENDER_WORKERS", 0)
+
+# Default encoder preset for raster output: "fast", "default" or "small"
+ENCODER_PRESET = os.environ.get("TWODEE_ENCODER_PRESET", "default")
+
+# Blank canvases kept per (mode, size) for reuse by renders; 0 (the default)
+# disables pooling
+CANVAS_POOL_SIZE = _env_int("TWODEE_CANVAS_POOL_SIZE", 0)
+
+# Largest width or height /api/render will produce, in pixels
+RENDER_MAX_SIDE = _env_int("TWODEE_RENDER_MAX_SIDE", 8192)
+
+# PNG renders above this many pixels, or wider or taller than RENDER_MAX_SIDE,
+# are rendered in bands of TILE_HEIGHT rows and streamed, up to
+# TILED_MAX_SIDE pixels per side
+TILED_MIN_PIXELS = _env_int("TWODEE_TILED_MIN_PIXELS", 16 * 1000 * 1000)
+TILE_HEIGHT = _env_int("TWODEE_TILE_HEIGHT", 256)
+TILED_MAX_SIDE = _env_int("TWODEE_TILED_MAX_SIDE", 32768)
+
+# Largest command script /api/scripts accepts, in bytes
+SCRIPT_MAX_BYTES = _env_int("TWODEE_SCRIPT_MAX_BYTES", 256 * 1024 * 1024)
+
+# Animated exports (/api/animate): default frame rate, and the most frames
+# an animation may have
+ANIMATION_FPS = _env_int("TWODEE_ANIMATION_FPS", 20)
+ANIMATION_MAX_FRAMES = _env_int("TWODEE_ANIMATION_MAX_FRAMES", 300)
+
+# Async jobs (/api/jobs): jobs waiting for a worker beyond JOB_QUEUE_SIZE are
+# rejected with 429; JOB_WORKERS renders run at once (0 means one per render
+# worker); results are kept JOB_RESULT_TTL seconds and a poll waits at most
+# JOB_MAX_WAIT seconds
+JOB_QUEUE_SIZE = _env_int("TWODEE_JOB_QUEUE_SIZE", 64)
+JOB_WORKERS = _env_int("TWODEE_JOB_WORKERS", 0)
+JOB_RESULT_TTL = _env_int("TWODEE_JOB_RESULT_TTL", 300)
+JOB_MAX_WAIT = _env_int("TWODEE_JOB_MAX_WAIT", 30)
+
+# Prometheus metrics at /metrics and Server-Timing response headers
+METRICS_ENABLED = _env_bool("TWODEE_METRICS_ENABLED", True)
@@ -0,0 +1,409 @@
+"""
+Display list intermediate representation for drawings.
+
+``SimpleDrawer`` compiles turtle commands into a compact list of drawing ops
+instead of calling ``ImageDraw`` once per segment. Ops are plain tuples so
+they are cheap to build, pickle, serialize and replay on any canvas:
+
+    ("polyline", color, width, coords)
+    ("ellipse", bbox, fill, outline, width)
+    ("rect", bbox, fill, outline, width)
+    ("polygon", points, fill, outline, width)
+
+A polyline's ``coords`` are flat, ``[x0, y0, x1, y1, ...]``, as PIL accepts
+them, so NumPy traces go in with one ``ravel().tolist()``.
+Consecutive pen-down segments of the same color and width are merged into a
+single polyline, which is drawn with one ``draw.line(..., joint="curve")``.
+
+``replay`` culls ops that cannot touch the canvas before handing them to PIL.
+PIL walks every pixel of a line, on the canvas or not, so polylines reaching
+far off the canvas are clipped to it first (see ``clip_polyline``); it also
+rasterizes an ellipse along its whole outline, so ellipses far larger than
+the canvas are reduced to the part that is visible (see ``_draw_ellipse``).
+"""
+
+import math
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
+
+from PIL import Image, ImageDraw
+
+Point = Tuple[float, float]
+
+
+class DisplayList:
+    def __init__(self, ops: Optional[List[tuple]] = None):
+        self.ops: List[tuple] = ops if ops is not None else []
+        # Whether the last op is a polyline that new segments may extend
+        self._open_path = False
+
+    def __len__(self):
+        return len(self.ops)
+
+    def __iter__(self):
+        return iter(self.ops)
+
+    def line(self, start: Point, end: Point, color: str, width: int = 2):
+        """Add a segment, extending the current polyline when possible"""
+        if self._open_path:
+            _, last_color, last_width, coords = self.ops[-1]
+            if (last_color == color and last_width == width and
+                    coords[-2] == start[0] and coords[-1] == start[1]):
+                coords += end
+                return
+        self.ops.append(("polyline", color, width, [start[0], start[1], end[0], end[1]]))
+        self._open_path = True
+
+    def polyline(self, coords: Sequence[float], color: str, width: int = 2):
+        """Add a connected run of segments from flat coordinates, extending the
+        current polyline when possible"""
+        coords = list(coords)
+        if len(coords) < 4:
+            return
+        if self._open_path:
+            _, last_color, last_width, last_coords = self.ops[-1]
+            if last_color == color and last_width == width and last_coords[-2:] == coords[:2]:
+                last_coords += coords[2:]
+                return
+        self.ops.append(("polyline", color, width, coords))
+        self._open_path = True
+
+    def ellipse(self, bbox: Sequence[float], fill: Optional[str] = None,
+                outline: Optional[str] = None, width: int = 2):
+        """Add an ellipse inscribed in bbox"""
+        self.ops.append(("ellipse", tuple(bbox), fill, outline, width))
+        self._open_path = False
+
+    def rect(self, bbox: Sequence[float], fill: Optional[str] = None,
+             outline: Optional[str] = None, width: int = 2):
+        """Add an axis-aligned rectangle"""
+        self.ops.append(("rect", tuple(bbox), fill, outline, width))
+        self._open_path = False
+
+    def polygon(self, points: Sequence[Point], fill: Optional[str] = None,
+                outline: Optional[str] = None, width: int = 1, index: Optional[int] = None):
+        """Add a closed polygon, optionally inserted beneath the op at ``index``"""
+        op = ("polygon", [tuple(p) for p in points], fill, outline, width)
+        if index is not None and index < len(self.ops):
+            self.ops.insert(index, op)
+            return
+        self.ops.append(op)
+        self._open_path = False
+
+    def break_path(self):
+        """Start a new polyline on the next segment"""
+        self._open_path = False
+
+    def clear(self, keep_open_path: bool = False):
+        """Remove every op
+
+        With ``keep_open_path`` an open polyline keeps its last segment, so
+        it can still be extended and its next joint is drawn.
+        """
+        last = self.ops[-1] if keep_open_path and self._open_path else None
+        self.ops.clear()
+        if last is None:
+            self._open_path = False
+        else:
+            self.ops.append(("polyline", last[1], last[2], last[3][-4:]))
+
+    def to_json(self) -> List[list]:
+        """Return a JSON-serializable copy of the ops"""
+        data = []
+        for op in self.ops:
+            kind = op[0]
+            if kind == "polyline":
+                data.append([kind, op[1], op[2], list(op[3])])
+            elif kind == "polygon":
+                data.append([kind, [list(p) for p in op[1]], op[2], op[3], op[4]])
+            else:
+                data.append([kind, list(op[1]), op[2], op[3], op[4]])
+        return data
+
+    @classmethod
+    def from_json(cls, data: Iterable[list]) -> "DisplayList":
+        """Rebuild a display list from ``to_json`` output"""
+        ops = []
+        for item in data:
+            kind = item[0]
+            if kind == "polyline":
+                ops.append((kind, item[1], item[2], list(item[3])))
+            elif kind == "polygon":
+                ops.append((kind, [tuple(p) for p in item[1]], item[2], item[3], item[4]))
+            elif kind in ("ellipse", "rect"):
+                ops.append((kind, tuple(item[1]), item[2], item[3], item[4]))
+            else:
+                raise ValueError(f"Unknown display list op: {kind}")
+        return cls(ops)
+
+
+def colors(ops: Iterable[tuple]) -> set:
+    """Return every fill, outline and line color used by ops"""
+    used = set()
+    for op in ops:
+        if op[0] == "polyline":
+            used.add(op[1])
+        else:
+            used.update(c for c in (op[2], op[3]) if c is not None)
+    return used
+
+
+def op_bounds(op: tuple) -> Optional[Tuple[float, float, float, float]]:
+    """Return the box (x0, y0, x1, y1) an op can paint, padded by its line width"""
+    kind = op[0]
+    if kind == "polyline":
+        width, coords = op[2], op[3]
+        if not coords:
+            return None
+        xs, ys = coords[0::2], coords[1::2]
+        return min(xs) - width, min(ys) - width, max(xs) + width, max(ys) + width
+    if kind == "polygon":
+        points, width = op[1], op[4]
+    else:
+        bx0, by0, bx1, by1 = op[1]
+        points, width = ((bx0, by0), (bx1, by1)), op[4]
+    if not len(points):
+        return None
+    xs, ys = zip(*points)
+    return min(xs) - width, min(ys) - width, max(xs) + width, max(ys) + width
+
+
+def bounds(ops: Iterable[tuple], scale: float = 1.0, offset: Point = (0.0, 0.0),
+           viewport: Optional[Tuple[float, float, float, float]] = None
+           ) -> Optional[Tuple[int, int, int, int]]:
+    """Return the integer box (x0, y0, x1, y1) that ops can paint, or None
+
+    The box is padded by each op's line width, so it covers round joins and
+    outlines; ``scale`` and ``offset`` are applied as in ``replay``. With a
+    ``viewport`` box (before scaling), ops entirely outside it are left out.
+    """
+    x0 = y0 = float("inf")
+    x1 = y1 = float("-inf")
+    for op in ops:
+        box = op_bounds(op)
+        if box is None:
+            continue
+        if viewport is not None and (box[0] >= viewport[2] or box[2] <= viewport[0] or
+                                     box[1] >= viewport[3] or box[3] <= viewport[1]):
+            continue
+        x0 = min(x0, box[0])
+        y0 = min(y0, box[1])
+        x1 = max(x1, box[2])
+        y1 = max(y1, box[3])
+
+    if x0 > x1:
+        return None
+    dx, dy = offset
+    return (math.floor(x0 * scale + dx) - 1, math.floor(y0 * scale + dy) - 1,
+            math.ceil(x1 * scale + dx) + 2, math.ceil(y1 * scale + dy) + 2)
+
+
+def clip_segment(x0: float, y0: float, x1: float, y1: float,
+                 box: Tuple[float, float, float, float]
+                 ) -> Optional[Tuple[float, float, float, float]]:
+    """Return the part of a segment inside box (Liang-Barsky), or None
+
+    Endpoints inside the box are returned unchanged.
+    """
+    left, top, right, bottom = box
+    dx, dy = x1 - x0, y1 - y0
+    t0, t1 = 0.0, 1.0
+    for p, q in ((-dx, x0 - left), (dx, right - x0), (-dy, y0 - top), (dy, bottom - y0)):
+        if p == 0:
+            if q < 0:
+                return None
+            continue
+        t = q / p
+        if p < 0:
+            if t > t1:
+                return None
+            t0 = max(t0, t)
+        else:
+            if t < t0:
+                return None
+            t1 = min(t1, t)
+    start = (x0 + t0 * dx, y0 + t0 * dy) if t0 > 0 else (x0, y0)
+    end = (x0 + t1 * dx, y0 + t1 * dy) if t1 < 1 else (x1, y1)
+    return start + end
+
+
+def clip_polyline(coords: Sequence[float], box: Tuple[float, float, float, float]
+                  ) -> List[List[float]]:
+    """Clip a polyline of flat coordinates to box, splitting it into runs where
+    it leaves the box"""
+    runs: List[List[float]] = []
+    run: List[float] = []
+    for i in range(0, len(coords) - 2, 2):
+        clipped = clip_segment(coords[i], coords[i + 1], coords[i + 2], coords[i + 3], box)
+        if clipped is None:
+            continue
+        if not run or run[-2] != clipped[0] or run[-1] != clipped[1]:
+            if len(run) > 2:
+                runs.append(run)
+            run = list(clipped[:2])
+        run += clipped[2:]
+    if len(run) > 2:
+        runs.append(run)
+    return runs
+
+
+# Polylines are clipped to the canvas grown by this many canvas sizes, so
+# lines that stay near the canvas are drawn exactly as before. PIL rounds the
+# clipped endpoints, which can move a longer line by a pixel.
+CLIP_MARGIN = 1
+
+# Ellipses with a radius above this many canvas sizes are drawn by _draw_ellipse
+HUGE_ELLIPSE = 16
+
+# Largest distance in pixels between an approximated arc and the true one
+ARC_TOLERANCE = 0.25
+
+
+def _draw_ellipse(draw: ImageDraw.ImageDraw, bbox, fill, outline, width: int,
+                  size: Tuple[int, int], to_window):
+    """Draw an ellipse, reducing one much larger than the canvas to what is visible
+
+    If the canvas lies wholly outside the ellipse, nothing is drawn; if it
+    lies wholly inside the outline, it is filled (or left alone). Otherwise
+    only the arc crossing the canvas is drawn, as a polyline close enough to
+    the ellipse that the difference is under a pixel. ``bbox`` is in the
+    coordinates of the whole canvas of ``size``; ``to_window`` maps points
+    onto ``draw``.
+    """
+    canvas_width, canvas_height = size
+    x0, x1 = sorted((bbox[0], bbox[2]))
+    y0, y1 = sorted((bbox[1], bbox[3]))
+    a, b = (x1 - x0) / 2, (y1 - y0) / 2
+    if min(a, b) <= 0 or max(a, b) <= HUGE_ELLIPSE * max(canvas_width, canvas_height):
+        box = to_window([bbox[:2], bbox[2:]])
+        draw.ellipse(box[0] + box[1], fill=fill, outline=outline, width=width)
+        return
+
+    # PIL paints the pixels from x0 to x1 inclusive, so the shape spans x1 + 1
+    cx, cy = (x0 + x1 + 1) / 2, (y0 + y1 + 1) / 2
+    a, b = a + 0.5, b + 0.5
+    # The canvas with a margin, in coordinates where the ellipse is a unit circle
+    pad = width + 2
+    left, right = (-pad - cx) / a, (canvas_width + pad - cx) / a
+    top, bottom = (-pad - cy) / b, (canvas_height + pad - cy) / b
+    corners = [(u, v) for u in (left, right) for v in (top, bottom)]
+    nearest = math.hypot(min(max(0.0, left), right), min(max(0.0, top), bottom))
+    farthest = max(math.hypot(u, v) for u, v in corners)
+    inner = 1 - (width / min(a, b) if outline else 0)
+
+    if nearest > 1:
+        return
+    if farthest < inner:
+        if fill:
+            draw.rectangle((0, 0) + draw.im.size, fill=fill)
+        return
+
+    # The angles the canvas spans as seen from the center
+    first = math.atan2(corners[0][1], corners[0][0])
+    angles = [first + (math.atan2(v, u) - first + math.pi) % (2 * math.pi) - math.pi
+              for u, v in corners]
+    start, end = min(angles), max(angles)
+    if end - start > math.pi / 2:
+        box = to_window([bbox[:2], bbox[2:]])
+        draw.ellipse(box[0] + box[1], fill=fill, outline=outline, width=width)
+        return
+
+    step = math.sqrt(8 * ARC_TOLERANCE / max(a, b))
+    count = max(2, math.ceil((end - start) / step) + 1)
+    angles = [start + (end - start) * i / (count - 1) for i in range(count)]
+    if fill:
+        arc = [(cx + a * math.cos(t), cy + b * math.sin(t)) for t in angles]
+        draw.polygon(to_window(arc + [(cx, cy)]), fill=fill)
+    if outline:
+        # PIL draws the outline inside the box; follow the middle of that band
+        ra, rb = a - width / 2, b - width / 2
+        arc = [(cx + ra * math.cos(t), cy + rb * math.sin(t)) for t in angles]
+        draw.line(to_window(arc), fill=outline, width=width, joint="curve")
+
+
+def replay(ops: Iterable[tuple], draw: ImageDraw.ImageDraw, scale: float = 1.0,
+           offset: Point = (0.0, 0.0), origin: Tuple[int, int] = (0, 0),
+           size: Optional[Tuple[int, int]] = None):
+    """Draw ops onto a canvas, scaling geometry and line widths by ``scale``
+
+    ``draw`` may be a window of a larger canvas: ``size`` is the size of the
+    whole canvas (by default the window's own) and ``origin`` the window's
+    position in it. Coordinates are truncated to whole pixels of the whole
+    canvas, as PIL does, and then moved into the window, so a window gets
+    exactly the pixels the whole canvas would.
+
+    Ops entirely outside the window are skipped, and polylines reaching far
+    off the whole canvas are clipped.
+    """
+    dx, dy = offset
+    ox, oy = origin
+    window_width, window_height = draw.im.size
+    canvas_width, canvas_height = size or (window_width, window_height)
+    margin = CLIP_MARGIN * max(canvas_width, canvas_height)
+    clip = (-margin, -margin, canvas_width + margin, canvas_height + margin)
+
+    def transform(coords):
+        if scale == 1.0 and dx == 0 and dy == 0:
+            return coords
+        flat = coords[:]
+        flat[0::2] = [x * scale + dx for x in coords[0::2]]
+        flat[1::2] = [y * scale + dy for y in coords[1::2]]
+        return flat
+
+    def snap(coords):
+        flat = coords[:]
+        flat[0::2] = [int(x) - ox for x in coords[0::2]]
+        flat[1::2] = [int(y) - oy for y in coords[1::2]]
+        return flat
+
+    def to_window(points):
+        return [(int(x) - ox, int(y) - oy) for x, y in points]
+
+    def points_of(points):
+        return [(int(x * scale + dx) - ox, int(y * scale + dy) - oy) for x, y in points]
+
+    def box_of(bbox):
+        x0, y0, x1, y1 = bbox
+        return (x0 * scale + dx, y0 * scale + dy, x1 * scale + dx, y1 * scale + dy)
+
+    def width_of(width):
+        return width if scale == 1.0 else max(1, round(width * scale))
+
+    for op in ops:
+        kind = op[0]
+        if kind not in ("polyline", "ellipse", "rect", "polygon"):
+            raise ValueError(f"Unknown display list op: {kind}")
+        box = op_bounds(op)
+        if box is None:
+            continue
+        # Scaled widths round up to at least a pixel, so keep a margin
+        x0, y0, x1, y1 = box_of(box)
+        if (x0 - 2 >= ox + window_width or x1 + 2 <= ox or
+                y0 - 2 >= oy + window_height or y1 + 2 <= oy):
+            continue
+        if kind == "polyline":
+            _, color, width, coords = op
+            coords = transform(coords)
+            if x0 < clip[0] or y0 < clip[1] or x1 > clip[2] or y1 > clip[3]:
+                for run in clip_polyline(coords, clip):
+                    draw.line(snap(run), fill=color, width=width_of(width), joint="curve")
+            else:
+                draw.line(snap(coords), fill=color, width=width_of(width), joint="curve")
+        elif kind == "ellipse":
+            _, bbox, fill, outline, width = op
+            _draw_ellipse(draw, box_of(bbox), fill, outline, width_of(width),
+                          (canvas_width, canvas_height), to_window)
+        elif kind == "rect":
+            _, bbox, fill, outline, width = op
+            corners = points_of([bbox[:2], bbox[2:]])
+            draw.rectangle(corners[0] + corners[1], fill=fill, outline=outline, width=width_of(width))
+        else:
+            _, points, fill, outline, width = op
+            draw.polygon(points_of(points), fill=fill, outline=outline, width=width_of(width))
+
+
+def render(ops: Iterable[tuple], width: int, height: int, scale: float = 1.0,
+           mode: str = "RGB", background: Any = "white") -> Image.Image:
+    """Replay ops onto a new canvas of the given size"""
+    image = Image.new(mode, (width, height), background)
+    replay(ops, ImageDraw.Draw(image), scale=scale)
+    return image
@@ -0,0 +1,93 @@
+"""
+Image encoders and canvas modes for raster output.
+
+Drawings only ever use a few flat colors, so when the color set is known
+before rasterizing, the canvas can be a palette (``P``) image, or ``L`` when
+every color is a shade of gray, instead of 3-byte-per-pixel ``RGB``. The
+pixels are identical but the canvas is a third of the size and the PNG is
+smaller and faster to compress.
+
+Encoder presets trade bandwidth for CPU per format:
+
+    fast     lowest CPU cost
+    default  balanced
+    small    smallest output
+"""
+
+import io
+from typing import Any, Dict, Iterable
+
+from PIL import Image, ImageColor
+
+# Media types of every output format
+MEDIA_TYPES = {
+    "png": "image/png",
+    "webp": "image/webp",
+    "svg": "image/svg+xml",
+    "apng": "image/apng",
+    "gif": "image/gif",
+}
+
+# zlib strategies accepted by Pillow's PNG encoder as ``compress_type``.
+# Pillow picks PNG row filters itself, so the strategy is the filter knob.
+PNG_STRATEGIES = {
+    "default": 0,
+    "filtered": 1,
+    "huffman": 2,
+    "rle": 3,
+    "fixed": 4,
+}
+
+PRESETS: Dict[str, Dict[str, Dict[str, Any]]] = {
+    "png": {
+        "fast": {"palette": True, "compress_level": 1, "strategy": "rle"},
+        "default": {"palette": True, "compress_level": 6},
+        "small": {"palette": True, "compress_level": 9, "optimize": True},
+    },
+    "webp": {
+        "fast": {"lossless": True, "method": 1, "quality": 25},
+        "default": {"lossless": True, "method": 4, "quality": 50},
+        "small": {"lossless": True, "method": 6, "quality": 50},
+    },
+}
+
+
+def preset(format: str, name: str = "default") -> Dict[str, Any]:
+    """Return a copy of the encoder settings for a format and preset name"""
+    presets = PRESETS.get(format)
+    if presets is None:
+        return {}
+    if name not in presets:
+        raise ValueError(f"Unknown encoder preset: {name}")
+    return dict(presets[name])
+
+
+def canvas_mode(colors: Iterable[Any]) -> str:
+    """Pick the smallest canvas mode that can hold every color exactly"""
+    rgb = {ImageColor.getrgb(c)[:3] if isinstance(c, str) else tuple(c)[:3] for c in colors}
+    if all(r == g == b for r, g, b in rgb):
+        return "L"
+    if len(rgb) <= 256:
+        return "P"
+    return "RGB"
+
+
+def encode(image: Image.Image, format: str = "png", palette: bool = False,
+           compress_level: int = 6, strategy: str = "default", optimize: bool = False,
+           lossless: bool = True, method: int = 4, quality: int = 50) -> bytes:
+    """Encode an image in memory and return the bytes
+
+    ``palette`` only matters when the canvas was created; it is accepted here
+    so a preset can be passed straight through.
+    """
+    buffer = io.BytesIO()
+    if format == "png":
+        image.save(buffer, "PNG", compress_level=compress_level,
+                   compress_type=PNG_STRATEGIES[strategy], optimize=optimize)
+    elif format == "webp":
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGB")
+        image.save(buffer, "WEBP", lossless=lossless, method=method, quality=quality)
+    else:
+        raise ValueError(f"Unsupported raster format: {format}")
+    return buffer.getvalue()
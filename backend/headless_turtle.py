@@ -0,0 +1,266 @@
+"""
+Headless, Tk-free turtle engine.
+
+``HeadlessTurtle`` and ``HeadlessScreen`` implement the parts of the
+``turtle.Turtle``/``turtle.Screen`` API that ``TurtleDrawer`` uses, with the
+same semantics: the origin is the center of the canvas, y points up,
+heading 0 is east and positive turns are counterclockwise. ``circle`` uses
+turtle's own polygon approximation, and ``begin_fill``/``end_fill`` paint
+the fill beneath the outline drawn since ``begin_fill``.
+
+Drawing is recorded into a display list and rasterized in memory with PIL,
+so there is no Tk display, no PostScript export and no intermediate file.
+"""
+
+import io
+import math
+from typing import Optional, Tuple
+
+from display_list import DisplayList, render
+
+
+def _colorstr(color) -> str:
+    """Convert a turtle color spec (name, hex string or RGB tuple) to a PIL color"""
+    if isinstance(color, str):
+        return color
+    r, g, b = color
+    if all(isinstance(c, float) and c <= 1.0 for c in (r, g, b)):
+        r, g, b = (round(c * 255) for c in (r, g, b))
+    return "#%02x%02x%02x" % (int(r), int(g), int(b))
+
+
+class HeadlessScreen:
+    def __init__(self, width=800, height=600):
+        self.width = width
+        self.height = height
+        self.background = "white"
+        self.display_list = DisplayList()
+
+    def setup(self, width=None, height=None, startx=None, starty=None):
+        """Set the canvas size in pixels"""
+        if width is not None:
+            self.width = int(width)
+        if height is not None:
+            self.height = int(height)
+
+    def bgcolor(self, *args):
+        """Set or return the background color"""
+        if not args:
+            return self.background
+        self.background = _colorstr(args[0] if len(args) == 1 else args)
+
+    def title(self, titlestring):
+        """No window to title"""
+
+    def tracer(self, n=None, delay=None):
+        """Animation is never shown, so there is nothing to trace"""
+
+    def update(self):
+        """Drawing is recorded immediately, so there is nothing to update"""
+
+    def bye(self):
+        """Release the recorded drawing"""
+        self.display_list = DisplayList()
+
+    def to_canvas(self, x: float, y: float) -> Tuple[float, float]:
+        """Convert turtle coordinates to canvas pixel coordinates"""
+        return self.width / 2 + x, self.height / 2 - y
+
+    def render(self):
+        """Rasterize the drawing into a new PIL image"""
+        return render(self.display_list, self.width, self.height, background=self.background)
+
+    def to_bytes(self, format="PNG") -> bytes:
+        """Encode the drawing in memory and return the bytes"""
+        buffer = io.BytesIO()
+        self.render().save(buffer, format)
+        return buffer.getvalue()
+
+    def save(self, filename: str, format="PNG") -> str:
+        """Write the drawing to a file"""
+        self.render().save(filename, format)
+        return filename
+
+
+class HeadlessTurtle:
+    def __init__(self, screen: Optional[HeadlessScreen] = None):
+        self.screen = screen or HeadlessScreen()
+        self._x = 0.0
+        self._y = 0.0
+        self._heading = 0.0
+        self._drawing = True
+        self._pencolor = "black"
+        self._fillcolor = "black"
+        self._pensize = 1
+        self._fill_path = None
+        self._fill_index = 0
+
+    # Motion
+
+    def forward(self, distance):
+        """Move forward by distance in the current heading"""
+        angle = math.radians(self._heading)
+        self._go_to(self._x + distance * math.cos(angle), self._y + distance * math.sin(angle))
+
+    fd = forward
+
+    def backward(self, distance):
+        """Move backward by distance"""
+        self.forward(-distance)
+
+    back = bk = backward
+
+    def left(self, angle):
+        """Turn counterclockwise by angle degrees"""
+        self._heading = (self._heading + angle) % 360.0
+
+    lt = left
+
+    def right(self, angle):
+        """Turn clockwise by angle degrees"""
+        self.left(-angle)
+
+    rt = right
+
+    def goto(self, x, y=None):
+        """Move to absolute turtle coordinates"""
+        if y is None:
+            x, y = x
+        self._go_to(float(x), float(y))
+
+    setpos = setposition = goto
+
+    def setheading(self, to_angle):
+        """Point in an absolute direction (0 is east, 90 is north)"""
+        self._heading = to_angle % 360.0
+
+    seth = setheading
+
+    def home(self):
+        """Move to the origin and face east"""
+        self.goto(0, 0)
+        self.setheading(0)
+
+    def circle(self, radius, extent=None, steps=None):
+        """Draw a circle or arc with its center radius units to the left"""
+        if extent is None:
+            extent = 360.0
+        if steps is None:
+            frac = abs(extent) / 360.0
+            steps = 1 + int(min(11 + abs(radius) / 6.0, 59.0) * frac)
+        w = 1.0 * extent / steps
+        w2 = 0.5 * w
+        length = 2.0 * radius * math.sin(math.radians(w2))
+        if radius < 0:
+            length, w, w2 = -length, -w, -w2
+
+        self.left(w2)
+        for _ in range(steps):
+            self.forward(length)
+            self.left(w)
+        self.left(-w2)
+
+    # State
+
+    def position(self):
+        return (self._x, self._y)
+
+    pos = position
+
+    def xcor(self):
+        return self._x
+
+    def ycor(self):
+        return self._y
+
+    def heading(self):
+        return self._heading
+
+    def penup(self):
+        self._drawing = False
+
+    pu = up = penup
+
+    def pendown(self):
+        self._drawing = True
+
+    pd = down = pendown
+
+    def isdown(self):
+        return self._drawing
+
+    def pensize(self, width=None):
+        """Set or return the line width"""
+        if width is None:
+            return self._pensize
+        self._pensize = width
+
+    width = pensize
+
+    def pencolor(self, *args):
+        """Set or return the pen color"""
+        if not args:
+            return self._pencolor
+        self._pencolor = _colorstr(args[0] if len(args) == 1 else args)
+
+    def fillcolor(self, *args):
+        """Set or return the fill color"""
+        if not args:
+            return self._fillcolor
+        self._fillcolor = _colorstr(args[0] if len(args) == 1 else args)
+
+    def color(self, *args):
+        """Set or return the pen and fill colors"""
+        if not args:
+            return self._pencolor, self._fillcolor
+        if len(args) == 1:
+            self._pencolor = self._fillcolor = _colorstr(args[0])
+        elif len(args) == 2:
+            self._pencolor, self._fillcolor = _colorstr(args[0]), _colorstr(args[1])
+        else:
+            self._pencolor = self._fillcolor = _colorstr(args)
+
+    def speed(self, speed=None):
+        """Drawing is never animated, so speed is always the fastest"""
+        return 0
+
+    def shape(self, name=None):
+        """The turtle cursor is not drawn"""
+        return "classic"
+
+    def hideturtle(self):
+        """The turtle cursor is never drawn"""
+
+    ht = hideturtle
+
+    def showturtle(self):
+        """The turtle cursor is never drawn"""
+
+    st = showturtle
+
+    # Filling
+
+    def filling(self):
+        return self._fill_path is not None
+
+    def begin_fill(self):
+        """Start recording the outline of a shape to fill"""
+        self._fill_path = [self.screen.to_canvas(self._x, self._y)]
+        self._fill_index = len(self.screen.display_list)
+
+    def end_fill(self):
+        """Fill the shape outlined since begin_fill, beneath its outline"""
+        if self._fill_path is not None and len(self._fill_path) > 2:
+            self.screen.display_list.polygon(self._fill_path, fill=self._fillcolor,
+                                             index=self._fill_index)
+        self._fill_path = None
+
+    def _go_to(self, x: float, y: float):
+        """Move to turtle coordinates, drawing and recording fill vertices"""
+        start = self.screen.to_canvas(self._x, self._y)
+        end = self.screen.to_canvas(x, y)
+        self._x, self._y = x, y
+        if self._drawing:
+            self.screen.display_list.line(start, end, self._pencolor, self._pensize)
+        if self._fill_path is not None:
+            self._fill_path.append(end)
@@ -0,0 +1,178 @@
+"""
+Asynchronous render jobs drained from a bounded queue.
+
+``submit`` queues a job and returns at once with its id; a fixed number of
+worker tasks take jobs off the queue, so however many clients submit, no
+more than that many renders run at a time. When the queue is full ``submit``
+raises ``QueueFull`` with a suggested retry delay instead of letting every
+request slow down. Clients poll a job by id, or wait for it to finish.
+
+Finished jobs are kept for ``JOB_RESULT_TTL`` seconds. Jobs live in the
+memory of one server process; with several uvicorn workers a job can only
+be polled through the worker that accepted it.
+"""
+
+import asyncio
+import math
+import time
+import uuid
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import config
+import metrics
+
+STATES = ("queued", "running", "done")
+
+# Initial estimate of a job's run time, used for Retry-After
+DEFAULT_SERVICE_SECONDS = 0.1
+
+
+class QueueFull(Exception):
+    """Raised by ``submit`` when the queue is at capacity"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Render queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class Job:
+    __slots__ = ("id", "payload", "state", "result", "created", "started", "finished", "_done")
+
+    def __init__(self, payload: Any):
+        self.id = uuid.uuid4().hex
+        self.payload = payload
+        self.state = "queued"
+        self.result: Optional[Dict[str, Any]] = None
+        self.created = time.monotonic()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self._done = asyncio.Event()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the job's state, merged with its result once it is done"""
+        info = {"job_id": self.id, "state": self.state}
+        if self.result is not None:
+            info.update(self.result)
+        return info
+
+
+class JobQueue:
+    def __init__(self, run: Callable[[Any], Awaitable[Dict[str, Any]]],
+                 max_size: int = config.JOB_QUEUE_SIZE, workers: Optional[int] = None,
+                 result_ttl: int = config.JOB_RESULT_TTL):
+        self.run = run
+        self.max_size = max_size
+        self._workers = workers
+        self.result_ttl = result_ttl
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._jobs: Dict[str, Job] = {}
+        # (finish time, id) of done jobs, oldest first, for expiry
+        self._finished: deque = deque()
+        self._running = 0
+        self._service_seconds = DEFAULT_SERVICE_SECONDS
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+
+    @property
+    def workers(self) -> int:
+        # Resolved late so the render pool size is final
+        if self._workers is None:
+            from render_pool import render_pool
+            self._workers = config.JOB_WORKERS or render_pool.workers
+        return self._workers
+
+    def start(self):
+        """Start the worker tasks; call from the running event loop"""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        """Cancel the workers; queued and running jobs are dropped"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+    def depth(self) -> int:
+        """Return the number of jobs waiting for a worker"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def retry_after(self) -> int:
+        """Return roughly how many seconds it takes the workers to drain the queue"""
+        backlog = self.depth() + self._running
+        return max(1, math.ceil(backlog * self._service_seconds / self.workers))
+
+    def submit(self, payload: Any) -> Job:
+        """Queue a job and return it, or raise QueueFull"""
+        if self._queue is None:
+            raise RuntimeError("Job queue is not started")
+        self._expire()
+        job = Job(payload)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise QueueFull(self.retry_after()) from None
+        self._jobs[job.id] = job
+        self.submitted += 1
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Return a job by id, or None if it is unknown or expired"""
+        self._expire()
+        return self._jobs.get(job_id)
+
+    async def wait(self, job: Job, timeout: float) -> Job:
+        """Wait up to ``timeout`` seconds for a job to finish and return it"""
+        if timeout > 0 and job.state != "done":
+            try:
+                await asyncio.wait_for(job._done.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return job
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "max_size": self.max_size,
+            "queued": self.depth(),
+            "running": self._running,
+            "retained": len(self._jobs),
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "completed": self.completed,
+        }
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.result_ttl
+        while self._finished and self._finished[0][0] < cutoff:
+            self._jobs.pop(self._finished.popleft()[1], None)
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            job.state = "running"
+            job.started = time.monotonic()
+            self._running += 1
+            try:
+                job.result = await self.run(job.payload)
+            except Exception as e:
+                job.result = {"status": "error", "message": f"Job failed: {str(e)}"}
+            finally:
+                self._running -= 1
+            job.finished = time.monotonic()
+            job.state = "done"
+            job._done.set()
+
+            service = job.finished - job.started
+            # Moving average of run time, for Retry-After
+            self._service_seconds += (service - self._service_seconds) * 0.2
+            metrics.job(job.started - job.created, service)
+            self.completed += 1
+            self._finished.append((job.finished, job.id))
@@ -1,20 +1,178 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from starlette.datastructures import Headers
+from starlette.staticfiles import NotModifiedResponse
 from pydantic import BaseModel
-from simple_drawer import generate_simple_drawing
+from contextlib import asynccontextmanager
+from typing import Dict, Any, List, Literal, Optional
+from simple_drawer import (CANVAS_HEIGHT, CANVAS_WIDTH, ScriptRunner, drawing_key, parse_prompt,
+                           write_drawing)
+from prompt_parser import COLORS
+from encoders import MEDIA_TYPES
+from artifact_store import artifact_store
+from render_cache import render_cache, spec_key
+from render_pool import WARMUP_PROMPTS, render_pool
+from job_queue import JobQueue, QueueFull
+from singleflight import SingleFlight
+from tiled_renderer import TiledRender
+from animation import MAX_FPS, render_animation
+import config
+import encoders
+import metrics
+import asyncio
+import base64
+import json
 import os
+import re
+import time
 from pathlib import Path
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Start and warm the render workers before accepting traffic
+    render_pool.start()
+    for prompt in WARMUP_PROMPTS:
+        parse_prompt(prompt)
+    collector = asyncio.create_task(artifact_store.run_collector())
+    job_queue.start()
+    yield
+    await job_queue.stop()
+    collector.cancel()
+    render_pool.shutdown()
+
+app = FastAPI(lifespan=lifespan)
 
 # Create static directory if it doesn't exist
-static_dir = Path("static")
+static_dir = Path(config.STATIC_DIR)
 static_dir.mkdir(parents=True, exist_ok=True)
 
+# The frontend page ships with the backend source, wherever STATIC_DIR points
+INDEX_HTML = Path(__file__).resolve().parent / "static" / "index.html"
+
+# Generated drawings are named by a hash of their content (or of the spec
+# that deterministically renders them), so a name never changes meaning
+DRAWING_NAME = re.compile(r"drawing_([0-9a-f]{32})\.(?:png|webp|svg)")
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weakly compare an If-None-Match header with an ETag"""
+    if not if_none_match:
+        return False
+    tags = {tag.strip() for tag in if_none_match.split(",")}
+    if "*" in tags:
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    return any((tag[2:] if tag.startswith("W/") else tag) == opaque for tag in tags)
+
+class ArtifactStaticFiles(StaticFiles):
+    """Static files that mark generated drawings as referenced when served
+    
+    Generated drawings are served with their hash as a strong ETag and may
+    be cached forever; conditional GETs for them are answered with 304.
+    """
+    
+    async def get_response(self, path: str, scope):
+        artifact_store.touch(os.path.basename(path))
+        return await super().get_response(path, scope)
+    
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200) -> Response:
+        match = DRAWING_NAME.fullmatch(os.path.basename(full_path))
+        if match is None:
+            return super().file_response(full_path, stat_result, scope, status_code)
+        
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result,
+                                method=scope["method"])
+        response.headers["etag"] = f'"{match.group(1)}"'
+        response.headers["cache-control"] = IMMUTABLE
+        if etag_matches(Headers(scope=scope).get("if-none-match"), response.headers["etag"]):
+            return NotModifiedResponse(response.headers)
+        return response
+
 # Mount static files
-app.mount("/static", StaticFiles(directory="static"), name="static")
+app.mount("/static", ArtifactStaticFiles(directory=config.STATIC_DIR), name="static")
+
+class ServerTimingMiddleware:
+    """Adds a Server-Timing header with the stage durations of each request"""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        
+        timings = metrics.start_request()
+        start = time.perf_counter()
+        
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                value = metrics.server_timing(timings, time.perf_counter() - start)
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"server-timing", value.encode("latin-1"))
+                ]
+            await send(message)
+        
+        await self.app(scope, receive, send_with_timing)
+
+if metrics.ENABLED:
+    app.add_middleware(ServerTimingMiddleware)
+
+def cache_metrics():
+    """Export the render cache and artifact store counters"""
+    cache = render_cache.stats()
+    artifacts = artifact_store.stats()
+    return [
+        ("twodee_cache_lookups_total", "Render cache lookups by outcome", "counter", [
+            ({"outcome": "memory_hit"}, cache["memory_hits"]),
+            ({"outcome": "disk_hit"}, cache["disk_hits"]),
+            ({"outcome": "miss"}, cache["misses"]),
+        ]),
+        ("twodee_cache_memory_bytes", "Size of the in-memory render cache", "gauge", [
+            ({}, cache["memory_bytes"]),
+        ]),
+        ("twodee_artifact_bytes", "Size of generated files in the static directory", "gauge", [
+            ({}, artifacts["bytes"]),
+        ]),
+        ("twodee_artifact_reclaimed_bytes_total", "Bytes deleted by the artifact collector", "counter", [
+            ({}, artifacts["bytes_reclaimed"]),
+        ]),
+    ]
+
+metrics.register_collector(cache_metrics)
+
+# Identical /api/generate requests in flight at the same time share one render
+generate_flights = SingleFlight()
+
+def flight_metrics():
+    """Export how many renders were saved by coalescing requests"""
+    flights = generate_flights.stats()
+    return [
+        ("twodee_renders_coalesced_total", "Requests that shared an identical in-flight render", "counter", [
+            ({"endpoint": "generate"}, flights["joined"]),
+        ]),
+    ]
+
+metrics.register_collector(flight_metrics)
+
+def job_metrics():
+    """Export the async job queue counters"""
+    jobs = job_queue.stats()
+    return [
+        ("twodee_job_queue_depth", "Jobs waiting for a render worker", "gauge", [
+            ({}, jobs["queued"]),
+        ]),
+        ("twodee_jobs_running", "Jobs being rendered", "gauge", [
+            ({}, jobs["running"]),
+        ]),
+        ("twodee_jobs_total", "Async jobs by outcome", "counter", [
+            ({"outcome": "completed"}, jobs["completed"]),
+            ({"outcome": "rejected"}, jobs["rejected"]),
+        ]),
+    ]
+
+metrics.register_collector(job_metrics)
 
 # CORS middleware configuration
 app.add_middleware(
@@ -23,43 +181,443 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Lets the frontend read ETags to send back in If-None-Match
+    expose_headers=["ETag"],
 )
 
 class DrawingPrompt(BaseModel):
     prompt: str
+    # "url" writes a file and returns its URL; "image" returns the PNG itself
+    # and "base64" embeds it in the JSON, both without touching the disk
+    response: Literal["url", "image", "base64"] = "url"
+    # "svg" returns vector output with no raster step
+    format: Literal["png", "webp", "svg"] = "png"
+    # Encoder preset for raster formats; defaults to TWODEE_ENCODER_PRESET
+    encoder: Optional[Literal["fast", "default", "small"]] = None
+    # "crop" returns only the drawn region, "fit" scales the drawing to fill the image
+    framing: Literal["canvas", "crop", "fit"] = "canvas"
+
+class JobPrompt(BaseModel):
+    prompt: str
+    format: Literal["png", "webp", "svg"] = "png"
+    encoder: Optional[Literal["fast", "default", "small"]] = None
+    framing: Literal["canvas", "crop", "fit"] = "canvas"
+
+class BatchPrompt(BaseModel):
+    prompts: List[str]
+    format: Literal["png", "webp", "svg"] = "png"
+    encoder: Optional[Literal["fast", "default", "small"]] = None
+    framing: Literal["canvas", "crop", "fit"] = "canvas"
+
+def output_options(format: str = "png", encoder: Optional[str] = None,
+                   width: Optional[int] = None, height: Optional[int] = None,
+                   framing: str = "canvas") -> Dict[str, Any]:
+    """Collect render_drawing options, applying the default encoder preset"""
+    options = {"format": format, "encoder": encoder or config.ENCODER_PRESET}
+    if width is not None:
+        options["width"] = width
+    if height is not None:
+        options["height"] = height
+    if framing != "canvas":
+        options["framing"] = framing
+    return options
+
+def parse_timed(text: str) -> Dict[str, Any]:
+    """Parse a prompt, timing it as the parse stage"""
+    with metrics.stage("parse") as timer:
+        shape_info = parse_prompt(text)
+        timer.shape = shape_info["type"]
+    return shape_info
+
+def static_url(image_path: str) -> str:
+    """Return the URL a generated file is served at"""
+    return "/static/" + os.path.basename(image_path)
+
+async def render_to_path(shape_info: Dict[str, Any], **options) -> str:
+    """Return the static path for a spec, rendering in a worker on a cache miss"""
+    format = options.get("format", "png")
+    if not config.CACHE_ENABLED:
+        data = await render_pool.render(shape_info, **options)
+        with metrics.stage("write", shape_info["type"]):
+            return write_drawing(data, format)
+    
+    key = drawing_key(shape_info, **options)
+    image_path = render_cache.get_path(key, format)
+    if image_path is None:
+        data = await render_pool.render(shape_info, **options)
+        with metrics.stage("write", shape_info["type"]):
+            image_path = render_cache.store(key, data, format)
+    return image_path
+
+def generate_etag(key: str, response: str) -> Optional[str]:
+    """Return the ETag of a /api/generate response for a drawing key
+    
+    The image itself gets a strong tag; JSON bodies also carry the prompt
+    text, so theirs is weak. URLs only get one when files are named by key,
+    so a 304 can check that the file is still there.
+    """
+    if response == "image":
+        return f'"{key[:32]}"'
+    if response == "url" and not config.CACHE_ENABLED:
+        return None
+    return f'W/"{key[:32]}"'
+
+def drawing_on_disk(key: str, format: str) -> bool:
+    """Return whether a drawing's file is on disk, before answering 304 with its URL
+    
+    The artifact index is otherwise trusted; here the file is checked, and
+    forgotten if it is gone, so the render path writes it again.
+    """
+    image_path = render_cache.get_path(key, format)
+    if image_path is None:
+        return False
+    if os.path.exists(image_path):
+        return True
+    artifact_store.forget(os.path.basename(image_path))
+    return False
+
+async def render_to_bytes(shape_info: Dict[str, Any], disk: bool = False, **options) -> bytes:
+    """Return the encoded image for a spec
+    
+    Unless ``disk`` or TWODEE_CACHE_SHARED is set, only the memory tier of
+    the cache is used and nothing touches the filesystem.
+    """
+    if not config.CACHE_ENABLED:
+        return await render_pool.render(shape_info, **options)
+    disk = disk or config.CACHE_SHARED
+    
+    format = options.get("format", "png")
+    key = drawing_key(shape_info, **options)
+    data = render_cache.get(key, format, disk=disk)
+    if data is None:
+        data = await render_pool.render(shape_info, **options)
+        if disk:
+            with metrics.stage("write", shape_info["type"]):
+                render_cache.store(key, data, format)
+        else:
+            render_cache.put(key, data)
+    return data
 
 @app.post("/api/generate")
-async def generate_drawing(prompt: DrawingPrompt):
+async def generate_drawing(prompt: DrawingPrompt, request: Request, response: Response):
+    shape = ""
     try:
-        # Generate the drawing
-        result = generate_simple_drawing(prompt.prompt)
+        # Generate the drawing off the event loop
+        shape_info = parse_timed(prompt.prompt)
+        shape = shape_info["type"]
+        options = output_options(prompt.format, prompt.encoder, framing=prompt.framing)
+        key = drawing_key(shape_info, **options)
         
-        if result["status"] == "success":
-            # Get the relative path for the frontend
-            image_path = result["image_path"]
-            relative_path = "/" + image_path
-            
+        # A client that already has this drawing gets no render and no body
+        etag = generate_etag(key, prompt.response)
+        if etag is not None and etag_matches(request.headers.get("if-none-match"), etag) and (
+                prompt.response != "url" or drawing_on_disk(key, prompt.format)):
+            metrics.count("generate", shape)
+            return Response(status_code=304, headers={"etag": etag})
+        
+        if prompt.response != "url":
+            data = await generate_flights.do(("bytes", key), render_to_bytes, shape_info, **options)
+            metrics.count("generate", shape)
+            media_type = MEDIA_TYPES[prompt.format]
+            if prompt.response == "image":
+                return Response(content=data, media_type=media_type, headers={"etag": etag})
+            response.headers["etag"] = etag
             return {
                 "status": "success",
-                "message": result["message"],
-                "image_url": relative_path
-            }
-        else:
-            return {
-                "status": "error",
-                "message": result["message"]
+                "message": f"Drawing created for: {prompt.prompt}",
+                "image_data": base64.b64encode(data).decode("ascii"),
+                "media_type": media_type
             }
+        
+        image_path = await generate_flights.do(("path", key), render_to_path, shape_info, **options)
+        metrics.count("generate", shape)
+        if etag is not None:
+            response.headers["etag"] = etag
+        
+        return {
+            "status": "success",
+            "message": f"Drawing created for: {prompt.prompt}",
+            "image_url": static_url(image_path)
+        }
             
     except Exception as e:
+        metrics.count("generate", shape, error=True)
         return {
             "status": "error",
             "message": f"Failed to generate drawing: {str(e)}"
         }
 
+async def run_job(prompt: JobPrompt) -> Dict[str, Any]:
+    """Render a queued prompt to a file; runs in a job worker"""
+    shape = ""
+    try:
+        shape_info = parse_timed(prompt.prompt)
+        shape = shape_info["type"]
+        options = output_options(prompt.format, prompt.encoder, framing=prompt.framing)
+        image_path = await render_to_path(shape_info, **options)
+        metrics.count("job", shape)
+        return {
+            "status": "success",
+            "message": f"Drawing created for: {prompt.prompt}",
+            "image_url": static_url(image_path)
+        }
+    except Exception as e:
+        metrics.count("job", shape, error=True)
+        return {
+            "status": "error",
+            "message": f"Failed to generate drawing: {str(e)}"
+        }
+
+# Async jobs: a fixed number of renders run at once, the rest wait in a bounded queue
+job_queue = JobQueue(run_job)
+
+@app.post("/api/jobs", status_code=202)
+async def submit_job(prompt: JobPrompt):
+    """Queue a drawing and return its job id without waiting for the render
+    
+    Answers 429 with a Retry-After header when the queue is full.
+    """
+    try:
+        job = job_queue.submit(prompt)
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e),
+                            headers={"Retry-After": str(e.retry_after)})
+    return {**job.to_dict(), "job_url": f"/api/jobs/{job.id}"}
+
+@app.get("/api/jobs/stats")
+async def job_stats():
+    return job_queue.stats()
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = Query(0, ge=0)):
+    """Return a job's state, and its result once done
+    
+    With ``wait`` the request is held until the job finishes or that many
+    seconds (at most TWODEE_JOB_MAX_WAIT) pass.
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    job = await job_queue.wait(job, min(wait, config.JOB_MAX_WAIT))
+    return job.to_dict()
+
+@app.post("/api/generate/batch")
+async def generate_batch(batch: BatchPrompt):
+    """Render many prompts in parallel, streaming NDJSON lines as each finishes"""
+    
+    options = output_options(batch.format, batch.encoder, framing=batch.framing)
+    
+    async def render_group(key: str, shape_info: Dict[str, Any]):
+        try:
+            return key, await render_to_path(shape_info, **options), None
+        except Exception as e:
+            return key, None, str(e)
+    
+    async def results():
+        # Group input indices by parsed spec so duplicates render only once
+        groups: Dict[str, List[int]] = {}
+        shapes: Dict[str, str] = {}
+        tasks = []
+        try:
+            for index, text in enumerate(batch.prompts):
+                shape_info = parse_timed(text)
+                key = drawing_key(shape_info, **options)
+                if key not in groups:
+                    groups[key] = []
+                    shapes[key] = shape_info["type"]
+                    tasks.append(asyncio.create_task(render_group(key, shape_info)))
+                groups[key].append(index)
+            
+            # Emit results in completion order, tagged with the input index
+            for next_done in asyncio.as_completed(tasks):
+                key, image_path, error = await next_done
+                for index in groups[key]:
+                    metrics.count("batch", shapes[key], error=error is not None)
+                    if error is None:
+                        line = {
+                            "index": index,
+                            "status": "success",
+                            "message": f"Drawing created for: {batch.prompts[index]}",
+                            "image_url": static_url(image_path)
+                        }
+                    else:
+                        line = {
+                            "index": index,
+                            "status": "error",
+                            "message": f"Failed to generate drawing: {error}"
+                        }
+                    yield json.dumps(line) + "\n"
+        finally:
+            # Stop outstanding renders if the client goes away
+            for task in tasks:
+                task.cancel()
+    
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+@app.post("/api/scripts")
+async def draw_script(
+    request: Request,
+    color: str = "black",
+    format: Literal["png", "webp"] = "png",
+    encoder: Optional[Literal["fast", "default", "small"]] = None,
+    response: Literal["url", "image"] = "url",
+):
+    """Draw a command script sent as the raw request body
+    
+    The script is tokenized and drawn as it arrives, so it is never held in
+    memory whole and can be far larger than a prompt. Drawing runs in a
+    thread, one piece of the body at a time.
+    """
+    if color not in COLORS:
+        raise HTTPException(status_code=400, detail=f"Unknown color: {color}")
+    encoder = encoder or config.ENCODER_PRESET
+    runner = ScriptRunner(COLORS[color], palette=bool(encoders.preset(format, encoder).get("palette")))
+    received = 0
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > config.SCRIPT_MAX_BYTES:
+                raise HTTPException(status_code=413,
+                                    detail=f"Scripts are limited to {config.SCRIPT_MAX_BYTES} bytes")
+            await asyncio.to_thread(runner.feed, chunk)
+        data = await asyncio.to_thread(runner.finish, format, encoder)
+        for stage, seconds in runner.timings.items():
+            metrics.record(stage, seconds, "custom")
+        metrics.count("script", "custom")
+        
+        if response == "image":
+            return Response(content=data, media_type=MEDIA_TYPES[format])
+        with metrics.stage("write", "custom"):
+            image_path = write_drawing(data, format)
+        return {
+            "status": "success",
+            "message": f"Drawing created for a script of {runner.count} commands",
+            "image_url": static_url(image_path)
+        }
+    
+    except HTTPException:
+        metrics.count("script", "custom", error=True)
+        raise
+    except Exception as e:
+        metrics.count("script", "custom", error=True)
+        return {
+            "status": "error",
+            "message": f"Failed to draw script: {str(e)}"
+        }
+    finally:
+        # Returns the canvas if the script did not finish
+        runner.drawer.release()
+
+@app.get("/api/render")
+async def render_at_size(
+    prompt: str,
+    width: int = Query(CANVAS_WIDTH, ge=1),
+    height: int = Query(CANVAS_HEIGHT, ge=1),
+    scale: float = Query(1.0, gt=0),
+    format: Literal["png", "webp", "svg"] = "png",
+    encoder: Optional[Literal["fast", "default", "small"]] = None,
+    framing: Literal["canvas", "crop", "fit"] = "canvas",
+):
+    """Render a drawing at width x height times scale and return the image
+    
+    The geometry is scaled to the target size rather than resizing a bitmap,
+    and every (drawing, size) variant is cached separately. With framing
+    "crop" the image is cut down to the drawn region at that scale.
+    
+    Very large PNGs are rendered in bands by the render workers and
+    streamed as they are ready; these are not cached.
+    """
+    out_width = max(1, round(width * scale))
+    out_height = max(1, round(height * scale))
+    tiled = format == "png" and (out_width * out_height > config.TILED_MIN_PIXELS or
+                                 max(out_width, out_height) > config.RENDER_MAX_SIDE)
+    max_side = config.TILED_MAX_SIDE if format == "png" else config.RENDER_MAX_SIDE
+    if max(out_width, out_height) > max_side:
+        raise HTTPException(status_code=400,
+                            detail=f"Output size is limited to {max_side}px per side")
+    
+    shape = ""
+    try:
+        shape_info = parse_timed(prompt)
+        shape = shape_info["type"]
+        if tiled:
+            # Drawing and layout are CPU work; keep them off the event loop
+            render = await asyncio.to_thread(TiledRender, shape_info, out_width, out_height,
+                                             framing, encoder or config.ENCODER_PRESET)
+            metrics.count("render", shape)
+            return StreamingResponse(render.chunks(), media_type=MEDIA_TYPES[format])
+        
+        options = output_options(format, encoder, out_width, out_height, framing)
+        data = await render_to_bytes(shape_info, disk=True, **options)
+        metrics.count("render", shape)
+        return Response(content=data, media_type=MEDIA_TYPES[format])
+    
+    except Exception as e:
+        metrics.count("render", shape, error=True)
+        return {
+            "status": "error",
+            "message": f"Failed to render drawing: {str(e)}"
+        }
+
+@app.get("/api/animate")
+async def animate_drawing(
+    prompt: str,
+    format: Literal["apng", "gif"] = "apng",
+    fps: int = Query(config.ANIMATION_FPS, ge=1, le=MAX_FPS),
+    every: int = Query(1, ge=1),
+    max_frames: int = Query(config.ANIMATION_MAX_FRAMES, ge=1, le=config.ANIMATION_MAX_FRAMES),
+    width: int = Query(CANVAS_WIDTH, ge=1, le=config.RENDER_MAX_SIDE),
+    height: int = Query(CANVAS_HEIGHT, ge=1, le=config.RENDER_MAX_SIDE),
+    encoder: Optional[Literal["fast", "default", "small"]] = None,
+    framing: Literal["canvas", "crop", "fit"] = "canvas",
+):
+    """Return an animation of the drawing being drawn, a frame every ``every`` moves
+    
+    Long drawings take more moves per frame so there are at most
+    ``max_frames`` frames. Animations are kept in the memory cache.
+    """
+    shape = ""
+    try:
+        shape_info = parse_timed(prompt)
+        shape = shape_info["type"]
+        options = {"format": format, "encoder": encoder or config.ENCODER_PRESET, "width": width,
+                   "height": height, "framing": framing, "fps": fps, "every": every,
+                   "max_frames": max_frames}
+        key = spec_key(shape_info, {"animation": options})
+        data = render_cache.get(key, format, disk=False) if config.CACHE_ENABLED else None
+        if data is None:
+            data = await render_pool.run(render_animation, shape_info, **options)
+            if config.CACHE_ENABLED:
+                render_cache.put(key, data)
+        metrics.count("animate", shape)
+        return Response(content=data, media_type=MEDIA_TYPES[format])
+    
+    except Exception as e:
+        metrics.count("animate", shape, error=True)
+        return {
+            "status": "error",
+            "message": f"Failed to animate drawing: {str(e)}"
+        }
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    return render_cache.stats()
+
+@app.get("/api/artifacts/stats")
+async def artifact_stats():
+    return artifact_store.stats()
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Stage histograms and counters in the Prometheus text format"""
+    if not metrics.ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return Response(content=metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/api/health")
 async def health_check():
     return {"status": "healthy"}
 
 @app.get("/")
 async def read_root():
-    return FileResponse('static/index.html') 
\ No newline at end of file
+    return FileResponse(INDEX_HTML)
\ No newline at end of file
@@ -0,0 +1,218 @@
+"""
+Request metrics in the Prometheus text format, plus Server-Timing values.
+
+Stage durations (parse, draw, encode, write) are recorded in histograms
+labeled by stage and shape type, alongside request and error counters per
+endpoint and shape, and the queue wait and run time of async jobs.
+Durations recorded while handling a request are also collected for that
+request's ``Server-Timing`` header.
+
+With ``TWODEE_METRICS_ENABLED=0`` nothing is recorded: ``stage`` returns a
+shared no-op timer and ``record``/``count`` return immediately.
+
+Metrics are per process; with several uvicorn workers each one exposes its
+own values.
+"""
+
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import config
+
+ENABLED = config.METRICS_ENABLED
+
+# Histogram bucket upper bounds in seconds
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# Jobs can wait in the queue for much longer than a stage takes
+JOB_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{_escape(str(v))}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labels, labels)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # labels -> [count per bucket..., count above the last bucket, sum]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.labels + ("le",)
+        with self._lock:
+            for labels, series in sorted(self._values.items()):
+                total = 0
+                for bound, count in zip(self.buckets + (float("inf"),), series):
+                    total += count
+                    lines.append(f"{self.name}_bucket{_labels(names, labels + (_number(bound),))} {total}")
+                lines.append(f"{self.name}_sum{_labels(self.labels, labels)} {_number(series[-1])}")
+                lines.append(f"{self.name}_count{_labels(self.labels, labels)} {total}")
+        return lines
+
+
+STAGE_SECONDS = Histogram("twodee_stage_seconds", "Time spent in each drawing stage",
+                          ("stage", "shape"))
+REQUESTS = Counter("twodee_requests_total", "Drawing requests", ("endpoint", "shape"))
+ERRORS = Counter("twodee_errors_total", "Drawing requests that failed", ("endpoint", "shape"))
+
+JOB_WAIT_SECONDS = Histogram("twodee_job_wait_seconds", "Time jobs spent queued before a worker took them",
+                             buckets=JOB_BUCKETS)
+JOB_SERVICE_SECONDS = Histogram("twodee_job_service_seconds", "Time workers spent running each job",
+                                buckets=JOB_BUCKETS)
+
+_METRICS = [STAGE_SECONDS, REQUESTS, ERRORS, JOB_WAIT_SECONDS, JOB_SERVICE_SECONDS]
+
+# Functions returning (name, help, type, [(labels dict, value), ...]) tuples
+# for values owned elsewhere, such as the render cache counters
+_collectors: List[Callable[[], Iterable[tuple]]] = []
+
+# Stage durations of the request being handled, for Server-Timing
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("twodee_request_timings",
+                                                                      default=None)
+
+
+def register_collector(collector):
+    """Add a function whose samples are appended to every scrape"""
+    _collectors.append(collector)
+
+
+def record(stage: str, seconds: float, shape: str = ""):
+    """Record a stage duration"""
+    if not ENABLED:
+        return
+    STAGE_SECONDS.observe(seconds, stage, shape)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+def count(endpoint: str, shape: str = "", error: bool = False):
+    """Count a drawing request, and an error if it failed"""
+    if not ENABLED:
+        return
+    REQUESTS.inc(endpoint, shape)
+    if error:
+        ERRORS.inc(endpoint, shape)
+
+
+def job(wait: float, service: float):
+    """Record how long a job was queued and how long it took to run"""
+    if not ENABLED:
+        return
+    JOB_WAIT_SECONDS.observe(wait)
+    JOB_SERVICE_SECONDS.observe(service)
+
+
+class _Stage:
+    __slots__ = ("name", "shape", "_start")
+
+    def __init__(self, name: str, shape: str):
+        self.name = name
+        self.shape = shape
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter() - self._start, self.shape)
+
+
+class _NoopStage:
+    __slots__ = ("shape",)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NOOP_STAGE = _NoopStage()
+
+
+def stage(name: str, shape: str = ""):
+    """Time a block as a stage; set ``.shape`` on the result if it is known late"""
+    if not ENABLED:
+        return _NOOP_STAGE
+    return _Stage(name, shape)
+
+
+def start_request() -> Dict[str, float]:
+    """Start collecting stage durations for the current request"""
+    timings: Dict[str, float] = {}
+    _request_timings.set(timings)
+    return timings
+
+
+def server_timing(timings: Dict[str, float], total: Optional[float] = None) -> str:
+    """Format stage durations as a Server-Timing header value (milliseconds)"""
+    parts = [f"{name};dur={seconds * 1000:.3f}" for name, seconds in timings.items()]
+    if total is not None:
+        parts.append(f"total;dur={total * 1000:.3f}")
+    return ", ".join(parts)
+
+
+def render() -> str:
+    """Return every metric in the Prometheus text exposition format"""
+    lines: List[str] = []
+    for metric in _METRICS:
+        lines.extend(metric.render())
+    for collector in _collectors:
+        for name, help, kind, samples in collector():
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{_labels(tuple(labels), tuple(labels.values()))} {_number(value)}")
+    return "\n".join(lines) + "\n"
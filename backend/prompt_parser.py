@@ -0,0 +1,289 @@
+"""
+Shared prompt tokenizer and parser for the drawing backends.
+
+A prompt is read in one linear pass, word by word, with a precompiled pattern
+that emits typed tokens:
+
+    color    a color name anywhere in the text ("red" also matches "reddish")
+    shape    a shape keyword anywhere in the text
+    fill     "fill" anywhere in the text ("filled", "fill it")
+    number   a run of digits
+    command  a movement word with its optional numeric argument
+
+Color and shape keywords keep the substring matching the parsers always
+used, so existing prompts parse (and cache) exactly as before; commands only
+match whole words. ``parse`` folds the tokens into a ``ParsedPrompt`` and
+memoizes the result, and each backend picks colors and shapes from it in its
+own priority order.
+
+``Tokenizer`` turns words into tokens one at a time, holding a command back
+until the next word shows whether it has an argument. ``parse`` runs it over
+a whole prompt, and ``CommandStream`` over a script that arrives in pieces,
+such as an upload, keeping no more than the current piece in memory.
+
+``scene`` splits a prompt naming several shapes ("a red circle next to a
+blue house") into clauses at connecting words and parses each one on its
+own, so every shape keeps its own color, size and fill.
+"""
+
+import re
+from functools import lru_cache
+from typing import FrozenSet, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+# Color names and their hex values, in priority order
+COLORS = {
+    "red": "#FF0000", "blue": "#0000FF", "green": "#00FF00",
+    "yellow": "#FFFF00", "purple": "#800080", "orange": "#FFA500",
+    "pink": "#FFC0CB", "brown": "#A52A2A", "black": "#000000",
+    "gray": "#808080", "grey": "#808080"
+}
+
+SHAPES = ("circle", "square", "rectangle", "triangle", "star",
+          "house", "tree", "flower", "spiral")
+
+# Movement words -> (canonical command, default amount)
+COMMANDS = {
+    "forward": ("forward", 50), "move": ("forward", 50), "go": ("forward", 50),
+    "back": ("back", 50), "backward": ("back", 50),
+    "left": ("left", 90), "turn": ("left", 90),
+    "right": ("right", 90),
+    "up": ("penup", 0), "penup": ("penup", 0),
+    "down": ("pendown", 0), "pendown": ("pendown", 0),
+}
+
+# Prompts longer than this (command scripts) are parsed but not memoized
+MEMO_MAX_LENGTH = 4096
+
+# Longer words are never a command's argument; no amount is as long
+MAX_WORD_LENGTH = 64
+
+# Words joining the clauses of a scene -> where the next shape goes relative
+# to the previous one ("a above b" puts b below a)
+CONNECTORS = {
+    ",": "right", ";": "right", "and": "right", "then": "right", "plus": "right",
+    "with": "right", "next to": "right", "beside": "right", "besides": "right",
+    "near": "right", "left of": "right", "right of": "right",
+    "above": "below", "over": "below", "on top of": "below",
+    "below": "above", "under": "above", "beneath": "above",
+}
+
+
+def _alternation(words: Iterable[str]) -> str:
+    # Longest first so one keyword never shadows a longer one at the same spot
+    return "|".join(re.escape(w) for w in sorted(words, key=len, reverse=True))
+
+
+# Keywords are matched in a lookahead so overlapping ones ("grayellow") are
+# all seen
+_WORD_RE = re.compile(
+    rf"(?P<number>\d+)"
+    rf"|(?=(?P<color>{_alternation(COLORS)})|(?P<shape>{_alternation(SHAPES)})|(?P<fill>fill))"
+)
+
+
+_CLAUSE_RE = re.compile(
+    rf"\s*([,;]|\b(?:{_alternation(w for w in CONNECTORS if w.isalpha() or ' ' in w)})\b)\s*"
+)
+
+
+class Token(NamedTuple):
+    kind: str
+    text: str
+    value: Optional[int] = None
+
+
+class ParsedPrompt(NamedTuple):
+    text: str
+    colors: FrozenSet[str]
+    shapes: FrozenSet[str]
+    filled: bool
+    number: Optional[int]
+    commands: Tuple[Tuple[str, int], ...]
+
+    def color(self, order: Iterable[str] = COLORS, default: Optional[str] = None) -> Optional[str]:
+        """Return the first color in ``order`` that the prompt mentions"""
+        return next((c for c in order if c in self.colors), default)
+
+    def shape(self, order: Iterable[str] = SHAPES) -> Optional[str]:
+        """Return the first shape in ``order`` that the prompt mentions"""
+        return next((s for s in order if s in self.shapes), None)
+
+
+@lru_cache(maxsize=4096)
+def _word_tokens(word: str) -> Tuple["Token", ...]:
+    """Return the keyword and number tokens in one word; scripts reuse a small vocabulary"""
+    tokens = []
+    for match in _WORD_RE.finditer(word):
+        kind = match.lastgroup
+        text = match.group(kind)
+        tokens.append(Token(kind, text, int(text) if kind == "number" else None))
+    return tuple(tokens)
+
+
+@lru_cache(maxsize=4096)
+def _command_token(command: str, word: Optional[str]) -> Token:
+    """Return the token of a command word followed by ``word``"""
+    name, amount = COMMANDS[command]
+    if amount and word is not None and len(word) <= MAX_WORD_LENGTH and word.isdigit():
+        amount = int(word)
+    return Token("command", name, amount)
+
+
+class Tokenizer:
+    """Turns the words of a prompt into typed tokens in a single pass
+
+    Keywords contain no whitespace, so the text is fed in as words, in one
+    or more batches, and each distinct word is scanned once. A command's
+    token comes with the next word: its value is that word when it is a
+    number (and the command takes an amount), and its default amount
+    otherwise.
+    """
+    __slots__ = ("_command",)
+
+    def __init__(self):
+        self._command: Optional[str] = None
+
+    def feed(self, words: Iterable[str]) -> List[Token]:
+        """Return the tokens completed by the next words"""
+        tokens: List[Token] = []
+        command = self._command
+        for word in words:
+            if command is not None:
+                tokens.append(_command_token(command, word))
+            if word in COMMANDS:
+                command = word
+            else:
+                command = None
+                tokens += _word_tokens(word)
+        self._command = command
+        return tokens
+
+    def close(self) -> List[Token]:
+        """Return the tokens left at the end of the text"""
+        command, self._command = self._command, None
+        return [] if command is None else [_command_token(command, None)]
+
+
+def _parse(prompt: str) -> ParsedPrompt:
+    colors = set()
+    shapes = set()
+    filled = False
+    number = None
+    commands = []
+
+    tokenizer = Tokenizer()
+    tokens = tokenizer.feed(prompt.split())
+    tokens += tokenizer.close()
+    for kind, text, value in tokens:
+        if kind == "command":
+            commands.append((text, value))
+        elif kind == "number":
+            if number is None:
+                number = value
+        elif kind == "color":
+            colors.add(text)
+        elif kind == "shape":
+            shapes.add(text)
+        else:
+            filled = True
+
+    return ParsedPrompt(prompt, frozenset(colors), frozenset(shapes), filled, number,
+                        tuple(commands))
+
+
+_parse_memo = lru_cache(maxsize=1024)(_parse)
+
+
+def parse(prompt: str) -> ParsedPrompt:
+    """Tokenize and parse a prompt, memoizing short prompts"""
+    prompt = prompt.lower()
+    if len(prompt) > MEMO_MAX_LENGTH:
+        return _parse(prompt)
+    return _parse_memo(prompt)
+
+
+class CommandStream:
+    """Incremental command tokenizer for scripts that arrive in pieces
+
+    ``feed`` takes the next piece of text and yields the (command, amount)
+    pairs it completes; a word cut off at the end of the piece is held back
+    until the next one, and ``close`` yields what is left. The words go
+    through the same ``Tokenizer`` as ``parse``, and all tokens but commands
+    are skipped.
+    """
+    __slots__ = ("_tail", "_tokenizer")
+
+    def __init__(self):
+        self._tail = ""
+        self._tokenizer = Tokenizer()
+
+    def feed(self, text: str) -> Iterator[Tuple[str, int]]:
+        """Yield the commands completed by the next piece of the script"""
+        text = self._tail + text.lower()
+        words = text.split()
+        # The last word may go on in the next piece
+        self._tail = words.pop() if words and not text[-1].isspace() else ""
+        # No need to keep all of a word that cannot be a command or amount
+        words = [word[:MAX_WORD_LENGTH + 1] for word in words]
+        self._tail = self._tail[:MAX_WORD_LENGTH + 1]
+        yield from self._commands(self._tokenizer.feed(words))
+
+    def close(self) -> Iterator[Tuple[str, int]]:
+        """Yield the commands left once the script has ended"""
+        tokens = self._tokenizer.feed([self._tail] if self._tail else [])
+        tokens += self._tokenizer.close()
+        self._tail = ""
+        yield from self._commands(tokens)
+
+    @staticmethod
+    def _commands(tokens: List[Token]) -> Iterator[Tuple[str, int]]:
+        for kind, text, value in tokens:
+            if kind == "command":
+                yield text, value
+
+
+class Clause(NamedTuple):
+    parsed: ParsedPrompt
+    # Where this shape goes relative to the previous one: "right", "below" or "above"
+    placement: str
+
+
+@lru_cache(maxsize=1024)
+def _scene(prompt: str) -> Tuple[Clause, ...]:
+    parts = _CLAUSE_RE.split(prompt)
+    clauses: list = []
+    placement = "right"
+    for index in range(0, len(parts), 2):
+        parsed = _parse(parts[index])
+        if parsed.shapes:
+            clauses.append(Clause(parsed, placement))
+        elif clauses:
+            # "a house with a red roof": details without a shape describe the last one
+            last = clauses[-1].parsed
+            clauses[-1] = Clause(last._replace(
+                colors=last.colors or parsed.colors,
+                filled=last.filled or parsed.filled,
+                number=last.number if last.number is not None else parsed.number,
+            ), clauses[-1].placement)
+        if index + 1 < len(parts):
+            placement = CONNECTORS[parts[index + 1]]
+    return tuple(clauses) if len(clauses) > 1 else ()
+
+
+def scene(prompt: str) -> Tuple[Clause, ...]:
+    """Split a prompt into one clause per shape, or return () for a single shape
+
+    Clauses are in prompt order; the first one's placement is "right".
+    """
+    prompt = prompt.lower()
+    if len(prompt) > MEMO_MAX_LENGTH:
+        return ()
+    return _scene(prompt)
+
+
+def clear_cache():
+    """Forget memoized words and prompts"""
+    _word_tokens.cache_clear()
+    _command_token.cache_clear()
+    _parse_memo.cache_clear()
+    _scene.cache_clear()
@@ -0,0 +1,167 @@
+"""
+Content-addressed render cache.
+
+Entries are keyed on a hash of the parsed drawing spec (the ``shape_info``
+dict returned by ``parse_prompt``) instead of the raw prompt text, so
+"Draw a RED circle" and "draw a red circle please" share one entry.
+
+The cache has two tiers:
+
+* an in-memory LRU of encoded image bytes, bounded by total size
+* a disk tier of ``drawing_<key>.<ext>`` files under the static directory,
+  which doubles as the served image; the files are indexed and bounded by
+  the shared ``ArtifactStore``
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import config
+from artifact_store import ArtifactStore, artifact_store
+
+# Bump whenever rendering output changes so old entries are not reused
+RENDER_VERSION = 3
+
+
+def spec_key(shape_info: Dict[str, Any], options: Optional[Dict[str, Any]] = None) -> str:
+    """Return a canonical hash of a parsed drawing spec and its render options"""
+    payload = {"version": RENDER_VERSION, "spec": shape_info, "options": options or {}}
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class RenderCache:
+    def __init__(self, artifacts: ArtifactStore = artifact_store,
+                 max_memory_bytes=config.CACHE_MEMORY_BYTES):
+        self.artifacts = artifacts
+        self.max_memory_bytes = max_memory_bytes
+        self._lock = threading.Lock()
+
+        # Memory tier: key -> encoded bytes, least recently used first
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.memory_evictions = 0
+
+    @staticmethod
+    def filename_for(key: str, ext: str = "png") -> str:
+        """Return the file name used for a cache key on disk"""
+        return f"drawing_{key[:32]}.{ext}"
+
+    def path_for(self, key: str, ext: str = "png") -> str:
+        """Return the static path used for a cache key on disk"""
+        return self.artifacts.path_for(self.filename_for(key, ext))
+
+    def get(self, key: str, ext: str = "png", disk: bool = True) -> Optional[bytes]:
+        """Return cached bytes for a key, checking memory then (optionally) disk"""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return data
+
+            name = self.filename_for(key, ext)
+            data = self._read_disk(name) if disk else None
+            if data is None:
+                self.misses += 1
+                return None
+
+            self.disk_hits += 1
+            self._put_memory(key, data)
+            return data
+
+    def get_path(self, key: str, ext: str = "png") -> Optional[str]:
+        """Return the on-disk path for a key, writing it from memory if needed"""
+        with self._lock:
+            name = self.filename_for(key, ext)
+            if self.artifacts.touch(name):
+                self.disk_hits += 1
+                return self.path_for(key, ext)
+
+            data = self._memory.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            self._write_disk(name, data)
+            return self.path_for(key, ext)
+
+    def put(self, key: str, data: bytes):
+        """Store encoded bytes in the memory tier"""
+        with self._lock:
+            self._put_memory(key, data)
+
+    def store(self, key: str, data: bytes, ext: str = "png") -> str:
+        """Store encoded bytes in both tiers and return the on-disk path"""
+        with self._lock:
+            self._put_memory(key, data)
+            self._write_disk(self.filename_for(key, ext), data)
+        return self.path_for(key, ext)
+
+    def clear(self):
+        """Drop the memory tier (disk files are left in place)"""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and current tier sizes"""
+        artifacts = self.artifacts.stats()
+        with self._lock:
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "memory_evictions": self.memory_evictions,
+                "disk_entries": artifacts["files"],
+                "disk_bytes": artifacts["bytes"],
+                "disk_evictions": artifacts["files_reclaimed"],
+            }
+
+    def _put_memory(self, key: str, data: bytes):
+        """Insert into the memory tier and evict down to the size bound"""
+        if len(data) > self.max_memory_bytes:
+            return
+
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= len(old)
+
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self.memory_evictions += 1
+
+    def _read_disk(self, name: str) -> Optional[bytes]:
+        """Read a disk entry, returning None if it is not cached"""
+        if not self.artifacts.touch(name):
+            return None
+        try:
+            with open(self.artifacts.path_for(name), "rb") as f:
+                return f.read()
+        except OSError:
+            self.artifacts.forget(name)
+            return None
+
+    def _write_disk(self, name: str, data: bytes):
+        """Write a disk entry unless it is already there"""
+        if not self.artifacts.touch(name):
+            self.artifacts.write(name, data)
+
+
+# Shared cache used by generate_simple_drawing and the API
+render_cache = RenderCache()
@@ -0,0 +1,111 @@
+"""
+Rendering backends that keep CPU-bound drawing off the event loop.
+
+``RenderPool.render`` is awaited by the API. With the default "process"
+backend each render runs in a pre-warmed worker process and the encoded
+bytes are returned to the caller directly, without a temp file.
+"""
+
+import asyncio
+import functools
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+import config
+import metrics
+from simple_drawer import parse_prompt, render_drawing
+
+BACKENDS = ("process", "thread", "inline")
+
+# One prompt per shape type, rendered by every worker before it takes requests
+WARMUP_PROMPTS = [
+    "draw a circle", "draw a filled red circle", "draw a blue square", "draw a filled square",
+    "draw a triangle", "draw a filled green triangle", "draw a star", "draw a filled star",
+    "draw a house", "draw a tree", "draw a flower", "draw a spiral",
+    "forward 100 right 90 forward 50 penup back 20",
+]
+
+
+def default_workers() -> int:
+    """Return the configured worker count, defaulting to the core count"""
+    return config.RENDER_WORKERS or os.cpu_count() or 1
+
+
+def _warm_worker():
+    """Parse and render every shape type once in a fresh worker"""
+    for prompt in WARMUP_PROMPTS:
+        render_drawing(parse_prompt(prompt))
+
+
+def _render_timed(shape_info: Dict[str, Any], **options):
+    """Render in a worker and return the bytes with the worker's stage timings"""
+    timings: Dict[str, float] = {}
+    return render_drawing(shape_info, timings=timings, **options), timings
+
+
+def _ping() -> int:
+    """No-op task used to force every worker process to start"""
+    return os.getpid()
+
+
+class RenderPool:
+    def __init__(self, workers: Optional[int] = None, backend: Optional[str] = None):
+        self.workers = workers or default_workers()
+        self.backend = backend or config.RENDER_BACKEND
+        if self.backend not in BACKENDS:
+            raise ValueError(f"Unknown render backend: {self.backend}")
+        self._executor: Optional[Executor] = None
+
+    def start(self):
+        """Create the executor and wait until every worker is warm"""
+        if self.backend == "inline":
+            _warm_worker()
+            return
+        if self._executor is not None:
+            return
+
+        if self.backend == "process":
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                thread_name_prefix="render",
+                                                initializer=_warm_worker)
+        # Workers start lazily, so submit one task per worker up front
+        for future in [self._executor.submit(_ping) for _ in range(self.workers)]:
+            future.result()
+
+    def shutdown(self):
+        """Stop the workers"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    async def run(self, fn, *args, **kwargs):
+        """Call a module-level function in a worker and return its result"""
+        if self.backend == "inline":
+            return fn(*args, **kwargs)
+        if self._executor is None:
+            self.start()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+    async def render(self, shape_info: Dict[str, Any], **options) -> bytes:
+        """Render a parsed spec in a worker and return the encoded image
+        
+        ``options`` are passed through to ``render_drawing``. With metrics
+        enabled the worker's draw and encode timings are recorded here.
+        """
+        render = _render_timed if metrics.ENABLED else render_drawing
+        result = await self.run(render, shape_info, **options)
+
+        if not metrics.ENABLED:
+            return result
+        data, timings = result
+        for stage, seconds in timings.items():
+            metrics.record(stage, seconds, shape_info.get("type", ""))
+        return data
+
+
+# Shared pool used by the API
+render_pool = RenderPool()
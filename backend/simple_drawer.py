@@ -1,15 +1,73 @@
-from PIL import Image, ImageDraw
+from PIL import ImageDraw
+import codecs
+import hashlib
 import math
 import time
-import re
-from typing import Dict, Any, Tuple
+from functools import lru_cache
+from typing import Dict, Any, Optional, Tuple
+import config
+from display_list import DisplayList, bounds, colors, replay
+import encoders
+import metrics
+from svg_renderer import render_svg
+import turtle_path
+from turtle_path import MOVE, TURN, PENUP, PENDOWN
+import prompt_parser
+from prompt_parser import COLORS
+from artifact_store import artifact_store
+from canvas_pool import canvas_pool
+from render_cache import render_cache, spec_key
+
+# Parsed movement commands -> (turtle_path command, sign of the amount)
+CUSTOM_COMMANDS = {
+    "forward": (MOVE, 1), "back": (MOVE, -1),
+    "left": (TURN, -1), "right": (TURN, 1),
+    "penup": (PENUP, 0), "pendown": (PENDOWN, 0),
+}
+
+# Command sequences shorter than this are not worth vectorizing
+VECTORIZE_MIN_COMMANDS = 64
+
+# Size of the canvas drawings are laid out on
+CANVAS_WIDTH = 800
+CANVAS_HEIGHT = 600
+
+# How much of the drawing render_drawing shows: the whole canvas, the drawn
+# region of the canvas ("crop") or the whole drawing scaled to fit ("fit")
+FRAMINGS = ("canvas", "crop", "fit")
+
+# Blank margin in pixels kept around the drawing when cropping or fitting
+CROP_PADDING = 16
+
+# Commands run by ScriptRunner between flushes
+SCRIPT_BATCH = 4096
+
+def _union(a, b):
+    """Return the box covering two (x0, y0, x1, y1) boxes, either of which may be None"""
+    if a is None or b is None:
+        return a or b
+    return min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])
 
 class SimpleDrawer:
-    def __init__(self, width=800, height=600):
+    __slots__ = ("width", "height", "mode", "display_list", "_image", "_draw", "_flushed",
+                 "_discarded", "_transforms", "x", "y", "angle", "pen_down", "pen_color")
+    
+    def __init__(self, width=CANVAS_WIDTH, height=CANVAS_HEIGHT, mode='RGB'):
         self.width = width
         self.height = height
-        self.image = Image.new('RGB', (width, height), 'white')
-        self.draw = ImageDraw.Draw(self.image)
+        # Canvas mode; "auto" picks P or L from the colors used (see encoders)
+        self.mode = mode
+        
+        # Drawing is compiled into a display list and only rasterized
+        # when the image is needed
+        self.display_list = DisplayList()
+        self._image = None
+        self._draw = None
+        self._flushed = 0
+        # Box of ops dropped by flush(discard=True), which are only on the canvas
+        self._discarded = None
+        # Scale and offset of each image from rasterize, by id
+        self._transforms = {}
         
         # Turtle state
         self.x = width // 2
@@ -17,7 +75,110 @@ class SimpleDrawer:
         self.angle = 0  # 0 degrees is pointing right
         self.pen_down = True
         self.pen_color = 'black'
+    
+    @property
+    def image(self):
+        """The rasterized canvas, with every recorded op drawn"""
+        self.flush()
+        return self._image
+    
+    @property
+    def draw(self):
+        """ImageDraw handle for the rasterized canvas"""
+        self.flush()
+        return self._draw
+    
+    def flush(self, discard=False):
+        """Rasterize ops recorded since the last flush
+        
+        With ``discard`` the ops are dropped once drawn, so a long drawing
+        takes constant memory. They are then only on the canvas: bbox,
+        rasterize at other sizes and to_svg no longer include them.
+        """
+        if self._image is None:
+            self._image = canvas_pool.acquire(self._canvas_mode(), (self.width, self.height))
+            self._draw = ImageDraw.Draw(self._image)
+        
+        ops = self.display_list.ops
+        if self._flushed < len(ops):
+            replay(ops[self._flushed:], self._draw)
+            self._flushed = len(ops)
+            if discard:
+                self._discarded = _union(self._discarded, bounds(ops))
+                # The open polyline keeps its last segment, unflushed, so
+                # it continues with the same joint (redrawing it is harmless)
+                self.display_list.clear(keep_open_path=True)
+                self._flushed = 0
+            else:
+                # Already drawn polylines must not be extended in place
+                self.display_list.break_path()
+        
+    def _canvas_mode(self):
+        """Resolve the canvas mode, picking one from the colors used for 'auto'"""
+        if self.mode == 'auto':
+            return encoders.canvas_mode(colors(self.display_list) | {'white'})
+        return self.mode
+    
+    def bbox(self, padding=0, clip=True):
+        """Return the box (x0, y0, x1, y1) of everything drawn, or None
+        
+        The box is grown by ``padding`` and, with ``clip``, limited to the
+        canvas; None means nothing visible was drawn.
+        """
+        viewport = (0, 0, self.width, self.height) if clip else None
+        box = bounds(self.display_list, viewport=viewport)
+        if box is None:
+            return None
+        x0, y0, x1, y1 = box[0] - padding, box[1] - padding, box[2] + padding, box[3] + padding
+        if clip:
+            x0, y0 = max(x0, 0), max(y0, 0)
+            x1, y1 = min(x1, self.width), min(y1, self.height)
+            if x0 >= x1 or y0 >= y1:
+                return None
+        return x0, y0, x1, y1
+    
+    def rasterize(self, width, height, region=None):
+        """Rasterize the drawing at another size by scaling its geometry
         
+        ``region`` (x0, y0, x1, y1), the whole canvas by default, is scaled
+        to fit width x height and centered; no bitmap is resampled, so lines
+        stay sharp at any size.
+        """
+        if region is None and (width, height) == (self.width, self.height):
+            return self.image
+        
+        factor, offset = self.transform(width, height, region)
+        image = canvas_pool.acquire(self._canvas_mode(), (width, height))
+        replay(self.display_list, ImageDraw.Draw(image), scale=factor, offset=offset)
+        self._transforms[id(image)] = (factor, offset)
+        return image
+    
+    def transform(self, width, height, region=None):
+        """Return the scale and offset that fit region (the canvas by default) into width x height"""
+        x0, y0, x1, y1 = region or (0, 0, self.width, self.height)
+        factor = min(width / (x1 - x0), height / (y1 - y0))
+        offset = ((width - (x1 - x0) * factor) / 2 - x0 * factor,
+                  (height - (y1 - y0) * factor) / 2 - y0 * factor)
+        return factor, offset
+    
+    def release(self, *images):
+        """Return the canvas, and any images from rasterize, to the canvas pool
+        
+        Only call this once the images are no longer used. Drawing can
+        continue afterwards; the next flush replays onto a fresh canvas.
+        """
+        for image in images:
+            if image is not self._image:
+                factor, offset = self._transforms.pop(id(image))
+                canvas_pool.release(image, bounds(self.display_list, factor, offset))
+        if self._image is not None:
+            canvas_pool.release(self._image, _union(bounds(self.display_list.ops[:self._flushed]),
+                                                    self._discarded))
+            self._image = None
+            self._draw = None
+            self._flushed = 0
+            self._discarded = None
+    
     def forward(self, distance):
         """Move forward by distance pixels"""
         old_x, old_y = self.x, self.y
@@ -26,9 +187,9 @@ class SimpleDrawer:
         self.x += distance * math.cos(math.radians(self.angle))
         self.y += distance * math.sin(math.radians(self.angle))
         
-        # Draw line if pen is down
+        # Record line if pen is down
         if self.pen_down:
-            self.draw.line([(old_x, old_y), (self.x, self.y)], fill=self.pen_color, width=2)
+            self.display_list.line((old_x, old_y), (self.x, self.y), self.pen_color)
     
     def backward(self, distance):
         """Move backward by distance pixels"""
@@ -61,7 +222,30 @@ class SimpleDrawer:
         self.y = y
         
         if self.pen_down:
-            self.draw.line([(old_x, old_y), (self.x, self.y)], fill=self.pen_color, width=2)
+            self.display_list.line((old_x, old_y), (self.x, self.y), self.pen_color)
+    
+    def run_commands(self, kinds, values):
+        """Execute a sequence of move/turn/pen commands (see turtle_path)
+        
+        Long sequences are traced in one vectorized pass when NumPy is
+        available; short ones are cheaper to step through one at a time.
+        """
+        if turtle_path.np is None or len(kinds) < VECTORIZE_MIN_COMMANDS:
+            for kind, value in zip(kinds, values):
+                if kind == MOVE:
+                    self.forward(value)
+                elif kind == TURN:
+                    self.right(value)
+                elif kind == PENUP:
+                    self.penup()
+                else:
+                    self.pendown()
+            return
+        
+        polylines, self.x, self.y, self.angle, self.pen_down = turtle_path.trace(
+            kinds, values, self.x, self.y, self.angle, self.pen_down)
+        for points in polylines:
+            self.display_list.polyline(points.ravel().tolist(), self.pen_color)
     
     def circle(self, radius, filled=False):
         """Draw a circle"""
@@ -71,9 +255,9 @@ class SimpleDrawer:
         bottom = self.y + radius
         
         if filled:
-            self.draw.ellipse([left, top, right, bottom], fill=self.pen_color)
+            self.display_list.ellipse((left, top, right, bottom), fill=self.pen_color)
         else:
-            self.draw.ellipse([left, top, right, bottom], outline=self.pen_color, width=2)
+            self.display_list.ellipse((left, top, right, bottom), outline=self.pen_color, width=2)
     
     def rectangle(self, width, height, filled=False):
         """Draw a rectangle"""
@@ -83,61 +267,124 @@ class SimpleDrawer:
         bottom = self.y + height
         
         if filled:
-            self.draw.rectangle([left, top, right, bottom], fill=self.pen_color)
+            self.display_list.rect((left, top, right, bottom), fill=self.pen_color)
         else:
-            self.draw.rectangle([left, top, right, bottom], outline=self.pen_color, width=2)
+            self.display_list.rect((left, top, right, bottom), outline=self.pen_color, width=2)
+    
+    def polygon(self, points, filled=False):
+        """Draw a closed polygon through points"""
+        if filled:
+            self.display_list.polygon(points, fill=self.pen_color)
+        else:
+            self.display_list.polygon(points, outline=self.pen_color, width=2)
     
     def save_image(self, filename):
         """Save the image to file"""
         self.image.save(filename, 'PNG')
         return filename
+    
+    def to_bytes(self, format='PNG', **options):
+        """Encode the image in memory and return the bytes (see encoders.encode)"""
+        return encoders.encode(self.image, format.lower(), **options)
+    
+    def to_svg(self, width=None, height=None, region=None):
+        """Return the drawing as SVG text without rasterizing it
+        
+        ``region`` (x0, y0, x1, y1) is the part of the drawing shown, the
+        whole canvas by default.
+        """
+        x0, y0, x1, y1 = region or (0, 0, self.width, self.height)
+        return render_svg(self.display_list, width or self.width, height or self.height,
+                          x1 - x0, y1 - y0, view_origin=(x0, y0))
 
 def parse_prompt(prompt: str) -> Dict[str, Any]:
-    """Parse the user prompt to determine drawing type and parameters."""
-    prompt = prompt.lower()
-    
-    # Extract color
-    colors = {
-        "red": "#FF0000", "blue": "#0000FF", "green": "#00FF00", 
-        "yellow": "#FFFF00", "purple": "#800080", "orange": "#FFA500",
-        "pink": "#FFC0CB", "brown": "#A52A2A", "black": "#000000", 
-        "gray": "#808080", "grey": "#808080"
-    }
-    
-    color = "#000000"  # default black
-    for color_name, color_value in colors.items():
-        if color_name in prompt:
-            color = color_value
-            break
-    
-    # Extract size
-    size = 100  # default size
-    numbers = re.findall(r'\d+', prompt)
-    if numbers:
-        size = int(numbers[0])
-    
-    # Determine shape/action
-    if "circle" in prompt:
-        return {"type": "circle", "color": color, "size": size, "filled": "fill" in prompt}
-    elif "square" in prompt or "rectangle" in prompt:
-        return {"type": "square", "color": color, "size": size, "filled": "fill" in prompt}
-    elif "triangle" in prompt:
-        return {"type": "triangle", "color": color, "size": size, "filled": "fill" in prompt}
-    elif "star" in prompt:
-        return {"type": "star", "color": color, "size": size, "filled": "fill" in prompt}
-    elif "house" in prompt:
-        return {"type": "house", "color": color, "size": size}
-    elif "tree" in prompt:
-        return {"type": "tree", "color": color, "size": size}
-    elif "flower" in prompt:
-        return {"type": "flower", "color": color, "size": size}
-    elif "spiral" in prompt:
-        return {"type": "spiral", "color": color, "size": size}
+    """Parse the user prompt to determine drawing type and parameters.
+    
+    A prompt naming several shapes in separate clauses ("a red circle next
+    to a blue house") becomes a scene: ``{"type": "scene", "shapes": [...]}``
+    with one positioned spec per shape (see layout_scene).
+    
+    Specs of short prompts are memoized; every call returns a new dict.
+    """
+    if len(prompt) > prompt_parser.MEMO_MAX_LENGTH:
+        return _prompt_spec(prompt)
+    spec = _prompt_spec_memo(prompt)
+    if spec["type"] == "scene":
+        return {"type": "scene", "shapes": [dict(shape) for shape in spec["shapes"]]}
+    return dict(spec)
+
+def _prompt_spec(prompt: str) -> Dict[str, Any]:
+    parsed = prompt_parser.parse(prompt)
+    # A scene may repeat one kind of shape ("a big house and a small house")
+    if parsed.shapes:
+        clauses = prompt_parser.scene(prompt)
+        if clauses:
+            return {"type": "scene", "shapes": layout_scene(clauses)}
+    return shape_spec(parsed)
+
+_prompt_spec_memo = lru_cache(maxsize=1024)(_prompt_spec)
+
+def clear_prompt_cache():
+    """Forget memoized prompts, words and specs"""
+    prompt_parser.clear_cache()
+    _prompt_spec_memo.cache_clear()
+
+def shape_spec(parsed: prompt_parser.ParsedPrompt, default_size=100) -> Dict[str, Any]:
+    """Build the drawing spec for one parsed prompt or scene clause"""
+    color = COLORS[parsed.color(default="black")]
+    size = parsed.number if parsed.number is not None else default_size
+    shape = parsed.shape()
+    
+    if shape in ("circle", "square", "triangle", "star"):
+        return {"type": shape, "color": color, "size": size, "filled": parsed.filled}
+    elif shape == "rectangle":
+        return {"type": "square", "color": color, "size": size, "filled": parsed.filled}
+    elif shape is not None:
+        return {"type": shape, "color": color, "size": size}
     else:
-        return {"type": "custom", "color": color, "size": size, "prompt": prompt}
+        return {"type": "custom", "color": color, "size": size, "prompt": parsed.text}
+
+def layout_scene(clauses) -> list:
+    """Place scene clauses on a grid over the canvas and return their specs
+    
+    Each shape goes to the right of the previous one, or below or above it
+    when the clause says so (skipping cells already taken). The grid is
+    spread evenly over the canvas, and each spec gets the center of its
+    cell as ``x`` and ``y``; shapes without a size are scaled to their cell.
+    """
+    cells = []
+    taken = set()
+    col = row = 0
+    for index, clause in enumerate(clauses):
+        if index:
+            step = {"right": (1, 0), "below": (0, 1), "above": (0, -1)}[clause.placement]
+            col, row = col + step[0], row + step[1]
+            while (col, row) in taken:
+                col += 1
+        taken.add((col, row))
+        cells.append((col, row))
+    
+    min_col = min(c for c, _ in cells)
+    min_row = min(r for _, r in cells)
+    cols = max(c for c, _ in cells) - min_col + 1
+    rows = max(r for _, r in cells) - min_row + 1
+    cell_width, cell_height = CANVAS_WIDTH / cols, CANVAS_HEIGHT / rows
+    default_size = min(100, int(0.6 * min(cell_width, cell_height)))
+    
+    shapes = []
+    for clause, (col, row) in zip(clauses, cells):
+        spec = shape_spec(clause.parsed, default_size)
+        spec["x"] = round((col - min_col + 0.5) * cell_width)
+        spec["y"] = round((row - min_row + 0.5) * cell_height)
+        shapes.append(spec)
+    return shapes
 
 def draw_shape(drawer: SimpleDrawer, shape_info: Dict[str, Any]):
     """Draw the specified shape"""
+    if shape_info["type"] == "scene":
+        draw_scene(drawer, shape_info["shapes"])
+        return
+    
     drawer.set_color(shape_info["color"])
     shape_type = shape_info["type"]
     size = shape_info["size"]
@@ -163,8 +410,7 @@ def draw_shape(drawer: SimpleDrawer, shape_info: Dict[str, Any]):
                 points.append((drawer.x, drawer.y))
                 drawer.forward(size)
                 drawer.left(120)
-            # Use PIL to draw filled polygon
-            drawer.draw.polygon(points, fill=drawer.pen_color)
+            drawer.polygon(points, filled=True)
         else:
             for _ in range(3):
                 drawer.forward(size)
@@ -178,7 +424,7 @@ def draw_shape(drawer: SimpleDrawer, shape_info: Dict[str, Any]):
                 points.append((drawer.x, drawer.y))
                 drawer.forward(size)
                 drawer.right(144)
-            drawer.draw.polygon(points, fill=drawer.pen_color)
+            drawer.polygon(points, filled=True)
         else:
             for _ in range(5):
                 drawer.forward(size)
@@ -199,6 +445,24 @@ def draw_shape(drawer: SimpleDrawer, shape_info: Dict[str, Any]):
     else:  # custom
         draw_custom(drawer, shape_info["prompt"])
 
+def draw_scene(drawer: SimpleDrawer, shapes):
+    """Draw every shape of a scene, centered on its position, onto one canvas"""
+    for spec in shapes:
+        # Shapes are drawn from the turtle's position, so measure where this
+        # one lands when started from the canvas center and shift it over
+        probe = SimpleDrawer(drawer.width, drawer.height)
+        draw_shape(probe, spec)
+        box = bounds(probe.display_list)
+        start_x, start_y = probe.width // 2, probe.height // 2
+        if box is not None:
+            start_x += spec["x"] - (box[0] + box[2]) / 2
+            start_y += spec["y"] - (box[1] + box[3]) / 2
+        drawer.penup()
+        drawer.goto(start_x, start_y)
+        drawer.pendown()
+        drawer.angle = 0
+        draw_shape(drawer, spec)
+
 def draw_house(drawer: SimpleDrawer, size):
     """Draw a simple house"""
     # Draw base square
@@ -252,62 +516,204 @@ def draw_flower(drawer: SimpleDrawer, size):
 
 def draw_spiral(drawer: SimpleDrawer, size):
     """Draw a spiral"""
+    kinds = []
+    values = []
     for i in range(100):
-        drawer.forward(i * 2)
-        drawer.right(90)
+        kinds += [MOVE, TURN]
+        values += [i * 2, 90]
+    drawer.run_commands(kinds, values)
 
 def draw_custom(drawer: SimpleDrawer, prompt):
     """Draw based on custom movement commands"""
-    words = prompt.split()
-    
-    for i, word in enumerate(words):
-        if word in ["forward", "move", "go"]:
-            distance = 50
-            if i + 1 < len(words) and words[i + 1].isdigit():
-                distance = int(words[i + 1])
-            drawer.forward(distance)
-        
-        elif word in ["back", "backward"]:
-            distance = 50
-            if i + 1 < len(words) and words[i + 1].isdigit():
-                distance = int(words[i + 1])
-            drawer.backward(distance)
-        
-        elif word in ["left", "turn"]:
-            angle = 90
-            if i + 1 < len(words) and words[i + 1].isdigit():
-                angle = int(words[i + 1])
-            drawer.left(angle)
-        
-        elif word in ["right"]:
-            angle = 90
-            if i + 1 < len(words) and words[i + 1].isdigit():
-                angle = int(words[i + 1])
-            drawer.right(angle)
-        
-        elif word in ["up", "penup"]:
-            drawer.penup()
-        
-        elif word in ["down", "pendown"]:
-            drawer.pendown()
+    kinds = []
+    values = []
+    
+    for command, amount in prompt_parser.parse(prompt).commands:
+        kind, sign = CUSTOM_COMMANDS[command]
+        kinds.append(kind)
+        values.append(sign * amount)
+    
+    drawer.run_commands(kinds, values)
+
+class ScriptRunner:
+    """Draws a custom command script that arrives in pieces, such as an upload
+    
+    ``feed`` takes the next piece of UTF-8 bytes and draws the commands it
+    completes, and ``finish`` returns the encoded image. Commands are run in
+    batches of SCRIPT_BATCH and flushed to the canvas with the display list
+    discarded, so memory does not grow with the length of the script.
+    Color words in the script are ignored; the pen color is fixed up front.
+    ``timings`` holds the seconds spent drawing (including rasterizing) and
+    encoding under "draw" and "encode", leaving out waits for the upload.
+    """
+    __slots__ = ("drawer", "commands", "count", "timings", "_decoder")
+    
+    def __init__(self, color="#000000", palette=True):
+        mode = encoders.canvas_mode({color, "white"}) if palette else 'RGB'
+        self.drawer = SimpleDrawer(mode=mode)
+        self.drawer.set_color(color)
+        self.commands = prompt_parser.CommandStream()
+        self.count = 0
+        self.timings = {"draw": 0.0, "encode": 0.0}
+        self._decoder = codecs.getincrementaldecoder("utf-8")("replace")
+    
+    def feed(self, data: bytes):
+        """Draw the commands completed by the next piece of the script"""
+        start = time.perf_counter()
+        self._run(self.commands.feed(self._decoder.decode(data)))
+        self.timings["draw"] += time.perf_counter() - start
+    
+    def finish(self, format="png", encoder="default") -> bytes:
+        """Draw the rest of the script and return the encoded image"""
+        start = time.perf_counter()
+        self._run(self.commands.feed(self._decoder.decode(b"", final=True)))
+        self._run(self.commands.close())
+        drawn = time.perf_counter()
+        self.timings["draw"] += drawn - start
+        data = encoders.encode(self.drawer.image, format, **encoders.preset(format, encoder))
+        self.drawer.release()
+        self.timings["encode"] = time.perf_counter() - drawn
+        return data
+    
+    def _run(self, commands):
+        kinds = []
+        values = []
+        for command, amount in commands:
+            kind, sign = CUSTOM_COMMANDS[command]
+            kinds.append(kind)
+            values.append(sign * amount)
+            if len(kinds) == SCRIPT_BATCH:
+                self._draw(kinds, values)
+                kinds = []
+                values = []
+        if kinds:
+            self._draw(kinds, values)
+    
+    def _draw(self, kinds, values):
+        self.drawer.run_commands(kinds, values)
+        self.drawer.flush(discard=True)
+        self.count += len(kinds)
+
+def drawing_key(shape_info: Dict[str, Any], format: str = "png", encoder: str = "default",
+                width: Optional[int] = None, height: Optional[int] = None,
+                framing: str = "canvas") -> str:
+    """Return the render cache key for a spec and its output settings"""
+    options = {}
+    if format != "png":
+        options["format"] = format
+    if encoder != "default":
+        options["encoder"] = encoder
+    if (width, height) not in ((None, None), (CANVAS_WIDTH, CANVAS_HEIGHT)):
+        options["size"] = [width or CANVAS_WIDTH, height or CANVAS_HEIGHT]
+    if framing != "canvas":
+        options["framing"] = framing
+    return spec_key(shape_info, options)
 
-def generate_simple_drawing(prompt: str) -> Dict[str, Any]:
-    """Generate a drawing from a prompt using simple PIL drawing"""
+def frame_drawing(drawer: SimpleDrawer, width: Optional[int] = None, height: Optional[int] = None,
+                  framing: str = "canvas") -> Tuple[int, int, Optional[Tuple[int, int, int, int]]]:
+    """Return the output width, height and region of the drawing to show (see render_drawing)"""
+    width = width or drawer.width
+    height = height or drawer.height
+    if framing == "canvas":
+        return width, height, None
+    region = drawer.bbox(CROP_PADDING, clip=framing == "crop")
+    if region is not None and framing == "crop":
+        # Keep the scale the whole canvas would have had
+        factor = min(width / drawer.width, height / drawer.height)
+        width = max(1, round((region[2] - region[0]) * factor))
+        height = max(1, round((region[3] - region[1]) * factor))
+    return width, height, region
+
+def render_drawing(shape_info: Dict[str, Any], format: str = "png", encoder: str = "default",
+                   width: Optional[int] = None, height: Optional[int] = None,
+                   framing: str = "canvas",
+                   timings: Optional[Dict[str, float]] = None) -> bytes:
+    """Draw a parsed spec and return the encoded image
+    
+    The spec is always laid out on the CANVAS_WIDTH x CANVAS_HEIGHT canvas;
+    ``width`` and ``height`` scale the geometry to another output size.
+    ``framing`` "crop" encodes only the drawn part of the canvas, plus
+    CROP_PADDING, at the same scale; "fit" scales the whole drawing, even
+    parts off the canvas, to fill the output size.
+    If ``timings`` is given, the seconds spent drawing (including
+    rasterizing) and encoding are stored in it under "draw" and "encode".
+    """
+    start = time.perf_counter() if timings is not None else 0.0
+    settings = encoders.preset(format, encoder)
+    drawer = SimpleDrawer(mode='auto' if settings.get("palette") else 'RGB')
+    draw_shape(drawer, shape_info)
+    width, height, region = frame_drawing(drawer, width, height, framing)
+    if format != "svg":
+        image = drawer.rasterize(width, height, region)
+    if timings is not None:
+        drawn = time.perf_counter()
+        timings["draw"] = drawn - start
+    
+    if format == "svg":
+        data = drawer.to_svg(width, height, region).encode("utf-8")
+    else:
+        data = encoders.encode(image, format, **settings)
+        drawer.release(image)
+    if timings is not None:
+        timings["encode"] = time.perf_counter() - drawn
+    return data
+
+def write_drawing(data: bytes, format: str = "png") -> str:
+    """Write encoded image bytes under a content-derived name and return the path"""
+    digest = hashlib.sha256(data).hexdigest()
+    return artifact_store.write(f"drawing_{digest[:32]}.{format}", data)
+
+def generate_simple_drawing(prompt: str, use_cache: bool = True,
+                            in_memory: bool = False, format: str = "png",
+                            encoder: str = config.ENCODER_PRESET) -> Dict[str, Any]:
+    """Generate a drawing from a prompt using simple PIL drawing
+    
+    ``format`` is "png", "webp" or "svg" and ``encoder`` an encoder preset.
+    With ``in_memory`` the encoded image is returned as ``image_bytes`` and
+    nothing is read from or written to disk.
+    """
+    shape = ""
     try:
         # Parse the prompt
-        shape_info = parse_prompt(prompt)
+        with metrics.stage("parse") as timer:
+            shape_info = parse_prompt(prompt)
+            shape = timer.shape = shape_info["type"]
+        cache = render_cache if use_cache and config.CACHE_ENABLED else None
+        key = drawing_key(shape_info, format, encoder)
         
-        # Create drawer
-        drawer = SimpleDrawer()
+        def render():
+            timings = {} if metrics.ENABLED else None
+            data = render_drawing(shape_info, format, encoder, timings=timings)
+            for stage, seconds in (timings or {}).items():
+                metrics.record(stage, seconds, shape)
+            return data
         
-        # Draw the shape
-        draw_shape(drawer, shape_info)
+        if in_memory:
+            data = cache.get(key, format, disk=False) if cache else None
+            if data is None:
+                data = render()
+                if cache:
+                    cache.put(key, data)
+            metrics.count("generate_simple_drawing", shape)
+            return {
+                "status": "success",
+                "image_bytes": data,
+                "message": f"Drawing created for: {prompt}"
+            }
         
-        # Save the image
-        timestamp = int(time.time())
-        filename = f"static/drawing_{timestamp}.png"
-        drawer.save_image(filename)
+        if cache:
+            # A cache hit skips drawing and encoding entirely
+            filename = cache.get_path(key, format)
+            if filename is None:
+                data = render()
+                with metrics.stage("write", shape):
+                    filename = cache.store(key, data, format)
+        else:
+            data = render()
+            with metrics.stage("write", shape):
+                filename = write_drawing(data, format)
         
+        metrics.count("generate_simple_drawing", shape)
         return {
             "status": "success",
             "image_path": filename,
@@ -315,6 +721,7 @@ def generate_simple_drawing(prompt: str) -> Dict[str, Any]:
         }
         
     except Exception as e:
+        metrics.count("generate_simple_drawing", shape, error=True)
         return {
             "status": "error",
             "message": f"Error generating drawing: {str(e)}"
@@ -0,0 +1,61 @@
+"""
+Coalescing of identical in-flight work.
+
+When several requests ask for the same output at once, ``SingleFlight.do``
+runs the work for the first one only and the rest wait on that call and
+share its result (or its exception). Nothing is kept once the call ends, so
+this is independent of the render cache and works with it disabled.
+
+The shared call runs as its own task. A caller that is cancelled stops
+waiting without disturbing the others, and the call is cancelled when its
+last caller goes away.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self.calls = 0
+        self.joined = 0
+
+    async def do(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """Await ``fn(*args, **kwargs)``, or join the call already running for ``key``"""
+        call = self._calls.get(key)
+        if call is None:
+            call = self._calls[key] = _Call(asyncio.ensure_future(fn(*args, **kwargs)))
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            self.calls += 1
+        else:
+            self.joined += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Nobody is left to use the result
+                self._forget(key, call)
+                call.task.cancel()
+
+    def _forget(self, key: Hashable, call: _Call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": len(self._calls),
+            "calls": self.calls,
+            "joined": self.joined,
+        }
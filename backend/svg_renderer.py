@@ -0,0 +1,88 @@
+"""
+SVG backend for display lists.
+
+Turns the ops recorded by ``SimpleDrawer`` into SVG text directly, with no
+raster step. Strokes follow PIL's conventions: ellipse and rectangle
+outlines are drawn inside their bounding box, and polylines use round joins
+like ``draw.line(..., joint="curve")``.
+"""
+
+from html import escape
+from typing import Iterable, List, Optional, Tuple
+
+
+def _num(value: float) -> str:
+    """Format a coordinate compactly"""
+    text = f"{value:.2f}".rstrip("0").rstrip(".")
+    return "0" if text == "-0" else text
+
+
+def _points(points) -> str:
+    return " ".join(f"{_num(x)},{_num(y)}" for x, y in points)
+
+
+def _paint(fill, outline, width) -> str:
+    """Return fill/stroke attributes for an op"""
+    attrs = f'fill="{escape(fill)}"' if fill else 'fill="none"'
+    if outline:
+        attrs += f' stroke="{escape(outline)}" stroke-width="{_num(width)}"'
+    return attrs
+
+
+def render_svg(ops: Iterable[tuple], width: int, height: int, view_width: Optional[int] = None,
+               view_height: Optional[int] = None, background: str = "white",
+               view_origin: Tuple[float, float] = (0, 0)) -> str:
+    """Return an SVG document for the ops
+
+    ``width`` and ``height`` are the display size. The part of the drawing's
+    own coordinate space starting at ``view_origin`` and ``view_width`` x
+    ``view_height`` in size (defaulting to the display size) is scaled to fit
+    it, centered.
+    """
+    view_width = view_width or width
+    view_height = view_height or height
+    x, y = _num(view_origin[0]), _num(view_origin[1])
+    position = f'x="{x}" y="{y}" ' if view_origin != (0, 0) else ""
+    parts: List[str] = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="{x} {y} {view_width} {view_height}" style="background-color:{escape(background)}">',
+        f'<rect {position}width="{view_width}" height="{view_height}" fill="{escape(background)}"/>',
+    ]
+
+    for op in ops:
+        kind = op[0]
+        if kind == "polyline":
+            _, color, line_width, coords = op
+            parts.append(
+                f'<polyline points="{_points(zip(coords[0::2], coords[1::2]))}" fill="none" stroke="{escape(color)}" '
+                f'stroke-width="{_num(line_width)}" stroke-linejoin="round"/>'
+            )
+        elif kind in ("ellipse", "rect"):
+            _, (x0, y0, x1, y1), fill, outline, line_width = op
+            # PIL draws outlines inside the box, SVG centers them on the edge
+            inset = line_width / 2 if outline else 0
+            x0, x1 = sorted((x0, x1))
+            y0, y1 = sorted((y0, y1))
+            x0, y0, x1, y1 = x0 + inset, y0 + inset, x1 - inset, y1 - inset
+            paint = _paint(fill, outline, line_width)
+            if kind == "ellipse":
+                parts.append(
+                    f'<ellipse cx="{_num((x0 + x1) / 2)}" cy="{_num((y0 + y1) / 2)}" '
+                    f'rx="{_num(max(x1 - x0, 0) / 2)}" ry="{_num(max(y1 - y0, 0) / 2)}" '
+                    f'{paint}/>'
+                )
+            else:
+                parts.append(
+                    f'<rect x="{_num(x0)}" y="{_num(y0)}" '
+                    f'width="{_num(max(x1 - x0, 0))}" height="{_num(max(y1 - y0, 0))}" '
+                    f'{paint}/>'
+                )
+        elif kind == "polygon":
+            _, points, fill, outline, line_width = op
+            parts.append(f'<polygon points="{_points(points)}" '
+                         f'{_paint(fill, outline, line_width)}/>')
+        else:
+            raise ValueError(f"Unknown display list op: {kind}")
+
+    parts.append("</svg>")
+    return "\n".join(parts)
@@ -0,0 +1,228 @@
+"""
+Tiled rendering for PNGs too large to hold in memory as one image.
+
+The output is split into bands of ``TILE_HEIGHT`` full-width rows (PNG is
+written a row at a time, so a band is the natural tile). Each display op is
+assigned to the bands it can touch, and the render workers rasterize and
+deflate-compress the bands, at most one band per worker at a time. A worker
+ends its compressed segment on a full flush, so the segments join into one
+zlib stream; their Adler-32 checksums are combined here and the PNG is
+streamed out band by band, in order.
+
+Peak memory is about ``TILE_HEIGHT x width`` pixels per worker, whatever
+the height of the image.
+"""
+
+import asyncio
+import math
+import struct
+import zlib
+from collections import deque
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from PIL import Image, ImageColor, ImageDraw
+
+import config
+import encoders
+from canvas_pool import canvas_pool
+from display_list import bounds, clip_segment, colors, op_bounds, replay
+from render_pool import render_pool
+from simple_drawer import SimpleDrawer, draw_shape, frame_drawing
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# PNG color type of each canvas mode
+COLOR_TYPES = {"L": 0, "RGB": 2, "P": 3}
+
+# zlib header for a 32K window; the level bits in it are only informational
+ZLIB_HEADER = b"\x78\x9c"
+
+ADLER_BASE = 65521
+
+
+def png_chunk(kind: bytes, data: bytes) -> bytes:
+    """Return a PNG chunk"""
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+
+def adler32_combine(adler1: int, adler2: int, length2: int) -> int:
+    """Return the Adler-32 of two joined buffers from the checksum of each"""
+    rem = length2 % ADLER_BASE
+    low1, high1 = adler1 & 0xFFFF, adler1 >> 16
+    low = (low1 + (adler2 & 0xFFFF) + ADLER_BASE - 1) % ADLER_BASE
+    high = (rem * low1 + high1 + (adler2 >> 16) + ADLER_BASE - rem) % ADLER_BASE
+    return low | (high << 16)
+
+
+def register_palette(canvas: Image.Image, palette: Sequence[Tuple[int, int, int]]):
+    """Allocate palette entries in a fixed order, so every band uses the same indices"""
+    for rgb in palette:
+        canvas.palette.getcolor(rgb, canvas)
+
+
+def bit_depth(mode: str, palette: Sequence[Tuple[int, int, int]]) -> int:
+    """Return the PNG bit depth; small palettes are packed like Pillow does"""
+    if mode != "P":
+        return 8
+    entries = len(palette) + 1
+    return next(bits for bits in (1, 2, 4, 8) if entries <= 1 << bits)
+
+
+def render_band(ops: List[tuple], mode: str, palette: Sequence[Tuple[int, int, int]],
+                size: Tuple[int, int], top: int, height: int, scale: float,
+                offset: Tuple[float, float], level: int, strategy: int,
+                last: bool) -> Tuple[bytes, int, int]:
+    """Rasterize and compress one band of rows; runs in a render worker
+
+    The band is drawn as the rows from ``top`` of an image of ``size``, so
+    its pixels match a render of the whole image. Returns the raw deflate
+    segment along with the Adler-32 checksum and length of the filtered
+    rows it encodes.
+    """
+    width = size[0]
+    canvas = canvas_pool.acquire(mode, (width, height))
+    if mode == "P":
+        register_palette(canvas, palette)
+    replay(ops, ImageDraw.Draw(canvas), scale=scale, offset=offset, origin=(0, top), size=size)
+    bits = bit_depth(mode, palette)
+    pixels = canvas.tobytes("raw", f"P;{bits}" if bits < 8 else mode)
+    canvas_pool.release(canvas, bounds(ops, scale, (offset[0], offset[1] - top)))
+
+    # Every row starts with filter type 0 (none)
+    stride = len(pixels) // height
+    rows = b"".join(b"\x00" + pixels[i:i + stride] for i in range(0, len(pixels), stride))
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15, 8, strategy)
+    data = compressor.compress(rows) + compressor.flush(zlib.Z_FINISH if last else zlib.Z_FULL_FLUSH)
+    return data, zlib.adler32(rows), len(rows)
+
+
+class TiledRender:
+    """A drawing laid out for band-by-band PNG output
+
+    Drawing and layout happen here, so errors surface before any output
+    is sent; ``chunks`` then renders and yields the PNG. Construct it off
+    the event loop (e.g. with ``asyncio.to_thread``).
+    """
+
+    def __init__(self, shape_info: Dict[str, Any], width: int, height: int,
+                 framing: str = "canvas", encoder: str = config.ENCODER_PRESET,
+                 band_height: int = config.TILE_HEIGHT):
+        settings = encoders.preset("png", encoder)
+        drawer = SimpleDrawer()
+        draw_shape(drawer, shape_info)
+        self.width, self.height, region = frame_drawing(drawer, width, height, framing)
+        self.scale, self.offset = drawer.transform(self.width, self.height, region)
+        self.band_height = band_height
+        self.level = settings.get("compress_level", 6)
+        self.strategy = encoders.PNG_STRATEGIES[settings.get("strategy", "default")]
+
+        ops = drawer.display_list.ops
+        used = colors(ops) | {"white"}
+        self.mode = encoders.canvas_mode(used) if settings.get("palette") else "RGB"
+        self.palette = sorted({ImageColor.getrgb(c)[:3] for c in used} - {(255, 255, 255)})
+        self.bands = self._assign(ops)
+
+    def _assign(self, ops: List[tuple]) -> List[List[tuple]]:
+        """Return the ops that can touch each band"""
+        bands: List[List[tuple]] = [[] for _ in range(math.ceil(self.height / self.band_height))]
+        dx, dy = self.offset
+        for op in ops:
+            box = op_bounds(op)
+            if box is None:
+                continue
+            # Same margin as replay's culling
+            x0, y0 = box[0] * self.scale + dx - 2, box[1] * self.scale + dy - 2
+            x1, y1 = box[2] * self.scale + dx + 2, box[3] * self.scale + dy + 2
+            if x1 <= 0 or x0 >= self.width or y1 <= 0 or y0 >= self.height:
+                continue
+            first = max(0, int(y0 // self.band_height))
+            last = min(len(bands) - 1, int(y1 // self.band_height))
+            if op[0] == "polyline" and first < last:
+                self._assign_polyline(op, bands)
+                continue
+            for index in range(first, last + 1):
+                bands[index].append(op)
+        return bands
+
+    def _assign_polyline(self, op: tuple, bands: List[List[tuple]]):
+        """Add the runs of a polyline that touch each band to that band
+
+        Each segment is clipped to the image and goes to the bands its
+        visible part reaches, so a long diagonal is not drawn in full by
+        every band it spans.
+        """
+        _, color, width, coords = op
+        scale, (dx, dy) = self.scale, self.offset
+        pad = max(1, round(width * scale)) + 2
+        clip = (-pad, -pad, self.width + pad, self.height + pad)
+        # Band index -> [index of the band's last segment, the band's run]
+        runs: Dict[int, list] = {}
+        for segment in range(len(coords) // 2 - 1):
+            x0, y0, x1, y1 = coords[2 * segment:2 * segment + 4]
+            clipped = clip_segment(x0 * scale + dx, y0 * scale + dy,
+                                   x1 * scale + dx, y1 * scale + dy, clip)
+            if clipped is None:
+                continue
+            first = max(0, int((min(clipped[1], clipped[3]) - pad) // self.band_height))
+            last = min(len(bands) - 1, int((max(clipped[1], clipped[3]) + pad) // self.band_height))
+            for index in range(first, last + 1):
+                run = runs.get(index)
+                if run is not None and run[0] == segment - 1:
+                    run[0] = segment
+                    run[1] += (x1, y1)
+                else:
+                    path = [x0, y0, x1, y1]
+                    runs[index] = [segment, path]
+                    bands[index].append(("polyline", color, width, path))
+
+    def header(self) -> bytes:
+        """Return the PNG signature and the chunks before the image data"""
+        data = PNG_SIGNATURE + png_chunk(b"IHDR", struct.pack(
+            ">IIBBBBB", self.width, self.height, bit_depth(self.mode, self.palette),
+            COLOR_TYPES[self.mode], 0, 0, 0))
+        if self.mode == "P":
+            probe = Image.new("P", (1, 1), "white")
+            register_palette(probe, self.palette)
+            data += png_chunk(b"PLTE", bytes(probe.getpalette()[:3 * len(self.palette) + 3]))
+        return data
+
+    def _band_task(self, index: int):
+        top = index * self.band_height
+        height = min(self.band_height, self.height - top)
+        return render_pool.run(render_band, self.bands[index], self.mode, self.palette,
+                               (self.width, self.height), top, height, self.scale, self.offset,
+                               self.level, self.strategy, index == len(self.bands) - 1)
+
+    async def chunks(self, workers: Optional[int] = None) -> AsyncIterator[bytes]:
+        """Render the bands in the render pool and yield the PNG in pieces
+
+        At most ``workers`` bands (the pool size by default) are in flight.
+        """
+        workers = workers or render_pool.workers
+        yield self.header()
+
+        pending: deque = deque()
+        submitted = 0
+        adler = 1
+        prefix = ZLIB_HEADER
+        try:
+            while submitted < len(self.bands) or pending:
+                while submitted < len(self.bands) and len(pending) < workers:
+                    pending.append(asyncio.ensure_future(self._band_task(submitted)))
+                    submitted += 1
+                data, band_adler, length = await pending.popleft()
+                adler = adler32_combine(adler, band_adler, length)
+                if not pending and submitted == len(self.bands):
+                    data += struct.pack(">I", adler)
+                yield png_chunk(b"IDAT", prefix + data)
+                prefix = b""
+        finally:
+            for task in pending:
+                task.cancel()
+        yield png_chunk(b"IEND", b"")
+
+
+async def render_png(shape_info: Dict[str, Any], width: int, height: int, **options) -> bytes:
+    """Render a tiled PNG into memory; mainly for tests and benchmarks"""
+    render = await asyncio.to_thread(TiledRender, shape_info, width, height, **options)
+    return b"".join([chunk async for chunk in render.chunks()])
@@ -1,27 +1,45 @@
-import turtle
 import io
 import base64
 from PIL import Image, ImageDraw
-import tkinter as tk
 from typing import Dict, Any
-import re
 import math
-import time
 import threading
 from queue import Queue
 import os
+from headless_turtle import HeadlessScreen, HeadlessTurtle
+from simple_drawer import write_drawing
+import prompt_parser
+
+# Color names the turtle backend recognizes, in priority order
+TURTLE_COLORS = ("red", "blue", "green", "yellow", "purple", "orange", "pink", "brown", "black", "gray")
+
+# Shape keywords -> drawing method, in the order they take precedence
+TURTLE_SHAPES = {
+    "circle": "_draw_circle", "square": "_draw_square", "rectangle": "_draw_square",
+    "triangle": "_draw_triangle", "star": "_draw_star", "spiral": "_draw_spiral",
+    "flower": "_draw_flower", "house": "_draw_house", "tree": "_draw_tree",
+}
 
 class TurtleDrawer:
-    def __init__(self, width=800, height=600):
+    def __init__(self, width=800, height=600, headless=True):
         self.width = width
         self.height = height
+        self.headless = headless
         self.screen = None
         self.turtle_obj = None
         self.drawing_complete = False
         
     def setup_turtle(self):
         """Setup turtle graphics environment"""
+        if self.headless:
+            # Draw in memory with PIL; no Tk display is needed
+            self.screen = HeadlessScreen(self.width, self.height)
+            self.turtle_obj = HeadlessTurtle(self.screen)
+            return
+        
         try:
+            import turtle
+            
             # Create a new turtle screen
             self.screen = turtle.Screen()
             self.screen.setup(width=self.width, height=self.height)
@@ -50,22 +68,9 @@ class TurtleDrawer:
         self.turtle_obj.pendown()
         
         # Parse different drawing commands
-        if "circle" in prompt:
-            self._draw_circle(prompt)
-        elif "square" in prompt or "rectangle" in prompt:
-            self._draw_square(prompt)
-        elif "triangle" in prompt:
-            self._draw_triangle(prompt)
-        elif "star" in prompt:
-            self._draw_star(prompt)
-        elif "spiral" in prompt:
-            self._draw_spiral(prompt)
-        elif "flower" in prompt:
-            self._draw_flower(prompt)
-        elif "house" in prompt:
-            self._draw_house(prompt)
-        elif "tree" in prompt:
-            self._draw_tree(prompt)
+        shape = prompt_parser.parse(prompt).shape(TURTLE_SHAPES)
+        if shape is not None:
+            getattr(self, TURTLE_SHAPES[shape])(prompt)
         else:
             # Default: draw based on simple commands
             self._parse_movement_commands(prompt)
@@ -75,16 +80,12 @@ class TurtleDrawer:
         
     def _extract_number(self, text: str, default: int = 100) -> int:
         """Extract number from text, return default if not found"""
-        numbers = re.findall(r'\d+', text)
-        return int(numbers[0]) if numbers else default
+        number = prompt_parser.parse(text).number
+        return number if number is not None else default
         
     def _extract_color(self, text: str) -> str:
         """Extract color from text"""
-        colors = ["red", "blue", "green", "yellow", "purple", "orange", "pink", "brown", "black", "gray"]
-        for color in colors:
-            if color in text:
-                return color
-        return "black"
+        return prompt_parser.parse(text).color(TURTLE_COLORS, "black")
         
     def _draw_circle(self, prompt: str):
         """Draw a circle based on prompt"""
@@ -92,7 +93,7 @@ class TurtleDrawer:
         color = self._extract_color(prompt)
         
         self.turtle_obj.color(color)
-        if "fill" in prompt or "filled" in prompt:
+        if prompt_parser.parse(prompt).filled:
             self.turtle_obj.begin_fill()
             self.turtle_obj.circle(radius)
             self.turtle_obj.end_fill()
@@ -105,14 +106,14 @@ class TurtleDrawer:
         color = self._extract_color(prompt)
         
         self.turtle_obj.color(color)
-        if "fill" in prompt or "filled" in prompt:
+        if prompt_parser.parse(prompt).filled:
             self.turtle_obj.begin_fill()
             
         for _ in range(4):
             self.turtle_obj.forward(size)
             self.turtle_obj.right(90)
             
-        if "fill" in prompt or "filled" in prompt:
+        if prompt_parser.parse(prompt).filled:
             self.turtle_obj.end_fill()
             
     def _draw_triangle(self, prompt: str):
@@ -121,14 +122,14 @@ class TurtleDrawer:
         color = self._extract_color(prompt)
         
         self.turtle_obj.color(color)
-        if "fill" in prompt or "filled" in prompt:
+        if prompt_parser.parse(prompt).filled:
             self.turtle_obj.begin_fill()
             
         for _ in range(3):
             self.turtle_obj.forward(size)
             self.turtle_obj.left(120)
             
-        if "fill" in prompt or "filled" in prompt:
+        if prompt_parser.parse(prompt).filled:
             self.turtle_obj.end_fill()
             
     def _draw_star(self, prompt: str):
@@ -137,14 +138,14 @@ class TurtleDrawer:
         color = self._extract_color(prompt)
         
         self.turtle_obj.color(color)
-        if "fill" in prompt or "filled" in prompt:
+        if prompt_parser.parse(prompt).filled:
             self.turtle_obj.begin_fill()
             
         for _ in range(5):
             self.turtle_obj.forward(size)
             self.turtle_obj.right(144)
             
-        if "fill" in prompt or "filled" in prompt:
+        if prompt_parser.parse(prompt).filled:
             self.turtle_obj.end_fill()
             
     def _draw_spiral(self, prompt: str):
@@ -223,41 +224,38 @@ class TurtleDrawer:
         
     def _parse_movement_commands(self, prompt: str):
         """Parse basic movement commands"""
-        words = prompt.split()
-        
-        for i, word in enumerate(words):
-            if word in ["forward", "move", "go"]:
-                distance = 50
-                if i + 1 < len(words) and words[i + 1].isdigit():
-                    distance = int(words[i + 1])
-                self.turtle_obj.forward(distance)
-                
-            elif word in ["back", "backward"]:
-                distance = 50
-                if i + 1 < len(words) and words[i + 1].isdigit():
-                    distance = int(words[i + 1])
-                self.turtle_obj.backward(distance)
-                
-            elif word in ["left", "turn"]:
-                angle = 90
-                if i + 1 < len(words) and words[i + 1].isdigit():
-                    angle = int(words[i + 1])
-                self.turtle_obj.left(angle)
-                
-            elif word in ["right"]:
-                angle = 90
-                if i + 1 < len(words) and words[i + 1].isdigit():
-                    angle = int(words[i + 1])
-                self.turtle_obj.right(angle)
-                
-            elif word in ["up", "penup"]:
-                self.turtle_obj.penup()
-                
-            elif word in ["down", "pendown"]:
-                self.turtle_obj.pendown()
+        for command, amount in prompt_parser.parse(prompt).commands:
+            if command in ("penup", "pendown"):
+                getattr(self.turtle_obj, command)()
+            else:
+                getattr(self.turtle_obj, command)(amount)
                 
+    def to_bytes(self, format="PNG"):
+        """Encode the drawing in memory and return the bytes"""
+        if self.headless:
+            return self.screen.to_bytes(format)
+        
+        buffer = io.BytesIO()
+        self._export_tk_image().save(buffer, format)
+        return buffer.getvalue()
+            
+    def _export_tk_image(self):
+        """Export the Tk canvas through PostScript and load it with PIL"""
+        canvas = self.screen.getcanvas()
+        ps_file = f"drawing_{os.getpid()}_{id(self)}.eps"
+        canvas.postscript(file=ps_file)
+        try:
+            img = Image.open(ps_file)
+            img.load()
+            return img
+        finally:
+            os.remove(ps_file)
+            
     def save_as_image(self, filename: str = "drawing.png"):
         """Save the turtle drawing as an image"""
+        if self.headless:
+            return self.screen.save(filename)
+        
         try:
             # Get the canvas
             canvas = self.screen.getcanvas()
@@ -282,6 +280,9 @@ class TurtleDrawer:
             
     def get_image_data(self):
         """Get image data as base64 string"""
+        if self.headless:
+            return base64.b64encode(self.to_bytes()).decode('utf-8')
+        
         try:
             filename = "temp_drawing.png"
             saved_file = self.save_as_image(filename)
@@ -314,9 +315,8 @@ def generate_turtle_drawing(prompt: str) -> Dict[str, Any]:
         drawer.setup_turtle()
         drawer.parse_and_draw(prompt)
         
-        # Save the drawing as an image
-        image_filename = f"static/drawing_{int(time.time())}.png"
-        saved_file = drawer.save_as_image(image_filename)
+        # Encode in memory and save under a content-derived name
+        saved_file = write_drawing(drawer.to_bytes())
         
         drawer.close()
         
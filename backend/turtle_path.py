@@ -0,0 +1,71 @@
+"""
+Vectorized turtle path computation.
+
+A whole sequence of turtle commands is traced in one NumPy pass: headings
+are a cumulative sum of the turns, and positions are a cumulative sum of the
+per-move displacements. The result is a list of pen-down polylines ready for
+the display list, matching what ``SimpleDrawer.forward``/``right``/``left``
+would produce one step at a time.
+
+Commands are given as two parallel sequences, ``kinds`` and ``values``:
+
+    MOVE     value is the distance (negative moves backward)
+    TURN     value is the clockwise turn in degrees (``right``; ``left`` is negative)
+    PENUP    value is ignored
+    PENDOWN  value is ignored
+"""
+
+from typing import List, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; SimpleDrawer falls back to scalar steps
+    np = None
+
+MOVE = 0
+TURN = 1
+PENUP = 2
+PENDOWN = 3
+
+
+def trace(kinds: Sequence[int], values: Sequence[float], x: float, y: float,
+          angle: float, pen_down: bool) -> Tuple[List["np.ndarray"], float, float, float, bool]:
+    """Trace a command sequence from the given turtle state
+
+    Returns the pen-down polylines as ``(n, 2)`` vertex arrays followed by the
+    final ``x``, ``y``, ``angle`` and ``pen_down`` state.
+    """
+    kinds = np.asarray(kinds, dtype=np.int8)
+    values = np.asarray(values, dtype=np.float64)
+    n = len(kinds)
+    if n == 0:
+        return [], x, y, angle, pen_down
+
+    is_move = kinds == MOVE
+    is_turn = kinds == TURN
+    is_pen = (kinds == PENUP) | (kinds == PENDOWN)
+
+    # Heading in effect for each command
+    headings = angle + np.cumsum(np.where(is_turn, values, 0.0))
+    radians = np.radians(headings)
+    distances = np.where(is_move, values, 0.0)
+
+    # Positions before each command plus the final position, summed in the
+    # same order as the scalar turtle so results match closely
+    xs = np.cumsum(np.concatenate(([float(x)], distances * np.cos(radians))))
+    ys = np.cumsum(np.concatenate(([float(y)], distances * np.sin(radians))))
+
+    # Pen state in effect for each command, forward-filled from pen commands
+    last_pen = np.maximum.accumulate(np.where(is_pen, np.arange(n), -1))
+    pen = np.where(last_pen >= 0, kinds[np.maximum(last_pen, 0)] == PENDOWN, pen_down)
+
+    drawn = np.flatnonzero(is_move & pen)
+    polylines = []
+    if len(drawn):
+        # A pen-up move starts a new polyline
+        run_ids = np.cumsum(is_move & ~pen)[drawn]
+        for run in np.split(drawn, np.flatnonzero(np.diff(run_ids)) + 1):
+            index = np.concatenate(([run[0]], run + 1))
+            polylines.append(np.column_stack((xs[index], ys[index])))
+
+    return polylines, float(xs[-1]), float(ys[-1]), float(headings[-1]), bool(pen[-1])
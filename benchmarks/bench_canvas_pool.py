@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark canvas pooling against allocating a new canvas for every render.
+
+Each configuration runs in its own process, so peak RSS is measured
+independently. A thread pool renders drawings at each concurrency level and
+the benchmark reports throughput, peak RSS and how many canvases (and bytes
+of canvas memory) were allocated.
+
+Usage:
+    python benchmarks/bench_canvas_pool.py [--threads 1 8 32] [--renders 400]
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+SPECS = [
+    {"type": "house", "color": "#000000", "size": 100},
+    {"type": "star", "color": "#FFFF00", "size": 150, "filled": True},
+    {"type": "spiral", "color": "#0000FF", "size": 100},
+    {"type": "circle", "color": "#FF0000", "size": 100, "filled": False},
+]
+
+
+def child(threads: int, renders: int, format: str, encoder: str):
+    """Render in this process and print the measurements as JSON"""
+    sys.path.insert(0, str(BACKEND_DIR))
+    from canvas_pool import canvas_pool
+    from simple_drawer import render_drawing
+
+    def render(i):
+        return render_drawing(SPECS[i % len(SPECS)], format, encoder)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(render, range(renders)))
+    elapsed = time.perf_counter() - start
+
+    stats = canvas_pool.stats()
+    # ru_maxrss is in KB on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rss_mb = rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+    print(json.dumps({
+        "throughput": renders / elapsed,
+        "created": stats["created"],
+        "reused": stats["reused"],
+        "rss_mb": rss_mb,
+    }))
+
+
+def run(pool_size: int, threads: int, renders: int, format: str, encoder: str) -> dict:
+    env = dict(os.environ, TWODEE_CANVAS_POOL_SIZE=str(pool_size))
+    output = subprocess.run(
+        [sys.executable, __file__, "--child", "--threads", str(threads),
+         "--renders", str(renders), "--format", format, "--encoder", encoder],
+        env=env, check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--renders", type=int, default=400)
+    parser.add_argument("--pool-size", type=int, default=None,
+                        help="Canvases kept per size when pooled (default: thread count)")
+    parser.add_argument("--format", default="png", choices=["png", "webp"],
+                        help="png draws on palette canvases, webp on RGB ones")
+    parser.add_argument("--encoder", default="fast", choices=["fast", "default", "small"])
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.threads[0], args.renders, args.format, args.encoder)
+        return
+
+    # 800x600 canvases: one byte per pixel for palette, four for RGB in memory
+    canvas_mb = 800 * 600 * (1 if args.format == "png" else 4) / (1024 * 1024)
+    print(f"{'threads':>7} {'mode':>7} {'req/s':>9} {'canvases':>9} {'canvas MB':>10} {'peak RSS MB':>12}")
+    for threads in args.threads:
+        for label, pool_size in (("fresh", 0), ("pooled", args.pool_size or threads)):
+            result = run(pool_size, threads, args.renders, args.format, args.encoder)
+            print(f"{threads:>7} {label:>7} {result['throughput']:>9.1f} {result['created']:>9} "
+                  f"{result['created'] * canvas_mb:>10.1f} {result['rss_mb']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Report output size and encode time for every raster format and encoder preset.
+
+Each shape is drawn once per canvas mode, then encoded repeatedly with each
+preset; the table shows the median encode time and the encoded size. The
+"rgb" rows encode an RGB canvas with PIL's default PNG settings, which is
+what every drawing used before palette canvases.
+
+Usage:
+    python benchmarks/bench_encoders.py [--repeat N]
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import encoders  # noqa: E402
+from simple_drawer import SimpleDrawer, draw_shape, parse_prompt  # noqa: E402
+
+PROMPTS = ["draw a red circle", "draw a filled star", "draw a house", "draw a tree", "draw a spiral"]
+
+
+def canvas(prompt: str, mode: str):
+    """Draw a prompt on a canvas of the given mode and return the image"""
+    drawer = SimpleDrawer(mode=mode)
+    draw_shape(drawer, parse_prompt(prompt))
+    return drawer.image
+
+
+def measure(image, repeat: int, format: str, **settings):
+    """Return (size in bytes, median encode time in ms)"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        data = encoders.encode(image, format, **settings)
+        times.append(time.perf_counter() - start)
+    return len(data), statistics.median(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'prompt':<20} {'format':<6} {'preset':<8} {'mode':<4} {'bytes':>8} {'encode ms':>10}")
+    for prompt in PROMPTS:
+        rgb = canvas(prompt, "RGB")
+        size, ms = measure(rgb, args.repeat, "png")
+        print(f"{prompt:<20} {'png':<6} {'rgb':<8} {rgb.mode:<4} {size:>8} {ms:>10.2f}")
+
+        for format, presets in encoders.PRESETS.items():
+            for name in presets:
+                settings = encoders.preset(format, name)
+                image = canvas(prompt, "auto") if settings.get("palette") else rgb
+                size, ms = measure(image, args.repeat, format, **settings)
+                print(f"{prompt:<20} {format:<6} {name:<8} {image.mode:<4} {size:>8} {ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
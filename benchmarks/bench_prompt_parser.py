@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Benchmark the shared prompt parser against the legacy per-keyword parser.
+
+``parse_prompt`` is timed against the legacy ``parse_prompt`` on short
+prompts, both repeated (memoized specs) and each seen once, and the command
+loop on scripts of increasing length checks that parsing stays linear. Every
+case also checks that both parsers agree.
+
+Usage:
+    python benchmarks/bench_prompt_parser.py [--words 1000 10000 100000]
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import prompt_parser  # noqa: E402
+from simple_drawer import clear_prompt_cache, parse_prompt  # noqa: E402
+
+PROMPTS = [
+    "draw a circle",
+    "draw a blue square",
+    "draw a filled red triangle",
+    "draw a purple star 150",
+    "draw a house with red roof",
+    "draw a green tree",
+    "draw a spiral in blue",
+    "move forward 100 then turn left 90",
+]
+
+LEGACY_COLORS = {
+    "red": "#FF0000", "blue": "#0000FF", "green": "#00FF00",
+    "yellow": "#FFFF00", "purple": "#800080", "orange": "#FFA500",
+    "pink": "#FFC0CB", "brown": "#A52A2A", "black": "#000000",
+    "gray": "#808080", "grey": "#808080"
+}
+
+
+def legacy_parse_prompt(prompt):
+    """parse_prompt as it was before the shared parser"""
+    prompt = prompt.lower()
+    color = "#000000"
+    for color_name, color_value in LEGACY_COLORS.items():
+        if color_name in prompt:
+            color = color_value
+            break
+    size = 100
+    numbers = re.findall(r'\d+', prompt)
+    if numbers:
+        size = int(numbers[0])
+    filled = "fill" in prompt
+    for shape in ("circle", "square", "rectangle", "triangle", "star"):
+        if shape in prompt:
+            shape = "square" if shape == "rectangle" else shape
+            return {"type": shape, "color": color, "size": size, "filled": filled}
+    for shape in ("house", "tree", "flower", "spiral"):
+        if shape in prompt:
+            return {"type": shape, "color": color, "size": size}
+    return {"type": "custom", "color": color, "size": size, "prompt": prompt}
+
+
+def legacy_commands(prompt):
+    """The movement command loop draw_custom used, returning commands"""
+    words = prompt.split()
+    commands = []
+    for i, word in enumerate(words):
+        amount = int(words[i + 1]) if i + 1 < len(words) and words[i + 1].isdigit() else None
+        if word in ["forward", "move", "go"]:
+            commands.append(("forward", 50 if amount is None else amount))
+        elif word in ["back", "backward"]:
+            commands.append(("back", 50 if amount is None else amount))
+        elif word in ["left", "turn"]:
+            commands.append(("left", 90 if amount is None else amount))
+        elif word in ["right"]:
+            commands.append(("right", 90 if amount is None else amount))
+        elif word in ["up", "penup"]:
+            commands.append(("penup", 0))
+        elif word in ["down", "pendown"]:
+            commands.append(("pendown", 0))
+    return commands
+
+
+def make_script(words: int, seed: int = 0) -> str:
+    """Return a movement script of roughly the given number of words"""
+    rng = random.Random(seed)
+    parts = []
+    while len(parts) < words:
+        parts += [rng.choice(["forward", "back", "left", "right"]), str(rng.randint(1, 90))]
+        if rng.random() < 0.05:
+            parts.append(rng.choice(["up", "down"]))
+    return " ".join(parts)
+
+
+def timed(fn, *args, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn(*args)
+    return result, (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--words", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=20_000)
+    args = parser.parse_args()
+
+    def parse_all(fn, prompts):
+        return [fn(p) for p in prompts]
+
+    # The same few prompts again and again, as from the frontend's examples
+    repeated = PROMPTS * args.repeat
+    # Prompts that are each seen once, so no spec is memoized
+    distinct = [f"{prompt} {i}" for i in range(args.repeat) for prompt in PROMPTS]
+
+    print(f"{'short prompts':<16} {'legacy us':>10} {'parser us':>10}")
+    for name, prompts in (("repeated", repeated), ("distinct", distinct)):
+        clear_prompt_cache()
+        expected, legacy_time = timed(parse_all, legacy_parse_prompt, prompts)
+        actual, parser_time = timed(parse_all, parse_prompt, prompts)
+        assert expected == actual
+        per_prompt = 1e6 / len(prompts)
+        print(f"{name:<16} {legacy_time * per_prompt:>10.2f} {parser_time * per_prompt:>10.2f}")
+    print()
+
+    print(f"{'words':>10} {'legacy ms':>12} {'parser ms':>12} {'ns/word':>9}")
+    for words in args.words:
+        script = make_script(words)
+        expected, legacy_time = timed(legacy_commands, script)
+        parsed, parser_time = timed(prompt_parser.parse, script)
+        assert expected == list(parsed.commands)
+        print(f"{words:>10} {legacy_time * 1000:>12.2f} {parser_time * 1000:>12.2f} "
+              f"{parser_time / words * 1e9:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
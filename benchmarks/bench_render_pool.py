@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Benchmark render throughput of the process pool from 1 to N workers.
+
+Usage:
+    python benchmarks/bench_render_pool.py [--max-workers N] [--requests M]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from render_pool import RenderPool  # noqa: E402
+
+SPECS = [
+    {"type": "spiral", "color": "#0000FF", "size": 100},
+    {"type": "star", "color": "#FFFF00", "size": 150, "filled": True},
+    {"type": "house", "color": "#000000", "size": 100},
+    {"type": "flower", "color": "#FFC0CB", "size": 100},
+]
+
+
+async def run(pool: RenderPool, requests: int) -> float:
+    """Fire all requests concurrently and return requests/sec"""
+    start = time.perf_counter()
+    await asyncio.gather(*(pool.render(SPECS[i % len(SPECS)]) for i in range(requests)))
+    return requests / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--backend", default="process", choices=["process", "thread", "inline"])
+    args = parser.parse_args()
+
+    print(f"{'workers':>8} {'req/s':>10} {'speedup':>8}")
+    baseline = None
+    for workers in range(1, args.max_workers + 1):
+        pool = RenderPool(workers=workers, backend=args.backend)
+        pool.start()
+        try:
+            rate = asyncio.run(run(pool, args.requests))
+        finally:
+            pool.shutdown()
+        baseline = baseline or rate
+        print(f"{workers:>8} {rate:>10.1f} {rate / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for parsing, drawing, encoding and the /api/generate endpoint.
+
+Each case is run for a number of iterations after a warm-up and reports
+latency percentiles plus the peak traced memory and the number of memory
+blocks allocated and still held during one iteration (measured in a
+separate pass under tracemalloc, so tracing never skews the timings).
+
+Results can be saved as a JSON baseline and later runs compared against it;
+the run fails when a case regresses by more than the threshold.
+
+Usage:
+    python benchmarks/bench_suite.py [--filter draw/] [--iterations 50]
+    python benchmarks/bench_suite.py --save benchmarks/baseline.json
+    python benchmarks/bench_suite.py --compare benchmarks/baseline.json --threshold 0.2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+# Render in-process by default so timings and allocations cover the work
+os.environ.setdefault("TWODEE_RENDER_BACKEND", "inline")
+
+from simple_drawer import SimpleDrawer, clear_prompt_cache, draw_shape, parse_prompt  # noqa: E402
+
+PROMPTS = [
+    "draw a circle",
+    "draw a blue square",
+    "draw a filled red triangle",
+    "draw a purple star 150",
+    "draw a house with red roof",
+    "draw a green tree",
+    "draw a yellow flower",
+    "draw a spiral in blue",
+    "draw a red circle next to a blue house and a green tree",
+    "move forward 100 then turn left 90 forward 50 right 45 back 30",
+]
+
+SHAPES = {
+    "circle": {"type": "circle", "color": "#FF0000", "size": 100, "filled": False},
+    "square": {"type": "square", "color": "#0000FF", "size": 100, "filled": False},
+    "triangle": {"type": "triangle", "color": "#00FF00", "size": 100, "filled": True},
+    "star": {"type": "star", "color": "#800080", "size": 150, "filled": True},
+    "house": {"type": "house", "color": "#000000", "size": 100},
+    "tree": {"type": "tree", "color": "#00FF00", "size": 100},
+    "flower": {"type": "flower", "color": "#FFFF00", "size": 100},
+    "spiral": {"type": "spiral", "color": "#0000FF", "size": 100},
+    "scene": parse_prompt(PROMPTS[-2]),
+    "custom": parse_prompt(PROMPTS[-1]),
+}
+
+# Metrics compared against a baseline
+COMPARED = ("p50_ms", "alloc_peak_kb")
+
+
+class Case(NamedTuple):
+    name: str
+    run: Callable[[], object]
+    setup: Optional[Callable[[], None]] = None
+
+
+def drawn(spec) -> SimpleDrawer:
+    """Return a drawer with a spec drawn and rasterized"""
+    drawer = SimpleDrawer()
+    draw_shape(drawer, spec)
+    drawer.flush()
+    return drawer
+
+
+def draw(spec):
+    """Draw and rasterize a spec, then return the canvas to the pool as renders do"""
+    drawn(spec).release()
+
+
+def parse_cases() -> List[Case]:
+    def parse_all():
+        for prompt in PROMPTS:
+            parse_prompt(prompt)
+
+    return [
+        Case("parse/cold", parse_all, setup=clear_prompt_cache),
+        Case("parse/memoized", parse_all),
+    ]
+
+
+def draw_cases() -> List[Case]:
+    return [Case(f"draw/{name}", lambda spec=spec: draw(spec)) for name, spec in SHAPES.items()]
+
+
+def encode_cases(workdir: str) -> List[Case]:
+    drawer = drawn(SHAPES["house"])
+    filename = os.path.join(workdir, "save_image.png")
+    return [
+        Case("encode/save_image", lambda: drawer.save_image(filename)),
+        Case("encode/png", lambda: drawer.to_bytes("PNG")),
+        Case("encode/webp", lambda: drawer.to_bytes("WEBP")),
+        Case("encode/svg", drawer.to_svg),
+    ]
+
+
+def api_cases(loop: asyncio.AbstractEventLoop) -> List[Case]:
+    try:
+        import httpx
+        import main
+        from render_cache import render_cache
+    except ImportError as e:
+        print(f"Skipping api cases: {e}", file=sys.stderr)
+        return []
+
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench")
+
+    def post(payload):
+        response = loop.run_until_complete(client.post("/api/generate", json=payload))
+        assert response.status_code == 200, response.text
+        if response.headers["content-type"] == "application/json":
+            assert response.json()["status"] == "success", response.text
+        return response
+
+    return [
+        # Full render and encode on every request
+        Case("api/generate-render",
+             lambda: post({"prompt": "draw a house with red roof", "response": "image"}),
+             setup=render_cache.clear),
+        # Cached drawing returned as a static URL
+        Case("api/generate-cached", lambda: post({"prompt": "draw a house with red roof"})),
+    ]
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """Return a percentile of sorted samples by linear interpolation"""
+    position = (len(samples) - 1) * fraction
+    low = int(position)
+    high = min(low + 1, len(samples) - 1)
+    return samples[low] + (samples[high] - samples[low]) * (position - low)
+
+
+def measure(case: Case, iterations: int, warmup: int) -> Dict[str, float]:
+    """Time a case and trace one iteration's allocations"""
+    for _ in range(warmup):
+        if case.setup:
+            case.setup()
+        case.run()
+
+    samples = []
+    for _ in range(iterations):
+        if case.setup:
+            case.setup()
+        start = time.perf_counter()
+        case.run()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+
+    if case.setup:
+        case.setup()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    case.run()
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    blocks = sum(max(stat.count_diff, 0) for stat in after.compare_to(before, "lineno"))
+
+    return {
+        "iterations": iterations,
+        "mean_ms": statistics.fmean(samples),
+        "p50_ms": percentile(samples, 0.50),
+        "p95_ms": percentile(samples, 0.95),
+        "p99_ms": percentile(samples, 0.99),
+        "max_ms": samples[-1],
+        "alloc_peak_kb": peak / 1024,
+        "alloc_blocks": blocks,
+    }
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            threshold: float) -> List[str]:
+    """Return a description of every metric that regressed beyond the threshold"""
+    regressions = []
+    for name, result in results.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        for metric in COMPARED:
+            if metric in old and old[metric] > 0 and result[metric] > old[metric] * (1 + threshold):
+                change = result[metric] / old[metric] - 1
+                regressions.append(f"{name} {metric}: {old[metric]:.3f} -> {result[metric]:.3f} "
+                                   f"(+{change:.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--filter", default="", help="Only run cases whose name contains this")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--save", help="Write results to this JSON baseline file")
+    parser.add_argument("--compare", help="Compare against this JSON baseline file")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Allowed relative regression before failing (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    save = Path(args.save).resolve() if args.save else None
+    baseline_path = Path(args.compare).resolve() if args.compare else None
+    workdir = tempfile.mkdtemp(prefix="twodee_bench_")
+    # The API writes drawings under ./static, so keep them out of the repo
+    os.chdir(workdir)
+    loop = asyncio.new_event_loop()
+
+    cases = parse_cases() + draw_cases() + encode_cases(workdir)
+    if "api" in args.filter or not args.filter:
+        cases += api_cases(loop)
+    cases = [case for case in cases if args.filter in case.name]
+
+    results = {}
+    print(f"{'case':<24} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'peak KB':>9} {'blocks':>7}")
+    for case in cases:
+        result = measure(case, args.iterations, args.warmup)
+        results[case.name] = result
+        print(f"{case.name:<24} {result['p50_ms']:>9.3f} {result['p95_ms']:>9.3f} "
+              f"{result['p99_ms']:>9.3f} {result['alloc_peak_kb']:>9.1f} {result['alloc_blocks']:>7}")
+    loop.close()
+
+    if save:
+        document = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cases": results,
+        }
+        save.write_text(json.dumps(document, indent=2) + "\n")
+        print(f"\nSaved baseline to {args.save}")
+
+    if baseline_path:
+        baseline = json.loads(baseline_path.read_text())["cases"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\nRegressions beyond {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.threshold:.0%} against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
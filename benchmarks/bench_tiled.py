@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark tiled PNG rendering against rendering one large canvas.
+
+Each configuration runs in its own process, so peak RSS is measured
+independently (including the render workers for the tiled mode). Reports
+render time, output size and peak memory per output size.
+
+Usage:
+    python benchmarks/bench_tiled.py [--sizes 4000 8000 16000] [--workers 2]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+SPEC = {"type": "house", "color": "#FF0000", "size": 100}
+
+
+def max_rss_mb(who: int) -> float:
+    # ru_maxrss is in KB on Linux and bytes on macOS
+    rss = resource.getrusage(who).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def child(mode: str, size: int, band_height: int):
+    """Render in this process and print the measurements as JSON"""
+    sys.path.insert(0, str(BACKEND_DIR))
+    start = time.perf_counter()
+    if mode == "single":
+        from simple_drawer import render_drawing
+        output = len(render_drawing(SPEC, "png", width=size, height=size))
+    else:
+        from render_pool import render_pool
+        from tiled_renderer import TiledRender
+
+        async def stream():
+            render_pool.start()
+            total = 0
+            render = await asyncio.to_thread(TiledRender, SPEC, size, size, band_height=band_height)
+            async for chunk in render.chunks():
+                total += len(chunk)
+            render_pool.shutdown()
+            return total
+
+        output = asyncio.run(stream())
+    print(json.dumps({
+        "seconds": time.perf_counter() - start,
+        "bytes": output,
+        "rss_mb": max_rss_mb(resource.RUSAGE_SELF),
+        "workers_rss_mb": max_rss_mb(resource.RUSAGE_CHILDREN),
+    }))
+
+
+def run(mode: str, size: int, workers: int, band_height: int) -> dict:
+    env = dict(os.environ, TWODEE_RENDER_BACKEND="process", TWODEE_RENDER_WORKERS=str(workers))
+    output = subprocess.run(
+        [sys.executable, __file__, "--child", mode, "--sizes", str(size),
+         "--band-height", str(band_height)],
+        env=env, check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[4000, 8000, 16000],
+                        help="Square output sizes in pixels")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--band-height", type=int, default=256)
+    parser.add_argument("--child", choices=["single", "tiled"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.sizes[0], args.band_height)
+        return
+
+    print(f"{'size':>7} {'mode':>7} {'seconds':>8} {'KB':>9} {'peak RSS MB':>12} {'worker RSS MB':>14}")
+    for size in args.sizes:
+        for mode in ("single", "tiled"):
+            result = run(mode, size, args.workers, args.band_height)
+            print(f"{size:>7} {mode:>7} {result['seconds']:>8.2f} {result['bytes'] / 1024:>9.1f} "
+                  f"{result['rss_mb']:>12.1f} {result['workers_rss_mb']:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
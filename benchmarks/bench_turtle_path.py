@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark the vectorized turtle path engine against scalar SimpleDrawer steps.
+
+Each case traces a random sequence of moves and turns and reports the time
+taken by each engine and the largest difference between their vertices;
+tests/test_turtle_path.py checks that they agree.
+
+Usage:
+    python benchmarks/bench_turtle_path.py [--sizes 100 10000 1000000]
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import numpy as np  # noqa: E402
+
+import turtle_path  # noqa: E402
+from simple_drawer import SimpleDrawer  # noqa: E402
+from turtle_path import MOVE, TURN  # noqa: E402
+
+
+def make_commands(segments: int, seed: int = 0):
+    """Return alternating move/turn commands for the given segment count"""
+    rng = random.Random(seed)
+    kinds = []
+    values = []
+    for _ in range(segments):
+        kinds += [MOVE, TURN]
+        values += [rng.randint(1, 50), rng.choice([-90, -45, 30, 90, 144])]
+    return kinds, values
+
+
+def scalar_vertices(kinds, values):
+    """Step through the commands one at a time, as SimpleDrawer used to"""
+    drawer = SimpleDrawer()
+    for kind, value in zip(kinds, values):
+        if kind == MOVE:
+            drawer.forward(value)
+        else:
+            drawer.right(value)
+    return np.array([c for op in drawer.display_list for c in op[3]]).reshape(-1, 2)
+
+
+def vector_vertices(kinds, values):
+    """Trace the commands in one vectorized pass"""
+    polylines, *_ = turtle_path.trace(kinds, values, 400, 300, 0, True)
+    return np.concatenate(polylines)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'segments':>10} {'scalar ms':>12} {'vector ms':>12} {'speedup':>9} {'max error':>11}")
+    for segments in args.sizes:
+        kinds, values = make_commands(segments)
+        expected, scalar_time = timed(scalar_vertices, kinds, values)
+        actual, vector_time = timed(vector_vertices, kinds, values)
+
+        error = float(np.max(np.abs(expected - actual)))
+
+        print(f"{segments:>10} {scalar_time * 1000:>12.2f} {vector_time * 1000:>12.2f} "
+              f"{scalar_time / vector_time:>8.1f}x {error:>11.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Load-test the backend locally at one or more concurrency levels.
+
+Starts uvicorn in production mode (no reload, access log off and the
+environment defaults of ``start_backend.py --production``) on a free local
+port, replays a workload file against it and reports latency
+percentiles, throughput, error rate and how much the static directory grew.
+Only the standard library is needed on the client side and nothing outside
+this machine is contacted.
+
+A workload file is JSON with a seed, a request count and a weighted mix of
+requests. ``{size}`` and ``{color}`` in a path or body are replaced with
+values drawn from the seeded generator, so every run replays the same
+sequence:
+
+    {"seed": 1, "requests": 500, "mix": [
+        {"weight": 3, "path": "/api/generate", "body": {"prompt": "draw a circle"}},
+        {"weight": 1, "method": "GET", "path": "/api/health"}]}
+
+Usage:
+    python benchmarks/loadtest.py --concurrency 1 4 16 --workers 2
+    python benchmarks/loadtest.py --workload my.json --url http://localhost:8000
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+BACKEND_DIR = ROOT / "backend"
+DEFAULT_WORKLOAD = Path(__file__).resolve().parent / "workloads" / "default.json"
+
+sys.path.insert(0, str(ROOT))
+from start_backend import production_env  # noqa: E402
+
+COLORS = ["red", "blue", "green", "yellow", "purple", "orange", "pink", "brown", "black", "gray"]
+
+
+class Request(NamedTuple):
+    method: str
+    path: str
+    body: Optional[bytes]
+
+
+def expand(value: Any, rng: random.Random) -> Any:
+    """Fill in {size} and {color} placeholders in strings, lists and dicts"""
+    if isinstance(value, str):
+        while "{size}" in value:
+            value = value.replace("{size}", str(rng.randint(10, 300)), 1)
+        while "{color}" in value:
+            value = value.replace("{color}", rng.choice(COLORS), 1)
+        return value
+    if isinstance(value, list):
+        return [expand(v, rng) for v in value]
+    if isinstance(value, dict):
+        return {k: expand(v, rng) for k, v in value.items()}
+    return value
+
+
+def load_workload(path: Path, requests: Optional[int] = None) -> List[Request]:
+    """Expand a workload file into the fixed request sequence it describes"""
+    workload = json.loads(path.read_text())
+    rng = random.Random(workload.get("seed", 0))
+    mix = workload["mix"]
+    weights = [entry.get("weight", 1) for entry in mix]
+    count = requests or workload.get("requests", 100)
+
+    sequence = []
+    for entry in rng.choices(mix, weights=weights, k=count):
+        body = entry.get("body")
+        method = entry.get("method", "POST" if body is not None else "GET")
+        path = expand(entry["path"], rng)
+        data = json.dumps(expand(body, rng)).encode() if body is not None else None
+        sequence.append(Request(method, path, data))
+    return sequence
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int, workers: int, static_dir: str, env: Dict[str, str]) -> subprocess.Popen:
+    """Start uvicorn in production mode and wait for the health check
+
+    The server gets the same environment defaults as ``start_backend.py
+    --production`` (a shared cache, one render worker per server worker);
+    ``env`` and the caller's environment override them.
+    """
+    command = [
+        sys.executable, "-m", "uvicorn", "main:app",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(workers),
+        "--no-access-log", "--log-level", "warning",
+    ]
+    server_env = production_env(dict(os.environ, TWODEE_STATIC_DIR=static_dir, **env))
+    server = subprocess.Popen(command, cwd=BACKEND_DIR, env=server_env)
+
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited with code {server.returncode}")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/api/health")
+            if conn.getresponse().status == 200:
+                conn.close()
+                return server
+        except OSError:
+            pass
+        time.sleep(0.2)
+
+    server.terminate()
+    raise RuntimeError("Server did not become healthy within 60s")
+
+
+def directory_usage(path: Optional[str]) -> Tuple[int, int]:
+    """Return the number of files and total bytes under a directory"""
+    if not path or not os.path.isdir(path):
+        return 0, 0
+    files = size = 0
+    for entry in os.scandir(path):
+        if entry.is_file():
+            files += 1
+            size += entry.stat().st_size
+    return files, size
+
+
+def is_error(status: int, content_type: str, payload: bytes) -> bool:
+    """Treat HTTP errors and {"status": "error"} bodies as failures"""
+    if status >= 400:
+        return True
+    if content_type.startswith("application/json"):
+        try:
+            return json.loads(payload).get("status") == "error"
+        except (ValueError, AttributeError):
+            return False
+    return False
+
+
+def run_level(host: str, port: int, sequence: List[Request], concurrency: int) -> Dict[str, float]:
+    """Replay the sequence with a number of concurrent keep-alive clients"""
+    latencies: List[float] = []
+    errors = 0
+    position = 0
+    lock = threading.Lock()
+    headers = {"Content-Type": "application/json"}
+
+    def client():
+        nonlocal errors, position
+        conn = http.client.HTTPConnection(host, port, timeout=60)
+        while True:
+            with lock:
+                if position >= len(sequence):
+                    break
+                request = sequence[position]
+                position += 1
+
+            start = time.perf_counter()
+            try:
+                conn.request(request.method, request.path, body=request.body, headers=headers)
+                response = conn.getresponse()
+                payload = response.read()
+                failed = is_error(response.status, response.getheader("content-type", ""), payload)
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection(host, port, timeout=60)
+                failed = True
+            elapsed = (time.perf_counter() - start) * 1000
+
+            with lock:
+                latencies.append(elapsed)
+                errors += failed
+        conn.close()
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - start
+
+    latencies.sort()
+
+    def percentile(fraction):
+        return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))]
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "throughput": len(latencies) / duration,
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+        "error_rate": errors / len(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workload", type=Path, default=DEFAULT_WORKLOAD)
+    parser.add_argument("--requests", type=int, help="Override the workload's request count")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--warmup", type=int, default=20, help="Unmeasured requests per level")
+    parser.add_argument("--url", help="Test an already running server instead of starting one")
+    parser.add_argument("--static-dir",
+                        help="Static directory to serve from and measure (default: a temp dir)")
+    parser.add_argument("--env", action="append", default=[], metavar="NAME=VALUE",
+                        help="Extra environment for the server, e.g. TWODEE_CACHE_ENABLED=0")
+    parser.add_argument("--json", type=Path, help="Also write the results to this file")
+    args = parser.parse_args()
+
+    sequence = load_workload(args.workload, args.requests)
+    server = None
+    static_dir = args.static_dir
+    if args.url:
+        url = urllib.parse.urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+    else:
+        static_dir = static_dir or tempfile.mkdtemp(prefix="twodee_static_")
+        host, port = "127.0.0.1", free_port()
+        env = dict(item.split("=", 1) for item in args.env)
+        server = start_server(port, args.workers, os.path.abspath(static_dir), env)
+
+    results = []
+    try:
+        print(f"{len(sequence)} requests from {args.workload}, {args.workers} worker(s)")
+        print(f"{'conc':>5} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+              f"{'errors':>7} {'+files':>7} {'+KB':>9}")
+        for concurrency in args.concurrency:
+            if args.warmup:
+                run_level(host, port, sequence[:args.warmup], concurrency)
+            files_before, bytes_before = directory_usage(static_dir)
+            result = run_level(host, port, sequence, concurrency)
+            files_after, bytes_after = directory_usage(static_dir)
+            result["static_files_added"] = files_after - files_before
+            result["static_bytes_added"] = bytes_after - bytes_before
+            results.append(result)
+            print(f"{concurrency:>5} {result['throughput']:>9.1f} {result['p50_ms']:>9.2f} "
+                  f"{result['p95_ms']:>9.2f} {result['p99_ms']:>9.2f} "
+                  f"{result['error_rate']:>6.1%} {result['static_files_added']:>7} "
+                  f"{result['static_bytes_added'] / 1024:>9.1f}")
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    if static_dir:
+        files, size = directory_usage(static_dir)
+        print(f"\n{static_dir}: {files} files, {size / 1024:.1f} KB")
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
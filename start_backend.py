@@ -1,34 +1,70 @@
 #!/usr/bin/env python3
 """
 Startup script for TwoDee Drawing Generator Backend
+
+By default the server runs in development mode: one process with auto-reload.
+With --production it runs several worker processes without reload; each
+worker renders every shape type before it accepts requests, and the workers
+share rendered drawings through the cache on local disk.
 """
 
+import argparse
 import subprocess
 import sys
 import os
 from pathlib import Path
 
+# Production defaults, unless set in the environment: cache hits are shared
+# through the disk tier, and every server worker already is a process, so
+# each gets one render worker
+PRODUCTION_ENV = {"TWODEE_CACHE_SHARED": "1", "TWODEE_RENDER_WORKERS": "1"}
+
+def production_env(env=None):
+    """Return a copy of env (os.environ by default) with the production defaults"""
+    env = dict(os.environ if env is None else env)
+    for name, value in PRODUCTION_ENV.items():
+        env.setdefault(name, value)
+    return env
+
 def main():
+    parser = argparse.ArgumentParser(description="Start the TwoDee backend")
+    parser.add_argument("--production", action="store_true",
+                        help="Run several workers without auto-reload")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Worker processes in production mode (default: one per CPU core)")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
     # Change to backend directory
     backend_dir = Path(__file__).parent / "backend"
     os.chdir(backend_dir)
-    
+
+    command = [
+        sys.executable, "-m", "uvicorn",
+        "main:app",
+        "--host", args.host,
+        "--port", str(args.port),
+    ]
+    env = dict(os.environ)
+    if args.production:
+        command += ["--workers", str(args.workers), "--no-access-log"]
+        env = production_env(env)
+    else:
+        command.append("--reload")
+
+    mode = f"production, {args.workers} workers" if args.production else "development, auto-reload"
     print("🚀 Starting TwoDee Drawing Generator Backend...")
     print("📁 Working directory:", backend_dir)
-    print("🌐 Server will be available at: http://localhost:8000")
-    print("📚 API docs will be available at: http://localhost:8000/docs")
-    print("🎯 Health check: http://localhost:8000/api/health")
+    print("⚙️  Mode:", mode)
+    print(f"🌐 Server will be available at: http://localhost:{args.port}")
+    print(f"📚 API docs will be available at: http://localhost:{args.port}/docs")
+    print(f"🎯 Health check: http://localhost:{args.port}/api/health")
     print("-" * 50)
-    
+
     try:
         # Start the FastAPI server with uvicorn
-        subprocess.run([
-            sys.executable, "-m", "uvicorn", 
-            "main:app", 
-            "--host", "0.0.0.0", 
-            "--port", "8000", 
-            "--reload"
-        ], check=True)
+        subprocess.run(command, env=env, check=True)
     except KeyboardInterrupt:
         print("\n🛑 Server stopped by user")
     except subprocess.CalledProcessError as e:
@@ -0,0 +1,44 @@
+import asyncio
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+# Render in-process; worker processes are not needed to test output
+os.environ.setdefault("TWODEE_RENDER_BACKEND", "inline")
+
+# Generated files go to a scratch directory, never backend/static
+if "TWODEE_STATIC_DIR" not in os.environ:
+    os.environ["TWODEE_STATIC_DIR"] = tempfile.mkdtemp(prefix="twodee_tests_")
+    atexit.register(shutil.rmtree, os.environ["TWODEE_STATIC_DIR"], True)
+
+
+@pytest.fixture
+def run_app():
+    """Return a function that runs ``scenario(client)`` against the app
+
+    Each call starts the app's lifespan in a new event loop, with an empty
+    memory cache, and returns what the scenario returns.
+    """
+    import httpx
+    import main
+    from render_cache import render_cache
+
+    def run(scenario):
+        async def session():
+            render_cache.clear()
+            async with main.lifespan(main.app):
+                transport = httpx.ASGITransport(app=main.app)
+                async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                    return await scenario(client)
+
+        return asyncio.run(session())
+
+    return run
@@ -0,0 +1,56 @@
+import io
+import math
+
+import pytest
+from PIL import Image, ImageChops
+
+from animation import frame_steps, render_animation
+from simple_drawer import SimpleDrawer, draw_shape, parse_prompt, render_drawing
+
+PROMPTS = [
+    "draw a spiral",
+    "draw a red circle next to a blue house below a green tree",
+    "forward 100 right 90 forward 50 penup back 20 pendown left 45 forward 30",
+]
+
+
+def steps_of(spec):
+    drawer = SimpleDrawer()
+    draw_shape(drawer, spec)
+    return frame_steps(drawer.display_list.ops)
+
+
+def frames_of(data):
+    image = Image.open(io.BytesIO(data))
+    count = image.n_frames
+    image.seek(count - 1)
+    return count, image.convert("RGB")
+
+
+@pytest.mark.parametrize("format", ["apng", "gif"])
+@pytest.mark.parametrize("prompt", PROMPTS)
+def test_last_frame_is_the_drawing(format, prompt):
+    spec = parse_prompt(prompt)
+    for options in ({}, {"framing": "crop"}, {"width": 300, "height": 200, "framing": "fit"}):
+        _, last = frames_of(render_animation(spec, format, **options))
+        plain = render_drawing(spec, "png", width=options.get("width"),
+                               height=options.get("height"), framing=options.get("framing", "canvas"))
+        plain = Image.open(io.BytesIO(plain)).convert("RGB")
+        assert ImageChops.difference(last, plain).getbbox() is None, options
+
+
+@pytest.mark.parametrize("format", ["apng", "gif"])
+@pytest.mark.parametrize("prompt", PROMPTS)
+def test_frame_count_follows_every_and_max_frames(format, prompt):
+    spec = parse_prompt(prompt)
+    steps = steps_of(spec)
+    assert frames_of(render_animation(spec, format))[0] == steps
+    assert frames_of(render_animation(spec, format, every=7))[0] == math.ceil(steps / 7)
+
+    # Fewer frames allowed than steps: several steps per frame, never more frames
+    frames, _ = frames_of(render_animation(spec, format, max_frames=9))
+    assert frames == math.ceil(steps / math.ceil(steps / 9))
+    assert frames <= 9
+    # every is only ever raised by max_frames
+    frames, _ = frames_of(render_animation(spec, format, every=50, max_frames=9))
+    assert frames == math.ceil(steps / max(50, math.ceil(steps / 9)))
@@ -0,0 +1,43 @@
+import os
+import time
+
+from artifact_store import ArtifactStore
+from render_cache import RenderCache
+
+
+def test_shared_hit_checks_the_disk(tmp_path):
+    # Two worker processes, each with its own index of one directory
+    a = ArtifactStore(str(tmp_path), max_files=0, min_idle=0, shared=True)
+    b = ArtifactStore(str(tmp_path), min_idle=0, shared=True)
+    a.write("drawing_one.png", b"one")
+    assert b.touch("drawing_one.png")
+
+    a.collect()
+    assert not os.path.exists(tmp_path / "drawing_one.png")
+    assert not b.touch("drawing_one.png")
+    assert b.stats()["files"] == 0
+    assert RenderCache(b).get_path("one") is None
+
+
+def test_shared_reference_protects_from_other_collectors(tmp_path):
+    a = ArtifactStore(str(tmp_path), max_files=0, min_idle=300, shared=True)
+    b = ArtifactStore(str(tmp_path), min_idle=300, shared=True)
+    a.write("drawing_one.png", b"one")
+    old = time.time() - 3600
+    os.utime(tmp_path / "drawing_one.png", (old, old))
+    a._index["drawing_one.png"].last_access = old
+
+    # Referenced through the other worker only
+    assert b.touch("drawing_one.png")
+    assert a.collect()["files"] == 0
+    assert os.path.exists(tmp_path / "drawing_one.png")
+
+    assert a.collect(now=time.time() + 600)["files"] == 1
+
+
+def test_unshared_index_is_trusted(tmp_path):
+    store = ArtifactStore(str(tmp_path), shared=False)
+    store.write("drawing_one.png", b"one")
+    os.remove(tmp_path / "drawing_one.png")
+    # No stat per hit when only one process uses the directory
+    assert store.touch("drawing_one.png")
@@ -0,0 +1,45 @@
+import asyncio
+import time
+
+from PIL import Image, ImageDraw
+
+from display_list import clip_polyline, clip_segment, replay
+from simple_drawer import parse_prompt, render_drawing
+from tiled_renderer import render_png
+
+
+def test_clip_segment():
+    box = (0, 0, 10, 10)
+    assert clip_segment(2, 3, 8, 9, box) == (2, 3, 8, 9)
+    assert clip_segment(-10, 5, 20, 5, box) == (0, 5, 10, 5)
+    assert clip_segment(-5, -5, 15, 15, box) == (0, 0, 10, 10)
+    assert clip_segment(-5, 20, 15, 20, box) is None
+    assert clip_segment(20, 0, 30, 10, box) is None
+
+
+def test_clip_polyline_splits_where_it_leaves():
+    runs = clip_polyline([5, 5, 5, 50, 8, 50, 8, 5], (0, 0, 10, 10))
+    assert runs == [[5, 5, 5, 10], [8, 10, 8, 5]]
+
+
+def test_replay_draws_lines_near_canvas_unclipped():
+    ops = [("polyline", "black", 3, [-150.5, 10.0, 150.0, 90.5, 380.0, -180.0])]
+    clipped = Image.new("RGB", (200, 100), "white")
+    replay(ops, ImageDraw.Draw(clipped))
+    plain = Image.new("RGB", (200, 100), "white")
+    ImageDraw.Draw(plain).line(ops[0][3], fill="black", width=3, joint="curve")
+    assert clipped.tobytes() == plain.tobytes()
+
+
+def test_huge_forward_is_fast():
+    # 1-px strokes used to be walked by PIL over their whole length
+    for prompt in ("draw a square 1000000000", "draw a star 1000000000",
+                   "forward 1000000000 right 135 forward 1000000000"):
+        for framing in ("canvas", "crop"):
+            start = time.perf_counter()
+            render_drawing(parse_prompt(prompt), width=400, height=300, framing=framing)
+            assert time.perf_counter() - start < 0.5, (prompt, framing)
+
+        start = time.perf_counter()
+        asyncio.run(render_png(parse_prompt(prompt), 400, 300, band_height=64))
+        assert time.perf_counter() - start < 0.5, prompt
@@ -0,0 +1,79 @@
+import os
+
+import config
+
+
+def static_path(url):
+    return os.path.join(config.STATIC_DIR, os.path.basename(url))
+
+
+def test_static_drawing_answers_304_for_its_etag(run_app):
+    async def scenario(client):
+        url = (await client.post("/api/generate", json={"prompt": "draw a green square"})).json()["image_url"]
+        first = await client.get(url)
+        etag = first.headers["etag"]
+        again = await client.get(url, headers={"If-None-Match": etag})
+        other = await client.get(url, headers={"If-None-Match": '"0123"'})
+        return first, again, other
+
+    first, again, other = run_app(scenario)
+    assert first.status_code == 200
+    assert first.headers["etag"].startswith('"')
+    assert "immutable" in first.headers["cache-control"]
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["etag"] == first.headers["etag"]
+    assert other.status_code == 200
+
+
+def test_generate_image_answers_304(run_app):
+    async def scenario(client):
+        body = {"prompt": "draw a purple star", "response": "image"}
+        first = await client.post("/api/generate", json=body)
+        again = await client.post("/api/generate", json=body,
+                                  headers={"If-None-Match": first.headers["etag"]})
+        return first, again
+
+    first, again = run_app(scenario)
+    assert first.status_code == 200
+    assert first.headers["content-type"] == "image/png"
+    assert not first.headers["etag"].startswith("W/")
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["etag"] == first.headers["etag"]
+
+
+def test_generate_url_answers_304_while_the_file_exists(run_app):
+    async def scenario(client):
+        body = {"prompt": "draw an orange triangle"}
+        first = await client.post("/api/generate", json=body)
+        headers = {"If-None-Match": first.headers["etag"]}
+        again = await client.post("/api/generate", json=body, headers=headers)
+
+        os.remove(static_path(first.json()["image_url"]))
+        redrawn = await client.post("/api/generate", json=body, headers=headers)
+        return first, again, redrawn
+
+    first, again, redrawn = run_app(scenario)
+    assert first.headers["etag"].startswith('W/"')
+    assert again.status_code == 304
+    # A deleted file is drawn again rather than answered with a dead URL
+    assert redrawn.status_code == 200
+    assert redrawn.json()["image_url"] == first.json()["image_url"]
+    assert os.path.exists(static_path(redrawn.json()["image_url"]))
+
+
+def test_generate_url_has_no_etag_without_cache(run_app, monkeypatch):
+    monkeypatch.setattr(config, "CACHE_ENABLED", False)
+
+    async def scenario(client):
+        body = {"prompt": "draw a pink flower"}
+        first = await client.post("/api/generate", json=body)
+        again = await client.post("/api/generate", json=body, headers={"If-None-Match": "*"})
+        return first, again
+
+    first, again = run_app(scenario)
+    assert first.status_code == 200
+    assert "etag" not in first.headers
+    assert again.status_code == 200
+    assert again.json()["status"] == "success"
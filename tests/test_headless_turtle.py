@@ -0,0 +1,66 @@
+import io
+
+import pytest
+from PIL import Image, ImageChops
+
+from headless_turtle import HeadlessScreen, HeadlessTurtle
+from turtle_generator import TURTLE_SHAPES, TurtleDrawer
+
+# Box (x0, y0, x1, y1) of the pen-down path the standard turtle module traces
+# for each prompt, in canvas pixels
+EXPECTED_BOXES = {
+    "circle": (350.0, 200.0, 450.0, 300.0),
+    "square": (400.0, 300.0, 500.0, 400.0),
+    "rectangle": (400.0, 300.0, 500.0, 400.0),
+    "triangle": (400.0, 213.4, 500.0, 300.0),
+    "star": (400.0, 263.67, 500.0, 358.78),
+    "spiral": (300.0, 200.0, 496.0, 398.0),
+    "flower": (351.7, 251.7, 448.3, 348.3),
+    "house": (380.0, 250.5, 500.0, 400.0),
+    "tree": (320.0, 160.61, 435.36, 300.0),
+}
+
+
+def drawn(prompt):
+    drawer = TurtleDrawer()
+    drawer.setup_turtle()
+    drawer.parse_and_draw(prompt)
+    image = Image.open(io.BytesIO(drawer.to_bytes())).convert("RGB")
+    drawer.close()
+    return image
+
+
+def ink_box(image):
+    return ImageChops.difference(image, Image.new("RGB", image.size, "white")).getbbox()
+
+
+@pytest.mark.parametrize("shape", TURTLE_SHAPES)
+def test_each_shape_draws_its_box(shape):
+    image = drawn(f"draw a {shape}")
+    assert image.size == (800, 600)
+    box = ink_box(image)
+    assert box is not None
+    # getbbox ends past the last pixel; lines are a pixel wide
+    x0, y0, x1, y1 = EXPECTED_BOXES[shape]
+    for actual, expected in zip(box, (x0, y0, x1 + 1, y1 + 1)):
+        assert abs(actual - expected) <= 1.5, (shape, box)
+
+
+def test_colors_and_fill():
+    image = drawn("draw a red star")
+    assert (255, 0, 0) in {color for _, color in image.getcolors(1 << 16)}
+    image = drawn("draw a filled blue square")
+    assert image.getpixel((450, 350)) == (0, 0, 255)
+    assert image.getpixel((450, 250)) == (255, 255, 255)
+
+
+def test_turtle_semantics():
+    turtle = HeadlessTurtle(HeadlessScreen(200, 100))
+    turtle.left(90)
+    turtle.forward(30)
+    # y points up, heading 90 is north
+    assert turtle.position() == pytest.approx((0, 30))
+    turtle.circle(20)
+    assert turtle.position() == pytest.approx((0, 30))
+    assert turtle.heading() == pytest.approx(90)
+    assert turtle.screen.to_canvas(0, 30) == (100, 20)
@@ -0,0 +1,108 @@
+import asyncio
+import time
+
+import config
+from job_queue import JobQueue
+
+
+def install_queue(monkeypatch, run, **options):
+    """Serve /api/jobs from a new queue running ``run``"""
+    import main
+    queue = JobQueue(run, **options)
+    monkeypatch.setattr(main, "job_queue", queue)
+    return queue
+
+
+def test_job_runs_and_long_poll_waits_for_it(run_app):
+    async def scenario(client):
+        submitted = await client.post("/api/jobs", json={"prompt": "draw a red circle"})
+        job_url = submitted.json()["job_url"]
+        done = await client.get(job_url, params={"wait": 5})
+        image = await client.get(done.json()["image_url"])
+        return submitted, done, image
+
+    submitted, done, image = run_app(scenario)
+    assert submitted.status_code == 202
+    assert submitted.json()["state"] == "queued"
+    assert done.json()["state"] == "done"
+    assert done.json()["status"] == "success"
+    assert image.status_code == 200
+
+
+def test_long_poll_is_bounded(run_app, monkeypatch):
+    release = None
+
+    async def run(payload):
+        await release.wait()
+        return {"status": "success"}
+
+    install_queue(monkeypatch, run, workers=1)
+    monkeypatch.setattr(config, "JOB_MAX_WAIT", 0.1)
+
+    async def scenario(client):
+        nonlocal release
+        release = asyncio.Event()
+        job_url = (await client.post("/api/jobs", json={"prompt": "draw a star"})).json()["job_url"]
+        start = time.monotonic()
+        pending = await client.get(job_url, params={"wait": 30})
+        waited = time.monotonic() - start
+
+        polled = asyncio.ensure_future(client.get(job_url, params={"wait": 5}))
+        await asyncio.sleep(0.02)
+        release.set()
+        return pending, waited, await polled
+
+    pending, waited, done = run_app(scenario)
+    assert pending.json()["state"] == "running"
+    assert 0.1 <= waited < 2
+    assert done.json() == {"job_id": done.json()["job_id"], "state": "done", "status": "success"}
+
+
+def test_full_queue_answers_429_with_retry_after(run_app, monkeypatch):
+    release = None
+
+    async def run(payload):
+        await release.wait()
+        return {"status": "success"}
+
+    queue = install_queue(monkeypatch, run, max_size=1, workers=1)
+
+    async def scenario(client):
+        nonlocal release
+        release = asyncio.Event()
+        body = {"prompt": "draw a tree"}
+        running = await client.post("/api/jobs", json=body)
+        # Let the worker take the first job off the queue
+        await asyncio.sleep(0.01)
+        queued = await client.post("/api/jobs", json=body)
+        rejected = await client.post("/api/jobs", json=body)
+        release.set()
+        return running, queued, rejected
+
+    running, queued, rejected = run_app(scenario)
+    assert running.status_code == 202
+    assert queued.status_code == 202
+    assert rejected.status_code == 429
+    assert int(rejected.headers["retry-after"]) >= 1
+    assert "full" in rejected.json()["detail"]
+    assert queue.stats()["rejected"] == 1
+
+
+def test_unknown_and_expired_jobs_are_404(run_app, monkeypatch):
+    async def run(payload):
+        return {"status": "success"}
+
+    install_queue(monkeypatch, run, result_ttl=0.2)
+
+    async def scenario(client):
+        unknown = await client.get("/api/jobs/0123456789abcdef")
+        job_url = (await client.post("/api/jobs", json={"prompt": "draw a house"})).json()["job_url"]
+        done = await client.get(job_url, params={"wait": 5})
+        await asyncio.sleep(0.3)
+        expired = await client.get(job_url)
+        return unknown, done, expired
+
+    unknown, done, expired = run_app(scenario)
+    assert unknown.status_code == 404
+    assert done.json()["state"] == "done"
+    assert expired.status_code == 404
@@ -0,0 +1,33 @@
+import random
+
+from prompt_parser import COMMANDS, CommandStream, parse
+from simple_drawer import parse_prompt
+
+
+def test_command_stream_matches_parse():
+    rng = random.Random(0)
+    vocab = list(COMMANDS) + ["Forward", "10", "250", "red", "circle", "12a", "\n", "7" * 80]
+    for _ in range(500):
+        text = " ".join(rng.choice(vocab) for _ in range(rng.randint(0, 30)))
+        stream = CommandStream()
+        commands = []
+        for start in range(0, len(text), 5):
+            commands += stream.feed(text[start:start + 5])
+        commands += stream.close()
+        assert commands == list(parse(text).commands), text
+
+
+def test_command_amounts():
+    assert parse("forward 10 right penup 5 left").commands == (
+        ("forward", 10), ("right", 90), ("penup", 0), ("left", 90))
+    # A word too long to be an amount leaves the default
+    assert parse("forward " + "9" * 80).commands == (("forward", 50),)
+
+
+def test_parse_prompt_returns_new_specs():
+    for prompt in ("draw a red circle", "a red circle next to a blue house"):
+        spec = parse_prompt(prompt)
+        spec["size"] = -1
+        if spec["type"] == "scene":
+            spec["shapes"][0]["x"] = -1
+        assert parse_prompt(prompt) != spec
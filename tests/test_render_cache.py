@@ -0,0 +1,83 @@
+import os
+
+import pytest
+
+import simple_drawer
+from artifact_store import ArtifactStore
+from render_cache import RenderCache
+from simple_drawer import drawing_key, generate_simple_drawing, parse_prompt
+
+EQUIVALENT = ["Draw a RED circle", "draw a red circle please", "  draw a   red\ncircle"]
+
+
+@pytest.fixture
+def renders(tmp_path, monkeypatch):
+    """Count renders, with a fresh cache over a scratch directory"""
+    store = ArtifactStore(str(tmp_path))
+    cache = RenderCache(store)
+    monkeypatch.setattr(simple_drawer, "render_cache", cache)
+    calls = []
+    render_drawing = simple_drawer.render_drawing
+
+    def counted(shape_info, *args, **kwargs):
+        calls.append(shape_info["type"])
+        return render_drawing(shape_info, *args, **kwargs)
+
+    monkeypatch.setattr(simple_drawer, "render_drawing", counted)
+    return calls, cache, store
+
+
+def test_equivalent_prompts_share_one_key():
+    keys = {drawing_key(parse_prompt(prompt)) for prompt in EQUIVALENT}
+    assert len(keys) == 1
+    assert drawing_key(parse_prompt("draw a blue circle")) not in keys
+    assert drawing_key(parse_prompt(EQUIVALENT[0]), "webp") not in keys
+
+
+def test_memory_hit_skips_drawing_encoding_and_disk(renders, monkeypatch):
+    calls, cache, store = renders
+    first = generate_simple_drawing(EQUIVALENT[0], in_memory=True)
+    assert calls == ["circle"]
+
+    def no_disk(*args, **kwargs):
+        raise AssertionError("The disk was used")
+
+    monkeypatch.setattr(store, "touch", no_disk)
+    monkeypatch.setattr(store, "write", no_disk)
+    for prompt in EQUIVALENT[1:]:
+        result = generate_simple_drawing(prompt, in_memory=True)
+        assert result["image_bytes"] == first["image_bytes"]
+    assert calls == ["circle"]
+    stats = cache.stats()
+    assert (stats["memory_hits"], stats["misses"], stats["memory_entries"]) == (2, 1, 1)
+    assert os.listdir(store.directory) == []
+
+
+def test_file_hit_reuses_the_file(renders):
+    calls, cache, store = renders
+    paths = {generate_simple_drawing(prompt)["image_path"] for prompt in EQUIVALENT}
+    assert len(paths) == 1
+    assert calls == ["circle"]
+    assert os.listdir(store.directory) == [os.path.basename(paths.pop())]
+    assert cache.stats()["disk_hits"] == 2
+
+
+def test_generate_renders_equivalent_prompts_once(run_app, monkeypatch):
+    import main
+
+    calls = []
+    render = main.render_pool.render
+
+    async def counted(shape_info, **options):
+        calls.append(shape_info["type"])
+        return await render(shape_info, **options)
+
+    monkeypatch.setattr(main.render_pool, "render", counted)
+
+    async def scenario(client):
+        return [await client.post("/api/generate", json={"prompt": prompt, "response": "image"})
+                for prompt in EQUIVALENT]
+
+    responses = run_app(scenario)
+    assert calls == ["circle"]
+    assert len({response.content for response in responses}) == 1
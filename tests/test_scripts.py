@@ -0,0 +1,52 @@
+import random
+
+import config
+from simple_drawer import parse_prompt, render_drawing
+
+
+def script(count, seed=0):
+    rng = random.Random(seed)
+    words = ["forward 17", "right 33", "left 90", "back 5", "penup", "pendown", "forward",
+             "turn 120", "go 250", "right"]
+    return "\n".join(rng.choice(words) for _ in range(count))
+
+
+def pieces(data, size):
+    async def body():
+        for start in range(0, len(data), size):
+            yield data[start:start + size]
+    return body()
+
+
+def test_script_in_pieces_matches_the_prompt(run_app):
+    text = script(400)
+
+    async def scenario(client):
+        responses = []
+        # Odd piece sizes split words and numbers across pieces
+        for size in (1, 7, 64, len(text)):
+            responses.append(await client.post("/api/scripts", params={"response": "image"},
+                                               content=pieces(text.encode(), size)))
+        return responses
+
+    expected = render_drawing(parse_prompt(text))
+    for response in run_app(scenario):
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "image/png"
+        assert response.content == expected
+
+
+def test_script_over_the_limit_is_413(run_app, monkeypatch):
+    monkeypatch.setattr(config, "SCRIPT_MAX_BYTES", 1000)
+    text = script(400).encode()
+    assert len(text) > 1000
+
+    async def scenario(client):
+        over = await client.post("/api/scripts", content=pieces(text, 256))
+        within = await client.post("/api/scripts", content=pieces(text[:1000], 256))
+        return over, within
+
+    over, within = run_app(scenario)
+    assert over.status_code == 413
+    assert within.status_code == 200
+    assert within.json()["status"] == "success"
@@ -0,0 +1,44 @@
+from PIL import ImageChops
+
+from simple_drawer import SimpleDrawer, draw_shape, parse_prompt
+
+
+def placed(prompt):
+    spec = parse_prompt(prompt)
+    assert spec["type"] == "scene", prompt
+    return [(shape["type"], shape["x"], shape["y"]) for shape in spec["shapes"]]
+
+
+def inked(image, box):
+    """Return whether anything is drawn inside box"""
+    region = image.crop(box).convert("L")
+    return ImageChops.invert(region).getbbox() is not None
+
+
+def test_scene_repeating_a_shape():
+    spec = parse_prompt("a red circle next to a blue circle")
+    assert [(s["type"], s["color"]) for s in spec["shapes"]] == [
+        ("circle", "#FF0000"), ("circle", "#0000FF")]
+    assert placed("a red circle next to a blue circle") == [("circle", 200, 300), ("circle", 600, 300)]
+    assert placed("a big house and a small house") == [("house", 200, 300), ("house", 600, 300)]
+    assert placed("a circle over a circle over a circle") == [
+        ("circle", 400, 100), ("circle", 400, 300), ("circle", 400, 500)]
+
+
+def test_scene_above_and_under():
+    assert placed("a circle above a square") == [("circle", 400, 150), ("square", 400, 450)]
+    assert placed("a circle under a square") == [("circle", 400, 450), ("square", 400, 150)]
+
+
+def test_scene_repeating_a_shape_draws_each():
+    drawer = SimpleDrawer()
+    draw_shape(drawer, parse_prompt("a red circle next to a blue circle"))
+    image = drawer.rasterize(800, 600)
+    assert inked(image, (100, 200, 300, 400))
+    assert inked(image, (500, 200, 700, 400))
+    assert not inked(image, (300, 0, 500, 600))
+
+
+def test_single_shape_is_not_a_scene():
+    assert parse_prompt("draw a circle")["type"] == "circle"
+    assert parse_prompt("draw a house with a red roof")["type"] == "house"
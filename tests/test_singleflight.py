@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+import config
+from singleflight import SingleFlight
+
+
+def test_identical_calls_share_one_run():
+    flights = SingleFlight()
+    runs = []
+
+    async def work(value):
+        runs.append(value)
+        await asyncio.sleep(0.01)
+        return value * 2
+
+    async def scenario():
+        return await asyncio.gather(*(flights.do("key", work, 21) for _ in range(5)))
+
+    assert asyncio.run(scenario()) == [42] * 5
+    assert runs == [21]
+    assert flights.stats() == {"in_flight": 0, "calls": 1, "joined": 4}
+
+
+def test_leader_error_reaches_every_waiter():
+    flights = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.01)
+        raise ValueError("render failed")
+
+    async def scenario():
+        return await asyncio.gather(*(flights.do("key", work) for _ in range(3)),
+                                    return_exceptions=True)
+
+    errors = asyncio.run(scenario())
+    assert all(isinstance(e, ValueError) and str(e) == "render failed" for e in errors)
+    assert flights.stats()["in_flight"] == 0
+
+    # The failed call is not remembered
+    async def retry():
+        return await flights.do("key", asyncio.sleep, 0, "ok")
+
+    assert asyncio.run(retry()) == "ok"
+    assert flights.stats()["calls"] == 2
+
+
+def test_cancelled_waiter_leaves_nothing_in_flight():
+    flights = SingleFlight()
+    started = []
+
+    async def work():
+        started.append(True)
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def scenario():
+        leader = asyncio.ensure_future(flights.do("key", work))
+        joiner = asyncio.ensure_future(flights.do("key", work))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        # The other waiter still gets the result
+        assert await joiner == "done"
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+
+        # With every waiter gone the call itself is cancelled
+        alone = asyncio.ensure_future(flights.do("other", work))
+        await asyncio.sleep(0.01)
+        alone.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await alone
+        return flights.stats()["in_flight"]
+
+    assert asyncio.run(scenario()) == 0
+    assert len(started) == 2
+
+
+def test_generate_coalesces_identical_requests(run_app, monkeypatch):
+    import main
+
+    renders = []
+
+    async def render(shape_info, **options):
+        renders.append(shape_info["type"])
+        await asyncio.sleep(0.05)
+        return b"image"
+
+    # Without the cache only coalescing can save the renders
+    monkeypatch.setattr(config, "CACHE_ENABLED", False)
+    monkeypatch.setattr(main.render_pool, "render", render)
+    joined = main.generate_flights.stats()["joined"]
+
+    async def scenario(client):
+        body = {"prompt": "draw a blue star", "response": "image"}
+        return await asyncio.gather(*(client.post("/api/generate", json=body) for _ in range(4)))
+
+    responses = run_app(scenario)
+    assert [r.status_code for r in responses] == [200] * 4
+    assert all(r.content == b"image" for r in responses)
+    assert renders == ["star"]
+    assert main.generate_flights.stats()["joined"] - joined == 3
+    assert main.generate_flights.stats()["in_flight"] == 0
@@ -0,0 +1,55 @@
+from xml.etree import ElementTree
+
+import pytest
+
+from simple_drawer import parse_prompt, render_drawing
+
+SVG = "{http://www.w3.org/2000/svg}"
+
+# Prompt -> (colors painted, elements drawn)
+CASES = {
+    "draw a red circle": ({"#FF0000"}, {"ellipse"}),
+    "draw a filled blue circle": ({"#0000FF"}, {"ellipse"}),
+    "draw a green square": ({"#00FF00"}, {"polyline"}),
+    "draw a filled yellow square": ({"#FFFF00"}, {"rect"}),
+    "draw a purple triangle": ({"#800080"}, {"polyline"}),
+    "draw a filled orange triangle": ({"#FFA500"}, {"polygon", "polyline"}),
+    "draw a pink star": ({"#FFC0CB"}, {"polyline"}),
+    "draw a filled red star": ({"#FF0000"}, {"polygon", "polyline"}),
+    "draw a blue house": ({"#0000FF"}, {"polyline"}),
+    "draw a tree": ({"#8B4513", "#228B22"}, {"ellipse", "polyline"}),
+    "draw a purple flower": ({"#800080"}, {"ellipse"}),
+    "draw a green spiral": ({"#00FF00"}, {"polyline"}),
+    "forward 100 right 90 forward 50": ({"#000000"}, {"polyline"}),
+    "a red circle next to a blue house": ({"#FF0000", "#0000FF"}, {"ellipse", "polyline"}),
+}
+
+
+@pytest.mark.parametrize("prompt", CASES)
+def test_each_shape_is_valid_svg(prompt):
+    colors, elements = CASES[prompt]
+    root = ElementTree.fromstring(render_drawing(parse_prompt(prompt), "svg"))
+    assert root.tag == SVG + "svg"
+    assert (root.get("width"), root.get("height"), root.get("viewBox")) == ("800", "600", "0 0 800 600")
+
+    background, *shapes = root
+    assert background.tag == SVG + "rect" and background.get("fill") == "white"
+    assert {shape.tag[len(SVG):] for shape in shapes} == elements
+    painted = {shape.get(name) for shape in shapes for name in ("fill", "stroke")}
+    assert painted - {None, "none"} == colors
+
+
+def test_filled_shapes_are_filled():
+    for prompt, tag in (("draw a filled blue circle", "ellipse"),
+                        ("draw a filled yellow square", "rect"),
+                        ("draw a filled red star", "polygon")):
+        root = ElementTree.fromstring(render_drawing(parse_prompt(prompt), "svg"))
+        filled = [shape for shape in root[1:] if shape.tag == SVG + tag]
+        assert filled and all(shape.get("fill") not in (None, "none") for shape in filled), prompt
+
+
+def test_polyline_points_follow_the_path():
+    root = ElementTree.fromstring(render_drawing(parse_prompt("forward 100 right 90 forward 50"), "svg"))
+    (line,) = root[1:]
+    assert line.get("points") == "400,300 500,300 500,350"
+    assert line.get("fill") == "none" and line.get("stroke-linejoin") == "round"
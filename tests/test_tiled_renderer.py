@@ -0,0 +1,27 @@
+import asyncio
+import io
+
+import pytest
+from PIL import Image
+
+from simple_drawer import parse_prompt, render_drawing
+from tiled_renderer import render_png
+
+PROMPTS = [
+    "draw a house",
+    "draw a spiral",
+    "draw a red circle next to a blue house below a green tree",
+    "draw a star 3000",
+    "draw a filled red circle 1000000",
+]
+
+
+@pytest.mark.parametrize("prompt", PROMPTS)
+@pytest.mark.parametrize("framing", ["canvas", "crop", "fit"])
+def test_tiled_matches_plain_render(prompt, framing):
+    spec = parse_prompt(prompt)
+    plain = Image.open(io.BytesIO(render_drawing(spec, "png", width=1200, height=900, framing=framing)))
+    for band_height in (50, 256):
+        tiled = Image.open(io.BytesIO(asyncio.run(
+            render_png(spec, 1200, 900, framing=framing, band_height=band_height))))
+        assert tiled.convert("RGB").tobytes() == plain.convert("RGB").tobytes(), band_height
@@ -0,0 +1,74 @@
+import random
+
+import numpy as np
+import pytest
+
+import turtle_path
+from simple_drawer import VECTORIZE_MIN_COMMANDS, SimpleDrawer
+from turtle_path import MOVE, PENDOWN, PENUP, TURN
+
+
+def random_commands(seed):
+    rng = random.Random(seed)
+    kinds, values = [], []
+    for _ in range(rng.randint(1, 400)):
+        kind = rng.choices([MOVE, TURN, PENUP, PENDOWN], weights=[6, 4, 1, 1])[0]
+        if kind == MOVE:
+            value = rng.choice([1, -1]) * rng.choice([rng.randint(1, 50), rng.uniform(0.1, 30)])
+        elif kind == TURN:
+            value = rng.choice([-90, -45, 30, 90, 144, rng.uniform(-180, 180)])
+        else:
+            value = 0
+        kinds.append(kind)
+        values.append(value)
+    return kinds, values
+
+
+def step(drawer, kinds, values):
+    """Run commands one at a time, as SimpleDrawer does for short sequences"""
+    for kind, value in zip(kinds, values):
+        if kind == MOVE:
+            drawer.forward(value)
+        elif kind == TURN:
+            drawer.right(value)
+        elif kind == PENUP:
+            drawer.penup()
+        else:
+            drawer.pendown()
+
+
+def polylines_of(drawer):
+    return [np.array(op[3]).reshape(-1, 2) for op in drawer.display_list]
+
+
+def assert_same_polylines(actual, expected):
+    assert len(actual) == len(expected)
+    for a, e in zip(actual, expected):
+        assert a.shape == e.shape
+        assert np.allclose(a, e, rtol=1e-9, atol=1e-6)
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_trace_matches_scalar_steps(seed):
+    kinds, values = random_commands(seed)
+    pen_down = seed % 3 != 0
+    drawer = SimpleDrawer()
+    drawer.pen_down = pen_down
+    x, y, angle = drawer.x, drawer.y, drawer.angle
+    step(drawer, kinds, values)
+
+    polylines, *state = turtle_path.trace(kinds, values, x, y, angle, pen_down)
+    assert_same_polylines(polylines, polylines_of(drawer))
+    assert np.allclose(state[:3], [drawer.x, drawer.y, drawer.angle], rtol=1e-9, atol=1e-6)
+    assert state[3] == drawer.pen_down
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_run_commands_matches_scalar_steps(seed):
+    kinds, values = random_commands(seed)
+    kinds, values = kinds * VECTORIZE_MIN_COMMANDS, values * VECTORIZE_MIN_COMMANDS
+    scalar = SimpleDrawer()
+    step(scalar, kinds, values)
+    vector = SimpleDrawer()
+    vector.run_commands(kinds, values)
+    assert_same_polylines(polylines_of(vector), polylines_of(scalar))